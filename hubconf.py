@@ -65,10 +65,11 @@ if not _PRETRAINED_YML.exists():
 def _generic(name: str,
              duration: float = None,
              step: float = 0.25,
-             batch_size: int = 32,
+             batch_size: typing.Optional[int] = None,
              device: typing.Optional[typing.Union[typing.Text, torch.device]] = None,
              pipeline: typing.Optional[bool] = None,
-             force_reload: bool = False) -> typing.Union[_Pretrained, _Pipeline]:
+             force_reload: bool = False,
+             quantize: typing.Optional[typing.Text] = None) -> typing.Union[_Pretrained, _Pipeline]:
     """Load pretrained model or pipeline
 
     Parameters
@@ -84,7 +85,9 @@ def _generic(name: str,
         Reducing this value might lead to better results (at the expense of
         slower processing).
     batch_size : int, optional
-        Batch size used for inference. Defaults to 32.
+        Batch size used for inference. Defaults to the one tuned for this
+        model on this host, if any (see pyannote.audio.features.autotune),
+        and to 32 otherwise.
     device : torch.device, optional
         Device used for inference.
     pipeline : bool, optional
@@ -92,6 +95,11 @@ def _generic(name: str,
     force_reload : bool
         Whether to discard the existing cache and force a fresh download.
         Defaults to use existing cache.
+    quantize : {"dynamic-int8"}, optional
+        Apply dynamic int8 quantization to recurrent and linear layers for
+        faster CPU inference. Defaults to no quantization. Only supported for
+        pretrained models (not pipelines). Implies CPU inference unless
+        `device` is provided.
 
     Returns
     -------
@@ -213,7 +221,8 @@ def _generic(name: str,
                                   duration=duration,
                                   step=step,
                                   batch_size=batch_size,
-                                  device=device)
+                                  device=device,
+                                  quantize=quantize)
 
         if return_pipeline:
             if name.startswith('sad_'):
@@ -239,6 +248,13 @@ def _generic(name: str,
 
     elif kind == 'pipeline':
 
+        if quantize is not None:
+            msg = (
+                f'Quantization is only supported for pretrained models. Use '
+                f'"pipeline=False" or remove "quantize" option altogether.'
+            )
+            raise ValueError(msg)
+
         from pyannote.audio.pipeline.utils import load_pretrained_pipeline
         params_yml, *_ = pretrained_subdir.glob('*/*/params.yml')
         return load_pretrained_pipeline(params_yml.parent)
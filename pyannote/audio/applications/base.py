@@ -28,6 +28,7 @@
 
 import io
 import time
+import queue
 import yaml
 import zipfile
 import hashlib
@@ -39,8 +40,9 @@ try:
 except ImportError:
     from typing_extensions import Literal
 
-from typing import Optional, Union, Text
+from typing import Optional, Union, Text, Dict
 from pathlib import Path
+from contextlib import ExitStack
 from os.path import basename
 import numpy as np
 from tqdm import tqdm
@@ -48,6 +50,7 @@ from glob import glob
 from pyannote.database import FileFinder
 from pyannote.database import get_protocol
 from pyannote.database import get_annotated
+from pyannote.database import get_unique_identifier
 from pyannote.database import Subset
 from pyannote.audio.features.utils import get_audio_duration
 from sortedcontainers import SortedDict
@@ -59,8 +62,15 @@ from pyannote.audio.train.task import Task
 
 from pyannote.audio.features import Pretrained
 from pyannote.audio.features import Precomputed
+from pyannote.audio.features import RawAudio
 from pyannote.audio.features.wrapper import Wrapper
 from pyannote.audio.applications.config import load_config
+from pyannote.audio.utils.resources import plan_resources
+from pyannote.audio.utils.resources import configure_worker
+from pyannote.audio.utils.stages import Stage
+from pyannote.audio.utils.stages import StagedPipeline
+from pyannote.audio.utils.profiler import PROFILER
+from pyannote.audio.utils.path import atomic_open
 
 
 def create_zip(validate_dir: Path):
@@ -174,6 +184,7 @@ class Application:
         epochs: int = 1000,
         device: Optional[torch.device] = None,
         n_jobs: int = 1,
+        cpus: Optional[int] = None,
     ):
         """Train model
 
@@ -192,8 +203,15 @@ class Application:
         device : `torch.device`, optional
             Device on which the model will be allocated. Defaults to using CPU.
         n_jobs : `int`, optional
+            Maximum number of background threads generating training samples.
+        cpus : `int`, optional
+            Total number of CPUs shared by background threads and torch.
+            See `pyannote.audio.utils.resources.plan_resources`.
         """
 
+        plan = plan_resources("train", budget=cpus, n_jobs=n_jobs).apply()
+        print(plan.report())
+
         # initialize batch generator
         preprocessors = self.preprocessors_
         if "audio" not in preprocessors:
@@ -239,7 +257,7 @@ class Application:
             train_dir=train_dir,
             device=device,
             callbacks=self.callbacks_,
-            n_jobs=n_jobs,
+            n_jobs=plan.n_threads,
         )
 
         for _ in iterations:
@@ -305,9 +323,15 @@ class Application:
         device: Optional[torch.device] = None,
         batch_size: int = 32,
         n_jobs: int = 1,
+        cpus: Optional[int] = None,
         **kwargs,
     ):
 
+        # share CPUs between inference and evaluation worker processes
+        plan = plan_resources("validate", budget=cpus, n_jobs=n_jobs).apply()
+        print(plan.report())
+        n_jobs = plan.n_workers
+
         # use last available epoch as starting point
         if start == "last":
             start = self.get_number_of_epochs() - 1
@@ -337,7 +361,7 @@ class Application:
         validation_data = self.validate_init(protocol, subset=subset)
 
         if n_jobs > 1:
-            self.pool_ = multiprocessing.Pool(n_jobs)
+            self.pool_ = plan.pool()
 
         progress_bar = tqdm(unit="iteration")
 
@@ -424,6 +448,91 @@ class Application:
             progress_bar.set_description(desc=desc)
             progress_bar.update(1)
 
+    def validate_quantization(
+        self,
+        protocol: str,
+        subset: Subset = "development",
+        epoch: Union[int, Literal["last"]] = "last",
+        quantize: Text = "dynamic-int8",
+        batch_size: int = 32,
+        **kwargs,
+    ) -> Dict:
+        """Measure the effect of model quantization on the validation metric
+
+        Parameters
+        ----------
+        protocol : `str`
+        subset : {'train', 'development', 'test'}, optional
+            Defaults to 'development'.
+        epoch : `int` or "last", optional
+            Epoch to validate. Defaults to last available epoch.
+        quantize : {"dynamic-int8"}, optional
+            Quantization method. Defaults to "dynamic-int8".
+        batch_size : `int`, optional
+            Defaults to 32.
+        **kwargs
+            Passed to `validate_epoch`.
+
+        Returns
+        -------
+        details : `dict`
+            {'metric': 'detection_fscore',
+             'minimize': False,
+             'epoch': 42,
+             'reference': 0.92,   # without quantization
+             'quantized': 0.91,   # with quantization
+             'delta': -0.01}      # quantized - reference
+
+        Usage
+        -----
+        >>> app = SpeechActivityDetection.from_train_dir(train_dir)
+        >>> details = app.validate_quantization("Debug.SpeakerDiarization.Debug")
+        """
+
+        if epoch == "last":
+            epoch = self.get_number_of_epochs() - 1
+
+        criterion = self.validation_criterion(protocol, **kwargs)
+
+        self.validate_dir_ = Path(
+            self.VALIDATE_DIR.format(
+                train_dir=self.train_dir_,
+                _criterion=f"_{criterion}" if criterion is not None else "",
+                protocol=protocol,
+                subset=subset,
+            )
+        )
+
+        validation_data = self.validate_init(protocol, subset=subset)
+
+        # quantized models only support CPU inference: use CPU for both
+        # so that the comparison is not biased by the device.
+        device = torch.device("cpu")
+
+        values = dict()
+        for key, method in [("reference", None), ("quantized", quantize)]:
+            details = self.validate_epoch(
+                epoch,
+                validation_data,
+                protocol=protocol,
+                subset=subset,
+                device=device,
+                batch_size=batch_size,
+                n_jobs=1,
+                quantize=method,
+                **kwargs,
+            )
+            values[key] = details["value"]
+
+        return {
+            "metric": details["metric"],
+            "minimize": details["minimize"],
+            "epoch": epoch,
+            "reference": values["reference"],
+            "quantized": values["quantized"],
+            "delta": values["quantized"] - values["reference"],
+        }
+
     def validate_iter(self, start=1, end=None, step=1, sleep=10, chronological=False):
         """Continuously watches `train_dir` for newly completed epochs
         and yields them for validation
@@ -516,6 +625,365 @@ class Application:
 # TODO: add support for torch.hub models directly in docopt
 
 
+def _get_protocol(pretrained, protocol_name: Text):
+    """Get protocol with preprocessors needed by `pretrained`"""
+    preprocessors = getattr(pretrained, "preprocessors_", dict())
+    if "audio" not in preprocessors:
+        preprocessors["audio"] = FileFinder()
+    if "duration" not in preprocessors:
+        preprocessors["duration"] = get_audio_duration
+    return get_protocol(protocol_name, preprocessors=preprocessors)
+
+
+# protocol file key used to pass in-memory scores to the pipeline
+FUSED_SCORES = "scores"
+
+# how often (in seconds) to check that worker processes are still alive
+EVENTS_TIMEOUT = 5.0
+
+
+def _get_pipeline(
+    Pipeline: type, pipeline_params: Optional[Dict], output_dir: Path, fused: bool
+):
+    """Instantiate pipeline (and its metric) used by `apply_pretrained`
+
+    Returns
+    -------
+    pipeline : `Pipeline`
+        None when there is no such thing for current task, or when its
+        parameters are not available.
+    metric : `pyannote.metrics` metric
+        None when not available.
+    """
+
+    if Pipeline is None or pipeline_params is None:
+        return None, None
+
+    # fused pipeline reads in-memory scores from protocol files rather
+    # than loading them back from disk
+    pipeline = Pipeline(scores=f"@{FUSED_SCORES}" if fused else output_dir)
+    pipeline.instantiate(pipeline_params)
+
+    try:
+        metric = pipeline.get_metric()
+    except NotImplementedError as e:
+        metric = None
+
+    return pipeline, metric
+
+
+def _get_stages(
+    pretrained,
+    precomputed: Precomputed,
+    pipeline=None,
+    fp=None,
+    fused: bool = True,
+    resume: bool = False,
+) -> StagedPipeline:
+    """Build reader / inference / writer stages used to apply `pretrained`
+
+    The reader stage prefetches and decodes the next files while the model
+    processes the current one, and the writer stage dumps model output in the
+    background.
+
+    Parameters
+    ----------
+    pretrained : `Pretrained` or `Wrapper`
+    precomputed : `Precomputed`
+        Where to dump model output.
+    pipeline : `Pipeline`, optional
+        When provided, applied to each file once its model output is available.
+    fp : file, optional
+        Where to write pipeline output (in RTTM format).
+    fused : `bool`, optional
+        Feed in-memory model output to `pipeline` right after inference, while
+        it is dumped asynchronously. `pipeline` is expected to read scores from
+        the `FUSED_SCORES` key of protocol files. When False, `pipeline` is
+        applied once model output has been dumped, and is expected to load it
+        back from disk. Defaults to True.
+    resume : `bool`, optional
+        Skip inference for files whose model output has already been dumped.
+        Defaults to False.
+
+    Returns
+    -------
+    stages : `StagedPipeline`
+        Processes files and yields (current_file, hypothesis) tuples, where
+        hypothesis is None when `pipeline` is not provided.
+    """
+
+    raw_audio = getattr(pretrained, "raw_audio_", None)
+    if raw_audio is not None and raw_audio.sample_rate is not None:
+        # augmentation is taken care of by the model itself
+        raw_audio = RawAudio(sample_rate=raw_audio.sample_rate, mono=raw_audio.mono)
+    else:
+        raw_audio = None
+
+    fused = fused and pipeline is not None
+
+    def read(current_file):
+
+        item = {"file": current_file, "scores": None, "hypothesis": None}
+
+        if resume and Path(precomputed.get_path(current_file)).exists():
+            if fused:
+                item["scores"] = precomputed(current_file)
+            return item
+
+        if raw_audio is None:
+            item["decoded"] = current_file
+            return item
+
+        # decoded waveform is already converted to mono, resampled, and
+        # restricted to the requested channel
+        decoded = dict(current_file)
+        decoded["waveform"] = raw_audio(current_file).data
+        decoded.pop("channel", None)
+        item["decoded"] = decoded
+        return item
+
+    def infer(item):
+        decoded = item.pop("decoded", None)
+        if decoded is not None:
+            with PROFILER.stage("inference", current_file=item["file"]):
+                item["scores"] = pretrained(decoded)
+            item["dump"] = True
+        return item
+
+    def dump(item):
+        if item.pop("dump", False):
+            precomputed.dump(item["file"], item["scores"])
+        if not fused:
+            item["scores"] = None
+        return item
+
+    def apply(item):
+        current_file = item["file"]
+        if fused:
+            current_file = dict(current_file)
+            current_file[FUSED_SCORES] = item["scores"]
+        item["hypothesis"] = pipeline(current_file)
+        return item
+
+    def write(item):
+        item = dump(item)
+        if item["hypothesis"] is not None:
+            pipeline.write_rttm(fp, item["hypothesis"])
+        return item["file"], item["hypothesis"]
+
+    # reading is mostly I/O-bound: use two threads
+    stages = [Stage("read", read, n_threads=2), Stage("infer", infer)]
+
+    if pipeline is None:
+        stages.append(Stage("write", write))
+    elif fused:
+        stages.extend([Stage("apply", apply), Stage("write", write)])
+    else:
+        # pipeline loads model output back from disk: wait for it to be dumped
+        stages.extend(
+            [Stage("dump", dump), Stage("apply", apply), Stage("write", write)]
+        )
+
+    return StagedPipeline(stages, maxsize=2)
+
+
+def _apply_worker(
+    worker: int,
+    build_pretrained,
+    protocol_name: Text,
+    subset: Subset,
+    output_dir: Path,
+    Pipeline: type,
+    pipeline_params: Optional[Dict],
+    fused: bool,
+    n_threads: int,
+    uris,
+    events,
+):
+    """Apply pretrained model (and pipeline) on files taken from `uris` queue
+
+    Sends ("file", (uri, hypothesis)) to `events` queue after each file, and
+    ("done", None) once `uris` queue is exhausted (or ("error", message) on
+    failure). Pipeline output is evaluated by the parent process.
+    """
+
+    try:
+        configure_worker(n_threads, n_threads)
+
+        # load model once per worker
+        pretrained = build_pretrained()
+        precomputed = Precomputed(root_dir=output_dir)
+
+        protocol = _get_protocol(pretrained, protocol_name)
+        files = {
+            get_unique_identifier(current_file): current_file
+            for current_file in getattr(protocol, subset)()
+        }
+
+        pipeline, _ = _get_pipeline(Pipeline, pipeline_params, output_dir, fused)
+
+        def get_files():
+            while True:
+                uri = uris.get()
+                if uri is None:
+                    return
+                yield files[uri]
+
+        with ExitStack() as stack:
+
+            fp = None
+            if pipeline is not None:
+                shard = output_dir / f"{protocol_name}.{subset}.rttm.{worker:03d}"
+                fp = stack.enter_context(open(shard, "w"))
+
+            # files processed by a previous (interrupted) run are not
+            # processed again
+            stages = _get_stages(
+                pretrained,
+                precomputed,
+                pipeline=pipeline,
+                fp=fp,
+                fused=fused,
+                resume=True,
+            )
+            for current_file, hypothesis in stages(get_files()):
+                uri = get_unique_identifier(current_file)
+                events.put(("file", (uri, hypothesis)))
+
+        events.put(("done", None))
+
+    except Exception as e:
+        events.put(("error", f"Worker #{worker:d} failed: {e!r}"))
+        raise
+
+
+def _apply_parallel(
+    plan,
+    build_pretrained,
+    protocol,
+    protocol_name: Text,
+    subset: Subset,
+    output_dir: Path,
+    Pipeline: type,
+    pipeline_params: Optional[Dict],
+    fused: bool,
+):
+    """Apply pretrained model (and pipeline) using a pool of worker processes
+
+    Returns
+    -------
+    metric : `pyannote.metrics` metric
+        Metric aggregated over all workers. None when not available.
+    """
+
+    # process longest files first to avoid ending up with one worker
+    # still processing a long file while all others are idle
+    files = sorted(
+        getattr(protocol, subset)(),
+        key=lambda current_file: current_file["duration"],
+        reverse=True,
+    )
+
+    # "spawn" prevents OpenMP deadlocks in forked processes
+    context = multiprocessing.get_context("spawn")
+    uris, events = context.Queue(), context.Queue()
+    for current_file in files:
+        uris.put(get_unique_identifier(current_file))
+    for _ in range(plan.n_workers):
+        uris.put(None)
+
+    workers = [
+        context.Process(
+            target=_apply_worker,
+            args=(
+                worker,
+                build_pretrained,
+                protocol_name,
+                subset,
+                output_dir,
+                Pipeline,
+                pipeline_params,
+                fused,
+                plan.worker_threads,
+                uris,
+                events,
+            ),
+            daemon=True,
+        )
+        for worker in range(plan.n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # pipeline output is evaluated here, as files are processed by workers
+    _, metric = _get_pipeline(Pipeline, pipeline_params, output_dir, fused)
+    references = {
+        get_unique_identifier(current_file): current_file for current_file in files
+    }
+
+    n_done = 0
+    with tqdm(total=len(files), desc=f"{subset.title()}", unit="file") as progress:
+        while n_done < len(workers):
+
+            try:
+                kind, value = events.get(timeout=EVENTS_TIMEOUT)
+            except queue.Empty:
+                # workers killed by the system (e.g. out of memory) or by a
+                # signal do not get a chance to report their failure
+                dead = [
+                    (w, worker.exitcode)
+                    for w, worker in enumerate(workers)
+                    if worker.exitcode not in (None, 0)
+                ]
+                if not dead:
+                    continue
+                kind = "error"
+                value = ", ".join(
+                    f"Worker #{w:d} died unexpectedly (exit code: {exitcode:d})"
+                    for w, exitcode in dead
+                )
+
+            if kind == "file":
+                progress.update(1)
+                uri, hypothesis = value
+                current_file = references[uri]
+                reference = current_file.get("annotation", None)
+                if reference is None:
+                    metric = None
+                if metric is not None and hypothesis is not None:
+                    uem = get_annotated(current_file)
+                    _ = metric(reference, hypothesis, uem=uem)
+
+            elif kind == "done":
+                n_done += 1
+
+            else:
+                for worker in workers:
+                    worker.terminate()
+                raise RuntimeError(value)
+
+    for worker in workers:
+        worker.join()
+
+    if Pipeline is None or pipeline_params is None:
+        return None
+
+    # merge per-worker RTTM shards
+    output_rttm = output_dir / f"{protocol_name}.{subset}.rttm"
+    shards = [
+        output_dir / f"{protocol_name}.{subset}.rttm.{worker:03d}"
+        for worker in range(plan.n_workers)
+    ]
+    with atomic_open(output_rttm) as fp:
+        for shard in shards:
+            with open(shard, "r") as shard_fp:
+                fp.write(shard_fp.read())
+    for shard in shards:
+        shard.unlink()
+
+    return metric
+
+
 def apply_pretrained(
     validate_dir: Path,
     protocol_name: Text,
@@ -523,9 +991,13 @@ def apply_pretrained(
     duration: Optional[float] = None,
     step: float = 0.25,
     device: Optional[torch.device] = None,
-    batch_size: int = 32,
+    batch_size: Optional[int] = None,
     pretrained: Optional[str] = None,
     Pipeline: type = None,
+    cpus: Optional[int] = None,
+    n_jobs: int = 1,
+    fused: bool = True,
+    profile: bool = False,
     **kwargs,
 ):
     """Apply pre-trained model
@@ -540,18 +1012,40 @@ def apply_pretrained(
     step : `float`, optional
     device : `torch.device`, optional
     batch_size : `int`, optional
+        Defaults to the batch size tuned for this model on this host, if any,
+        and to 32 otherwise. See `pyannote.audio.features.autotune`.
     pretrained : `str`, optional
     Pipeline : `type`
+    cpus : `int`, optional
+        Total number of CPUs. See `pyannote.audio.utils.resources.plan_resources`.
+    n_jobs : `int`, optional
+        Number of worker processes. When greater than 1, each worker loads the
+        model once and processes files (longest first) taken from a shared
+        queue. Files whose scores are already available in the output
+        directory are not processed again, so that an interrupted run can be
+        resumed. Defaults to 1 (sequential processing).
+    fused : `bool`, optional
+        Feed in-memory scores to the pipeline right after inference (while
+        they are dumped in the background) rather than loading them back from
+        disk. Defaults to True.
+    profile : `bool`, optional
+        Profile inference and pipeline stages (see
+        `pyannote.audio.utils.profiler`) and export the report as JSON and
+        tensorboard scalars in the output directory. Utilization of reading,
+        inference, and writing stages is printed as well. Not supported (and
+        therefore ignored) when n_jobs is greater than 1. Defaults to False.
     """
 
     if pretrained is None:
-        pretrained = Pretrained(
+        build_pretrained = partial(
+            Pretrained,
             validate_dir=validate_dir,
             duration=duration,
             step=step,
             batch_size=batch_size,
             device=device,
         )
+        pretrained = build_pretrained()
         output_dir = validate_dir / "apply" / f"{pretrained.epoch_:04d}"
     else:
 
@@ -560,13 +1054,24 @@ def apply_pretrained(
         else:
             output_dir = validate_dir
 
-        pretrained = Wrapper(
+        build_pretrained = partial(
+            Wrapper,
             pretrained,
             duration=duration,
             step=step,
             batch_size=batch_size,
             device=device,
         )
+        pretrained = build_pretrained()
+
+    # use number of intra-op threads tuned for this model on this host, if any
+    plan = plan_resources(
+        "apply",
+        budget=cpus,
+        n_jobs=n_jobs,
+        num_threads=getattr(pretrained, "num_threads", None),
+    ).apply()
+    print(plan.report())
 
     params = {}
     try:
@@ -585,47 +1090,59 @@ def apply_pretrained(
     )
 
     # file generator
-    preprocessors = getattr(pretrained, "preprocessors_", dict())
-    if "audio" not in preprocessors:
-        preprocessors["audio"] = FileFinder()
-    if "duration" not in preprocessors:
-        preprocessors["duration"] = get_audio_duration
-    protocol = get_protocol(protocol_name, preprocessors=preprocessors)
-
-    files = getattr(protocol, subset)()
-    for current_file in tqdm(iterable=files, desc=f"{subset.title()}", unit="file"):
-        fX = pretrained(current_file)
-        precomputed.dump(current_file, fX)
-
-    # do not proceed with the full pipeline
-    # when there is no such thing for current task
-    if Pipeline is None:
-        return
+    protocol = _get_protocol(pretrained, protocol_name)
 
     # do not proceed with the full pipeline when its parameters cannot be loaded.
     # this might happen when applying a model that has not been validated yet
-    try:
-        pipeline_params = pretrained.pipeline_params_
-    except AttributeError as e:
+    pipeline_params = getattr(pretrained, "pipeline_params_", None)
+
+    if plan.n_workers > 1:
+        metric = _apply_parallel(
+            plan,
+            build_pretrained,
+            protocol,
+            protocol_name,
+            subset,
+            output_dir,
+            Pipeline,
+            pipeline_params,
+            fused,
+        )
+
+        if metric is not None:
+            output_eval = output_dir / f"{protocol_name}.{subset}.eval"
+            with open(output_eval, "w") as fp:
+                fp.write(str(metric))
+
         return
 
-    # instantiate pipeline
-    pipeline = Pipeline(scores=output_dir)
-    pipeline.instantiate(pipeline_params)
+    # instantiate pipeline (unless there is no such thing for current task)
+    # and load pipeline metric (when available)
+    pipeline, metric = _get_pipeline(Pipeline, pipeline_params, output_dir, fused)
 
-    # load pipeline metric (when available)
-    try:
-        metric = pipeline.get_metric()
-    except NotImplementedError as e:
-        metric = None
+    if profile:
+        PROFILER.reset()
+        PROFILER.enable()
 
-    # apply pipeline and dump output to RTTM files
-    output_rttm = output_dir / f"{protocol_name}.{subset}.rttm"
-    with open(output_rttm, "w") as fp:
+    with ExitStack() as stack:
+
+        fp = None
+        if pipeline is not None:
+            # apply pipeline and dump output to RTTM files
+            output_rttm = output_dir / f"{protocol_name}.{subset}.rttm"
+            fp = stack.enter_context(atomic_open(output_rttm))
+
+        # reading, inference, and writing are overlapped
+        stages = _get_stages(
+            pretrained, precomputed, pipeline=pipeline, fp=fp, fused=fused
+        )
         files = getattr(protocol, subset)()
-        for current_file in tqdm(iterable=files, desc=f"{subset.title()}", unit="file"):
-            hypothesis = pipeline(current_file)
-            pipeline.write_rttm(fp, hypothesis)
+        for current_file, hypothesis in tqdm(
+            iterable=stages(files), desc=f"{subset.title()}", unit="file"
+        ):
+
+            if pipeline is None:
+                continue
 
             # compute evaluation metric (when possible)
             reference = current_file.get("annotation", None)
@@ -639,6 +1156,15 @@ def apply_pretrained(
             uem = get_annotated(current_file)
             _ = metric(reference, hypothesis, uem=uem)
 
+    if profile:
+        print(stages.report())
+        PROFILER.disable()
+        print(PROFILER.summary())
+        PROFILER.to_json(output_dir / f"{protocol_name}.{subset}.profile.json")
+        writer = SummaryWriter(log_dir=str(output_dir))
+        PROFILER.to_tensorboard(writer, prefix=f"profile/{protocol_name}.{subset}")
+        writer.close()
+
     # print pipeline metric (when available)
     if metric is None:
         return
@@ -33,6 +33,7 @@ from .base_labeling import BaseLabeling
 from pyannote.database import get_annotated
 
 from pyannote.audio.features import Pretrained
+from pyannote.audio.pipeline.sweep import SegmentationSweep
 from pyannote.audio.pipeline.speaker_change_detection import (
     SpeakerChangeDetection as SpeakerChangeDetectionPipeline,
 )
@@ -65,6 +66,7 @@ class SpeakerChangeDetection(BaseLabeling):
         n_jobs=1,
         duration=None,
         step=0.25,
+        quantize=None,
         **kwargs
     ):
 
@@ -76,6 +78,7 @@ class SpeakerChangeDetection(BaseLabeling):
             step=step,
             batch_size=batch_size,
             device=device,
+            quantize=quantize,
         )
 
         for current_file in validation_data:
@@ -84,6 +87,33 @@ class SpeakerChangeDetection(BaseLabeling):
         # pipeline
         pipeline = self.Pipeline(scores="@scores", fscore=True, diarization=diarization)
 
+        if diarization:
+            threshold, value = self._validate_diarization(
+                pipeline, validation_data, n_jobs=n_jobs
+            )
+
+        else:
+            # evaluate all peak detection thresholds in one pass
+            sweep = SegmentationSweep(min_duration=0.100)
+            for current_file in validation_data:
+                sweep.update(
+                    pipeline.get_probability(current_file), current_file["annotation"]
+                )
+            optimum = sweep.optimum()
+            threshold, value = optimum["alpha"], optimum["value"]
+
+        return {
+            "metric": self.validation_criterion(None, diarization=diarization),
+            "minimize": False,
+            "value": value,
+            "pipeline": pipeline.instantiate(
+                {"alpha": threshold, "min_duration": 0.100}
+            ),
+        }
+
+    def _validate_diarization(self, pipeline, validation_data, n_jobs=1):
+        """Optimize peak detection threshold for diarization purity/coverage"""
+
         def fun(threshold):
             pipeline.instantiate({"alpha": threshold, "min_duration": 0.100})
             metric = pipeline.get_metric(parallel=True)
@@ -100,13 +130,4 @@ class SpeakerChangeDetection(BaseLabeling):
             fun, bounds=(0.0, 1.0), method="bounded", options={"maxiter": 10}
         )
 
-        threshold = res.x.item()
-
-        return {
-            "metric": self.validation_criterion(None, diarization=diarization),
-            "minimize": False,
-            "value": float(1.0 - res.fun),
-            "pipeline": pipeline.instantiate(
-                {"alpha": threshold, "min_duration": 0.100}
-            ),
-        }
+        return res.x.item(), float(1.0 - res.fun)
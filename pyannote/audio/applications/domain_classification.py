@@ -108,6 +108,7 @@ class DomainClassification(BaseLabeling):
         n_jobs=1,
         duration=None,
         step=0.25,
+        quantize=None,
         **kwargs
     ):
 
@@ -118,6 +119,7 @@ class DomainClassification(BaseLabeling):
             step=step,
             batch_size=batch_size,
             device=device,
+            quantize=quantize,
         )
 
         domain = self.task_.domain
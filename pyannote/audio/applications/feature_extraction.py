@@ -30,7 +30,7 @@
 Feature extraction
 
 Usage:
-  pyannote-speech-feature [--robust --parallel] <experiment_dir> <database.task.protocol>
+  pyannote-speech-feature [--robust --parallel --cpus=<n>] <experiment_dir> <database.task.protocol>
   pyannote-speech-feature check <experiment_dir> <database.task.protocol>
   pyannote-speech-feature -h | --help
   pyannote-speech-feature --version
@@ -43,6 +43,9 @@ Options:
   <database.task.protocol>   Set evaluation protocol (e.g. "Etape.SpeakerDiarization.TV")
   --robust                   When provided, skip files for which feature extraction fails.
   --parallel                 When provided, process files in parallel.
+  --cpus=<n>                 Use at most that many CPUs. Defaults to the value
+                             of PYANNOTE_AUDIO_CPUS environment variable, or to
+                             all available CPUs.
   -h --help                  Show this screen.
   --version                  Show version.
 
@@ -79,8 +82,7 @@ from pyannote.core.utils.helper import get_class_by_name
 from pyannote.audio.features import Precomputed
 from pyannote.audio.features.utils import get_audio_duration
 from pyannote.audio.features.precomputed import PyannoteFeatureExtractionError
-
-from multiprocessing import cpu_count, Pool
+from pyannote.audio.utils.resources import plan_resources
 
 
 def init_feature_extraction(experiment_dir):
@@ -163,7 +165,13 @@ def helper_extract(
     )
 
 
-def extract(protocol_name, file_finder, experiment_dir, robust=False, parallel=False):
+def extract(
+    protocol_name, file_finder, experiment_dir, robust=False, parallel=False, cpus=None
+):
+
+    plan = plan_resources("extract", budget=cpus, n_jobs=None if parallel else 1)
+    plan.apply()
+    print(plan.report())
 
     protocol = get_protocol(protocol_name)
 
@@ -200,8 +208,7 @@ def extract(protocol_name, file_finder, experiment_dir, robust=False, parallel=F
             robust=robust,
         )
 
-        n_jobs = cpu_count()
-        pool = Pool(n_jobs)
+        pool = plan.pool()
         imap = pool.imap
 
     else:
@@ -275,6 +282,12 @@ def main():
     else:
         robust = arguments["--robust"]
         parallel = arguments["--parallel"]
+        cpus = arguments["--cpus"]
         extract(
-            protocol_name, file_finder, experiment_dir, robust=robust, parallel=parallel
+            protocol_name,
+            file_finder,
+            experiment_dir,
+            robust=robust,
+            parallel=parallel,
+            cpus=None if cpus is None else int(cpus),
         )
@@ -199,14 +199,28 @@ Common options
 
   --batch=<size>          Set batch size used for validation and inference.
                           Has no effect when training as this parameter should
-                          be defined in the configuration file [default: 32].
+                          be defined in the configuration file. Defaults to
+                          the batch size tuned for this model on this host
+                          (see pyannote.audio.features.autotune), or to 32.
 
   --step=<ratio>          Ratio of audio chunk duration used as step between
                           two consecutive audio chunks [default: 0.25]
 
   --parallel=<n_jobs>     Use at most that many threads for generating training
-                          samples or validating files. Defaults to using all
-                          CPUs but one.
+                          samples (capped by a quarter of the CPUs) or
+                          validating files. Defaults to using all CPUs but
+                          one. When applying, use that many worker
+                          processes (each loading its own copy of the model)
+                          instead. Interrupted runs can then be resumed as
+                          files already processed are skipped. Defaults to 1
+                          when applying.
+
+  --cpus=<n>              Use at most that many CPUs overall. They are shared
+                          between worker processes, background threads, torch
+                          threads, and BLAS threads depending on the task, and
+                          the effective layout is logged at startup. Defaults
+                          to the value of PYANNOTE_AUDIO_CPUS environment
+                          variable, or to all available CPUs.
 
 
 Speaker embedding
@@ -257,6 +271,17 @@ Validation options
   embedding), and looks for the threshold that maximizes the f-score of purity
   and coverage.
 
+Application options
+~~~~~~~~~~~~~~~~~~~
+
+  --profile               Report wall time, CPU time, peak memory increase, and
+                          real-time factor of each stage of the pipeline. The
+                          report is printed, dumped as JSON next to the RTTM
+                          output, and sent to tensorboard. Only supported with
+                          sequential processing (i.e. without --parallel).
+                          Utilization of reading, inference, and writing
+                          threads is printed as well.
+
 """
 
 import sys
@@ -318,6 +343,9 @@ def main():
         n_jobs = max(1, multiprocessing.cpu_count() - 1)
     params["n_jobs"] = int(n_jobs)
 
+    cpus = arg["--cpus"]
+    params["cpus"] = None if cpus is None else int(cpus)
+
     if arg["train"]:
 
         params["subset"] = "train" if subset is None else subset
@@ -382,7 +410,8 @@ def main():
 
         params["every"] = int(arg["--every"])
         params["chronological"] = not arg["--evergreen"]
-        params["batch_size"] = int(arg["--batch"])
+        batch_size = arg["--batch"]
+        params["batch_size"] = None if batch_size is None else int(batch_size)
 
         params["diarization"] = arg["--diarization"]
 
@@ -424,7 +453,8 @@ def main():
         validate_dir = Path(arg["<validate>"]).expanduser().resolve(strict=True)
 
         params["subset"] = "test" if subset is None else subset
-        params["batch_size"] = int(arg["--batch"])
+        batch_size = arg["--batch"]
+        params["batch_size"] = None if batch_size is None else int(batch_size)
 
         duration = arg["--duration"]
         if duration is not None:
@@ -435,5 +465,10 @@ def main():
         params["Pipeline"] = getattr(Application, "Pipeline", None)
 
         params["pretrained"] = arg["--pretrained"]
+        params["profile"] = arg["--profile"]
+
+        # one worker process per job: only when explicitly requested
+        if arg["--parallel"] is None:
+            params["n_jobs"] = 1
 
         apply_pretrained(validate_dir, protocol, **params)
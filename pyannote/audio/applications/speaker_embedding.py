@@ -143,6 +143,7 @@ class SpeakerEmbedding(Application):
         duration: float = None,
         step: float = 0.25,
         metric: str = None,
+        quantize: Optional[Text] = None,
         **kwargs,
     ):
 
@@ -154,6 +155,7 @@ class SpeakerEmbedding(Application):
             step=step,
             batch_size=batch_size,
             device=device,
+            quantize=quantize,
         )
 
         preprocessors = self.preprocessors_
@@ -206,6 +208,7 @@ class SpeakerEmbedding(Application):
         duration: float = None,
         step: float = 0.25,
         metric: str = None,
+        quantize: Optional[Text] = None,
         **kwargs,
     ):
 
@@ -217,6 +220,7 @@ class SpeakerEmbedding(Application):
             step=step,
             batch_size=batch_size,
             device=device,
+            quantize=quantize,
         )
 
         preprocessors = self.preprocessors_
@@ -27,23 +27,15 @@
 # Hervé BREDIN - http://herve.niderb.fr
 
 
-from functools import partial
-import scipy.optimize
 from .base_labeling import BaseLabeling
 from pyannote.database import get_annotated
 from pyannote.audio.features import Pretrained
+from pyannote.audio.pipeline.sweep import DetectionSweep
 from pyannote.audio.pipeline import (
     SpeechActivityDetection as SpeechActivityDetectionPipeline,
 )
 
 
-def validate_helper_func(current_file, pipeline=None, metric=None):
-    reference = current_file["annotation"]
-    uem = get_annotated(current_file)
-    hypothesis = pipeline(current_file)
-    return metric(reference, hypothesis, uem=uem)
-
-
 class SpeechActivityDetection(BaseLabeling):
 
     Pipeline = SpeechActivityDetectionPipeline
@@ -60,6 +52,7 @@ class SpeechActivityDetection(BaseLabeling):
         n_jobs=1,
         duration=None,
         step=0.25,
+        quantize=None,
         **kwargs,
     ):
 
@@ -71,45 +64,30 @@ class SpeechActivityDetection(BaseLabeling):
             step=step,
             batch_size=batch_size,
             device=device,
+            quantize=quantize,
         )
 
-        for current_file in validation_data:
-            current_file["scores"] = pretrained(current_file)
-
         # pipeline
         pipeline = self.Pipeline(scores="@scores", fscore=True)
 
-        def fun(threshold):
-            pipeline.instantiate(
-                {
-                    "onset": threshold,
-                    "offset": threshold,
-                    "min_duration_on": 0.100,
-                    "min_duration_off": 0.100,
-                    "pad_onset": 0.0,
-                    "pad_offset": 0.0,
-                }
+        # evaluate a dense grid of thresholds in one pass
+        sweep = DetectionSweep(min_duration_on=0.100, min_duration_off=0.100, fscore=True)
+
+        for current_file in validation_data:
+            current_file["scores"] = pretrained(current_file)
+            sweep.update(
+                pipeline.get_probability(current_file),
+                pipeline.get_reference(current_file),
+                uem=get_annotated(current_file),
             )
-            metric = pipeline.get_metric(parallel=True)
-            validate = partial(validate_helper_func, pipeline=pipeline, metric=metric)
-            if n_jobs > 1:
-                _ = self.pool_.map(validate, validation_data)
-            else:
-                for file in validation_data:
-                    _ = validate(file)
-
-            return 1.0 - abs(metric)
-
-        res = scipy.optimize.minimize_scalar(
-            fun, bounds=(0.0, 1.0), method="bounded", options={"maxiter": 10}
-        )
 
-        threshold = res.x.item()
+        optimum = sweep.optimum()
+        threshold = optimum["onset"]
 
         return {
             "metric": self.validation_criterion(None),
             "minimize": False,
-            "value": float(1.0 - res.fun),
+            "value": optimum["value"],
             "pipeline": pipeline.instantiate(
                 {
                     "onset": threshold,
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Inference batch size and thread autotuner
+
+>>> from pyannote.audio.features import Pretrained
+>>> from pyannote.audio.features.autotune import autotune
+>>> pretrained = Pretrained(validate_dir=..., device="cpu")
+>>> best, results = autotune(pretrained)
+
+The best configuration is stored in a profile file (defaults to
+~/.pyannote/autotune.yml, or PYANNOTE_AUDIO_AUTOTUNE environment variable),
+indexed by host and model. `Pretrained` instances then automatically use the
+tuned batch size, unless `batch_size` is provided. The tuned number of threads
+is applied once per process by `pyannote.audio.utils.resources.plan_resources`.
+"""
+
+import os
+import time
+import platform
+import itertools
+import multiprocessing
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Text
+from typing import Tuple
+from typing import Union
+
+import yaml
+import numpy as np
+import torch
+
+from pyannote.audio.utils.path import mkdir_p
+from pyannote.audio.utils.path import atomic_open
+from pyannote.audio.utils.profiler import _get_max_rss
+from .cache import get_file_checksum
+
+DEFAULT_PROFILE = "~/.pyannote/autotune.yml"
+
+
+def get_profile_path(profile: Optional[Union[Text, Path]] = None) -> Path:
+    """Get path to autotuning profile file"""
+    if profile is None:
+        profile = os.environ.get("PYANNOTE_AUDIO_AUTOTUNE", DEFAULT_PROFILE)
+    return Path(profile).expanduser().resolve(strict=False)
+
+
+def get_host_key() -> Text:
+    """Get key identifying current host in autotuning profile"""
+    return f"{platform.node()}/{os.cpu_count()}cpu"
+
+
+def get_model_key(pretrained) -> Text:
+    """Get key identifying `Pretrained` model in autotuning profile
+
+    Best configuration depends on model weights, device type, quantization,
+    and chunk duration.
+    """
+    checksum = get_file_checksum(pretrained.weights_pt_)[:16]
+    key = f"{checksum}/{pretrained.device.type}/{pretrained.duration:g}s"
+    quantize = getattr(pretrained, "quantize", None)
+    if quantize is not None:
+        key = f"{key}/{quantize}"
+    return key
+
+
+def load_profile(pretrained, profile: Optional[Union[Text, Path]] = None) -> Dict:
+    """Load tuned configuration of `Pretrained` model on current host
+
+    Parameters
+    ----------
+    pretrained : Pretrained
+    profile : Path, optional
+        Path to profile file. See `get_profile_path`.
+
+    Returns
+    -------
+    config : dict
+        Tuned configuration (with "batch_size", "num_threads", "rtf", and
+        "peak_rss" keys). Empty when not available.
+    """
+
+    path = get_profile_path(profile)
+    if not path.exists():
+        return dict()
+
+    try:
+        with open(path, "r") as fp:
+            content = yaml.load(fp, Loader=yaml.SafeLoader) or dict()
+        return dict(content[get_host_key()][get_model_key(pretrained)])
+    except (KeyError, TypeError, OSError, yaml.YAMLError):
+        return dict()
+
+
+def save_profile(
+    pretrained, config: Dict, profile: Optional[Union[Text, Path]] = None
+):
+    """Store tuned configuration of `Pretrained` model on current host
+
+    Parameters
+    ----------
+    pretrained : Pretrained
+    config : dict
+        Tuned configuration.
+    profile : Path, optional
+        Path to profile file. See `get_profile_path`.
+    """
+
+    path = get_profile_path(profile)
+    mkdir_p(path.parent)
+
+    content = dict()
+    if path.exists():
+        with open(path, "r") as fp:
+            content = yaml.load(fp, Loader=yaml.SafeLoader) or dict()
+
+    host = content.setdefault(get_host_key(), dict())
+    host[get_model_key(pretrained)] = dict(config)
+
+    # concurrent readers never see a partially written profile
+    with atomic_open(path) as fp:
+        yaml.dump(content, fp, default_flow_style=False)
+
+
+def _worker(pretrained, waveform, batch_size, num_threads, queue):
+
+    torch.set_num_threads(num_threads)
+    pretrained.batch_size = batch_size
+    sample_rate = pretrained.sample_rate
+
+    # warm-up (memory allocation, lazy initialization, etc.)
+    n_samples = int(pretrained.duration * sample_rate)
+    pretrained.get_features(waveform[:n_samples], sample_rate)
+
+    start = time.perf_counter()
+    pretrained.get_features(waveform, sample_rate)
+    elapsed = time.perf_counter() - start
+
+    queue.put((elapsed, _get_max_rss()))
+
+
+def _benchmark(
+    pretrained, waveform: np.ndarray, batch_size: int, num_threads: int
+) -> Tuple[float, int]:
+    """Process `waveform` in a fresh worker process
+
+    Returns
+    -------
+    elapsed : float
+        Wall clock time needed to process `waveform`, in seconds.
+    peak_rss : int
+        Peak resident set size of the worker, in bytes.
+    """
+
+    # "spawn" prevents OpenMP deadlocks in forked processes
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+
+    worker = context.Process(
+        target=_worker,
+        args=(pretrained, waveform, batch_size, num_threads, queue),
+        daemon=True,
+    )
+    worker.start()
+    elapsed, peak_rss = queue.get()
+    worker.join()
+
+    return elapsed, peak_rss
+
+
+def autotune(
+    pretrained,
+    duration: float = 60.0,
+    batch_sizes: Sequence[int] = (8, 16, 32, 64, 128),
+    num_threads: Optional[Sequence[int]] = None,
+    max_rss: Optional[int] = None,
+    profile: Optional[Union[Text, Path]] = None,
+    save: bool = True,
+    seed: int = 0,
+) -> Tuple[Dict, List[Dict]]:
+    """Find best inference configuration of `Pretrained` model on current host
+
+    Each configuration is benchmarked in a fresh worker process, using
+    `num_threads` intra-op threads to process synthetic audio with
+    `batch_size` chunks per batch.
+
+    Parameters
+    ----------
+    pretrained : Pretrained
+        Pretrained model.
+    duration : float, optional
+        Duration of synthetic audio. Defaults to 60s.
+    batch_sizes : sequence of int, optional
+        Batch sizes. Defaults to (8, 16, 32, 64, 128).
+    num_threads : sequence of int, optional
+        Number of intra-op threads. Defaults to powers of two up to the number
+        of CPUs.
+    max_rss : int, optional
+        Discard configurations whose peak resident set size is larger than
+        `max_rss` bytes. Defaults to no limit.
+    profile : Path, optional
+        Path to profile file. See `get_profile_path`.
+    save : bool, optional
+        Store best configuration into profile file. Defaults to True.
+    seed : int, optional
+        Random seed used to generate synthetic audio.
+
+    Returns
+    -------
+    best : dict
+        Best configuration, with "batch_size", "num_threads", "rtf", and
+        "peak_rss" keys. "rtf" is the real-time factor, i.e. the time needed
+        to process one second of audio, and "peak_rss" is the peak memory
+        usage of the worker, in bytes.
+    results : list of dict
+        All benchmarked configurations (same keys as `best`).
+    """
+
+    n_cpus = os.cpu_count() or 1
+
+    if num_threads is None:
+        num_threads = [2 ** p for p in range(int(np.log2(n_cpus)) + 1)]
+
+    random_state = np.random.RandomState(seed)
+    n_samples = int(duration * pretrained.sample_rate)
+    waveform = 0.1 * random_state.randn(n_samples, 1).astype(np.float32)
+
+    results = []
+    for batch_size, threads in itertools.product(batch_sizes, num_threads):
+
+        # do not oversubscribe CPUs
+        if threads > n_cpus:
+            continue
+
+        elapsed, peak_rss = _benchmark(pretrained, waveform, batch_size, threads)
+
+        results.append(
+            {
+                "batch_size": int(batch_size),
+                "num_threads": int(threads),
+                "rtf": float(elapsed / duration),
+                "peak_rss": int(peak_rss),
+            }
+        )
+
+    candidates = [
+        result
+        for result in results
+        if max_rss is None or result["peak_rss"] <= max_rss
+    ]
+    if not candidates:
+        msg = "No configuration satisfies the constraints."
+        raise ValueError(msg)
+
+    best = min(candidates, key=lambda result: result["rtf"])
+
+    if save:
+        save_profile(pretrained, best, profile=profile)
+
+    return best, results
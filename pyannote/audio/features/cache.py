@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Persistent on-disk cache of model outputs"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from functools import lru_cache
+from typing import Optional
+from typing import Text
+from typing import Union
+
+import numpy as np
+
+from pyannote.audio.utils.path import mkdir_p
+from pyannote.audio.utils.path import atomic_open
+
+# default cache size (in bytes)
+DEFAULT_MAX_SIZE = 10 * 1024 ** 3
+
+
+@lru_cache(maxsize=1024)
+def _get_file_checksum(path: Text, size: int, mtime_ns: int) -> Text:
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for byte_block in iter(lambda: fp.read(1 << 20), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+
+def get_file_checksum(path: Union[Text, Path]) -> Text:
+    """Get SHA256 checksum of file content
+
+    Checksums are memoized (in memory) as long as the file size and
+    modification time do not change.
+
+    Parameters
+    ----------
+    path : Text or Path
+        Path to file.
+
+    Returns
+    -------
+    checksum : Text
+        Hexadecimal SHA256 checksum.
+    """
+    path = Path(path).expanduser().resolve()
+    stat = path.stat()
+    return _get_file_checksum(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def get_array_fingerprint(data: np.ndarray) -> Text:
+    """Get fingerprint of array content (including its type and shape)
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Array.
+
+    Returns
+    -------
+    fingerprint : Text
+        Hexadecimal SHA256 checksum.
+    """
+    data = np.ascontiguousarray(data)
+    sha256_hash = hashlib.sha256()
+    sha256_hash.update(f"{data.dtype.str}{data.shape}".encode())
+    sha256_hash.update(data.tobytes())
+    return sha256_hash.hexdigest()
+
+
+def get_audio_fingerprint(current_file: dict) -> Text:
+    """Get fingerprint of audio content
+
+    Parameters
+    ----------
+    current_file : dict
+        `pyannote.database` file. Either its "waveform" key (when available)
+        or the content of its "audio" file is used.
+
+    Returns
+    -------
+    fingerprint : Text
+        Hexadecimal SHA256 checksum.
+    """
+
+    if "waveform" in current_file:
+        return get_array_fingerprint(current_file["waveform"])
+
+    return get_file_checksum(current_file["audio"])
+
+
+class InferenceCache:
+    """Persistent on-disk cache of model outputs
+
+    Entries are stored as one uncompressed numpy file per key and are evicted
+    in least recently used order as soon as the total size of the cache
+    exceeds `max_size`. Writes are atomic so that the cache can be shared by
+    several processes.
+
+    Parameters
+    ----------
+    root_dir : Text or Path
+        Path to cache directory. It is created if it does not exist.
+    max_size : int, optional
+        Maximum total size of the cache, in bytes. Defaults to 10GB.
+
+    Usage
+    -----
+    >>> cache = InferenceCache("~/.pyannote/cache")
+    >>> key = cache.hash(checksum, epoch, duration, step)
+    >>> data = cache.get(key)
+    >>> if data is None:
+    ...     data = expensive_computation()
+    ...     cache.set(key, data)
+    """
+
+    def __init__(
+        self, root_dir: Union[Text, Path], max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        super().__init__()
+        self.root_dir = Path(root_dir).expanduser().resolve(strict=False)
+        mkdir_p(self.root_dir)
+        self.max_size = max_size
+
+    @staticmethod
+    def hash(*parts) -> Text:
+        """Build cache key from (JSON-serializable) parts"""
+        serialized = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def get_path(self, key: Text) -> Path:
+        return self.root_dir / key[:2] / f"{key}.npy"
+
+    def get(self, key: Text) -> Optional[np.ndarray]:
+        """Load cached entry
+
+        Parameters
+        ----------
+        key : Text
+            Cache key.
+
+        Returns
+        -------
+        data : np.ndarray or None
+            Cached data. None in case of cache miss.
+        """
+
+        path = self.get_path(key)
+
+        try:
+            data = np.load(path, allow_pickle=False)
+            # mark entry as recently used
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            # entry does not exist, has just been evicted, or is corrupted
+            return None
+
+        return data
+
+    def set(self, key: Text, data: np.ndarray):
+        """Store entry (and evict least recently used ones if needed)
+
+        Parameters
+        ----------
+        key : Text
+            Cache key.
+        data : np.ndarray
+            Data to cache.
+        """
+
+        path = self.get_path(key)
+        mkdir_p(path.parent)
+
+        # concurrent readers never see a partially written entry
+        with atomic_open(path, mode="wb") as fp:
+            np.save(fp, np.ascontiguousarray(data), allow_pickle=False)
+
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in self.root_dir.glob("*/*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    @property
+    def size(self) -> int:
+        """Total size of the cache, in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Evict least recently used entries until cache fits in `max_size`"""
+
+        if self.max_size is None:
+            return
+
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= self.max_size:
+            return
+
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+    def clear(self):
+        """Remove all entries"""
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
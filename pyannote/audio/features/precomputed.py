@@ -37,6 +37,7 @@ from numpy.lib.format import open_memmap
 from pyannote.core import SlidingWindow, SlidingWindowFeature
 from pyannote.database.util import get_unique_identifier
 from pyannote.audio.utils.path import mkdir_p
+from pyannote.audio.utils.path import atomic_open
 
 
 class PyannoteFeatureExtractionError(Exception):
@@ -261,4 +262,7 @@ class Precomputed:
     def dump(self, item, features):
         path = Path(self.get_path(item))
         mkdir_p(path.parent)
-        np.save(path, features.data)
+
+        # an interrupted dump never leaves a partially written file behind
+        with atomic_open(path, mode="wb") as fp:
+            np.save(fp, features.data)
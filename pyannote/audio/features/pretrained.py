@@ -23,15 +23,22 @@
 # AUTHOR
 # Hervé Bredin - http://herve.niderb.fr
 
+import os
+import copy
 import warnings
+import yaml
 from typing import Optional
 from typing import Union
 from typing import Text
+from typing import Callable
 from pathlib import Path
+from functools import partial
 
 import torch
+import torch.nn as nn
 import numpy as np
 
+from pyannote.core import Segment
 from pyannote.core import SlidingWindow
 from pyannote.core import SlidingWindowFeature
 
@@ -40,11 +47,33 @@ from pyannote.audio.train.model import RESOLUTION_CHUNK
 
 from pyannote.audio.augmentation import Augmentation
 from pyannote.audio.features import FeatureExtraction
+from pyannote.audio.features.cache import InferenceCache
+from pyannote.audio.features.cache import get_file_checksum
+from pyannote.audio.features.cache import get_audio_fingerprint
+from pyannote.audio.features.cache import get_array_fingerprint
+from pyannote.audio.features.registry import MODEL_REGISTRY
+from pyannote.audio.features.autotune import load_profile
+from pyannote.audio.utils.signal import to_probability
 
 from pyannote.audio.applications.config import load_config
 from pyannote.audio.applications.config import load_specs
 from pyannote.audio.applications.config import load_params
 
+QUANTIZE_DYNAMIC_INT8 = "dynamic-int8"
+
+GATE_ENERGY = "energy"
+# duration of frames used for computing short-term energy
+GATE_ENERGY_FRAME = 0.020
+# default energy gate threshold (in dB below peak energy)
+GATE_ENERGY_THRESHOLD = 40.0
+# default speech mask gate threshold (speech probability)
+GATE_MASK_THRESHOLD = 0.1
+
+
+# this needs to go here to make Pretrained instances pickable
+def _is_active(activity: SlidingWindowFeature, chunk: Segment) -> bool:
+    return bool(np.any(activity.crop(chunk, mode="loose")))
+
 
 class Pretrained(FeatureExtraction):
     """
@@ -63,8 +92,66 @@ class Pretrained(FeatureExtraction):
     step : float, optional
         Ratio of audio chunk duration used as step between two consecutive
         audio chunks. Defaults to 0.25.
+    batch_size : int, optional
+        Batch size used for inference. Defaults to the one tuned for this model
+        on this host, if any (see `pyannote.audio.features.autotune`), and to
+        32 otherwise.
     device : optional
     return_intermediate : optional
+    quantize : {"dynamic-int8"}, optional
+        Use "dynamic-int8" to apply dynamic int8 quantization to recurrent
+        (LSTM, GRU) and linear layers at load time. This is only supported
+        for CPU inference (and therefore implies CPU inference unless `device`
+        is provided) and might slightly change the output of the model: use
+        `Application.validate_quantization` to check its effect on the
+        validation metric. Defaults to no quantization.
+    cache : Path or InferenceCache, optional
+        Persistent on-disk cache of model outputs, keyed by model weights,
+        inference parameters, and audio content. When provided, processing the
+        same file twice with the same model only runs inference once. Defaults
+        to the value of PYANNOTE_AUDIO_CACHE environment variable, if set, and
+        to not using any cache otherwise.
+    gate : {"energy", "@key"}, optional
+        Skip audio chunks that do not contain any speech, and set their output
+        to NaN. Use "energy" to rely on a cheap short-term energy measure, or
+        "@key" (e.g. "@sad_scores") to rely on speech activity detection scores
+        already available in the "key" key of protocol files. Defaults to
+        processing every audio chunk.
+    gate_threshold : float, optional
+        With "energy" gate, frames whose energy is more than `gate_threshold`
+        dB below the peak energy of the file are considered silent. Defaults
+        to 40dB. With "@key" gate, frames whose speech probability is lower
+        than `gate_threshold` are considered non-speech. Defaults to 0.1.
+    stateful : bool, optional
+        Set to True to process consecutive non-overlapping chunks (instead of
+        overlapping ones) while carrying the state of recurrent layers from
+        one chunk to the next. Each frame is therefore processed only once.
+        This is only supported by causal models (e.g. `PyanNet` with
+        unidirectional recurrent layers) and falls back to overlapping chunks
+        otherwise. See `Model.slide` for details. Defaults to False.
+    share_encoder : bool, optional
+        Set to True to apply the encoder of the model (e.g. sinc filters of
+        `PyanNet`, or SincNet and frame-level TDNN layers of `SincTDNN`) only
+        once on blocks of consecutive overlapping chunks, instead of once per
+        chunk. Outputs might differ slightly from regular inference because
+        of numerical precision and frame alignment. Use
+        `pyannote.audio.utils.benchmark.benchmark_shared_encoder` to measure
+        both speedup and difference. Falls back to regular inference when the
+        model does not support it. See `Model.slide` for details. Defaults to
+        False.
+    gate_log_scale : bool, optional
+        With "@key" gate, set to True to indicate that speech activity
+        detection scores are log-probabilities, or to False to indicate that
+        they are probabilities. Defaults to guessing it from the scores (see
+        `pyannote.audio.utils.signal.to_probability`).
+
+    Notes
+    -----
+    Configurations and models are loaded through the process-wide model
+    registry (see `pyannote.audio.features.registry`), so that `Pretrained`
+    instances sharing the same validation directory, epoch, and device also
+    share the same `model_` instance. It should therefore be considered as
+    read-only: use `copy.deepcopy(pretrained.model_)` before modifying it.
     """
 
     # TODO: add progress bar (at least for demo purposes)
@@ -76,10 +163,17 @@ class Pretrained(FeatureExtraction):
         augmentation: Optional[Augmentation] = None,
         duration: float = None,
         step: float = None,
-        batch_size: int = 32,
+        batch_size: int = None,
         device: Optional[Union[Text, torch.device]] = None,
         return_intermediate=None,
         progress_hook=None,
+        quantize: Optional[Text] = None,
+        cache: Optional[Union[Text, Path, InferenceCache]] = None,
+        gate: Optional[Text] = None,
+        gate_threshold: Optional[float] = None,
+        stateful: bool = False,
+        share_encoder: bool = False,
+        gate_log_scale: Optional[bool] = None,
     ):
 
         try:
@@ -97,11 +191,15 @@ class Pretrained(FeatureExtraction):
         train_dir = self.validate_dir.parents[1]
         root_dir = train_dir.parents[1]
 
-        config_yml = root_dir / "config.yml"
-        config = load_config(config_yml, training=False)
+        self.config_yml_ = root_dir / "config.yml"
+        config = MODEL_REGISTRY.get(
+            ("config", str(self.config_yml_)),
+            partial(load_config, self.config_yml_, training=False),
+        )
 
-        # use feature extraction from config.yml configuration file
-        self.feature_extraction_ = config["feature_extraction"]
+        # use (a copy of) feature extraction from config.yml configuration file
+        # as it is shared with other instances through the registry
+        self.feature_extraction_ = copy.deepcopy(config["feature_extraction"])
 
         super().__init__(
             augmentation=augmentation, sample_rate=self.feature_extraction_.sample_rate
@@ -109,9 +207,6 @@ class Pretrained(FeatureExtraction):
 
         self.feature_extraction_.augmentation = self.augmentation
 
-        specs_yml = train_dir / "specs.yml"
-        specifications = load_specs(specs_yml)
-
         if epoch is None:
             params_yml = self.validate_dir / "params.yml"
             params = load_params(params_yml)
@@ -121,22 +216,31 @@ class Pretrained(FeatureExtraction):
         else:
             self.epoch_ = epoch
 
-        self.preprocessors_ = config["preprocessors"]
+        self.preprocessors_ = dict(config["preprocessors"])
 
         self.weights_pt_ = train_dir / "weights" / f"{self.epoch_:04d}.pt"
 
-        model = config["get_model_from_specs"](specifications)
-        model.load_state_dict(
-            torch.load(self.weights_pt_, map_location=lambda storage, loc: storage)
-        )
-
-        # defaults to using GPU when available
+        # defaults to using GPU when available (and supported)
         if device is None:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+            if quantize is None and torch.cuda.is_available():
+                device = "cuda"
+            else:
+                device = "cpu"
         self.device = torch.device(device)
 
-        # send model to device
-        self.model_ = model.eval().to(self.device)
+        self.quantize = quantize
+
+        self.model_ = MODEL_REGISTRY.get(
+            ("model", str(self.weights_pt_), str(self.device), self.quantize),
+            partial(
+                self._load_model,
+                config["get_model_from_specs"],
+                train_dir / "specs.yml",
+                self.weights_pt_,
+                self.device,
+                quantize=self.quantize,
+            ),
+        )
 
         # initialize chunks duration with that used during training
         self.duration = getattr(config["task"], "duration", None)
@@ -164,11 +268,105 @@ class Pretrained(FeatureExtraction):
             duration=self.duration, step=self.step * self.duration
         )
 
+        # use configuration tuned for this model on this host, if any
+        self.autotuned_ = dict() if batch_size is not None else load_profile(self)
+        if batch_size is None:
+            batch_size = self.autotuned_.get("batch_size", 32)
         self.batch_size = batch_size
+        # tuned number of intra-op threads is not applied here (this is a
+        # process-wide setting) but by the resource plan. see plan_resources.
+        self.num_threads = self.autotuned_.get("num_threads", None)
 
         self.return_intermediate = return_intermediate
         self.progress_hook = progress_hook
 
+        if cache is None:
+            cache = os.environ.get("PYANNOTE_AUDIO_CACHE", None)
+        if cache is not None and not isinstance(cache, InferenceCache):
+            cache = InferenceCache(cache)
+        self.cache = cache
+
+        if gate is not None and gate != GATE_ENERGY and not gate.startswith("@"):
+            msg = f'"gate" must be either "{GATE_ENERGY}" or "@key" (is: "{gate}").'
+            raise ValueError(msg)
+        self.gate = gate
+        if gate_threshold is None:
+            gate_threshold = (
+                GATE_ENERGY_THRESHOLD if gate == GATE_ENERGY else GATE_MASK_THRESHOLD
+            )
+        self.gate_threshold = gate_threshold
+        self.gate_log_scale = gate_log_scale
+
+        self.stateful = stateful
+        self.share_encoder = share_encoder
+
+    @classmethod
+    def _load_model(
+        cls,
+        get_model_from_specs: Callable,
+        specs_yml: Path,
+        weights_pt: Path,
+        device: torch.device,
+        quantize: Optional[Text] = None,
+    ) -> nn.Module:
+        """Build model, load its weights, and send it to device"""
+
+        specifications = load_specs(specs_yml)
+        model = get_model_from_specs(specifications)
+        model.load_state_dict(
+            torch.load(weights_pt, map_location=lambda storage, loc: storage)
+        )
+        model.eval()
+
+        # quantize model (when requested)
+        if quantize is not None:
+            model = cls._quantize(model, quantize, device)
+
+        # send model to device
+        return model.to(device)
+
+    @staticmethod
+    def _quantize(
+        model: nn.Module, quantize: Text, device: torch.device
+    ) -> nn.Module:
+        """Quantize model
+
+        Parameters
+        ----------
+        model : nn.Module
+            Model (in eval mode).
+        quantize : {"dynamic-int8"}
+            Quantization method.
+        device : torch.device
+            Device used for inference.
+
+        Returns
+        -------
+        quantized : nn.Module
+            Quantized copy of the model.
+        """
+
+        if quantize != QUANTIZE_DYNAMIC_INT8:
+            msg = (
+                f'Unsupported quantization method "{quantize}". '
+                f'Only "{QUANTIZE_DYNAMIC_INT8}" is supported.'
+            )
+            raise ValueError(msg)
+
+        if device.type != "cpu":
+            msg = (
+                f'"{quantize}" quantization is only supported for CPU inference '
+                f'(is: "{device}").'
+            )
+            raise ValueError(msg)
+
+        # recurrent and linear layers are the ones that benefit the most from
+        # dynamic quantization. convolutional layers (e.g. SincNet or TDNN)
+        # are kept in floating point.
+        return torch.quantization.quantize_dynamic(
+            model, {nn.LSTM, nn.GRU, nn.Linear}, dtype=torch.qint8
+        )
+
     @property
     def duration(self):
         return self.duration_
@@ -195,6 +393,15 @@ class Pretrained(FeatureExtraction):
     def classes(self):
         return self.model_.classes
 
+    @property
+    def log_scale(self) -> bool:
+        """Whether outputs are log-probabilities
+
+        This is the case of multi-class classification models, whose final
+        activation is `torch.nn.LogSoftmax`.
+        """
+        return self.model_.task.is_multiclass_classification
+
     def get_dimension(self) -> int:
         try:
             dimension = self.model_.dimension
@@ -216,7 +423,7 @@ class Pretrained(FeatureExtraction):
 
         return resolution
 
-    def get_features(self, y, sample_rate) -> np.ndarray:
+    def get_features(self, y, sample_rate, gate: Callable = None) -> np.ndarray:
 
         features = SlidingWindowFeature(
             self.feature_extraction_.get_features(y, sample_rate),
@@ -230,8 +437,134 @@ class Pretrained(FeatureExtraction):
             device=self.device,
             return_intermediate=self.return_intermediate,
             progress_hook=self.progress_hook,
+            gate=gate,
+            stateful=self.stateful,
+            share_encoder=self.share_encoder,
         ).data
 
+    def _energy_activity(self, waveform: SlidingWindowFeature) -> SlidingWindowFeature:
+        """Frame-wise activity based on short-term energy"""
+
+        y = waveform.data[:, 0]
+        frame = max(1, int(GATE_ENERGY_FRAME * self.sample_rate))
+        n_frames = len(y) // frame
+
+        frames = SlidingWindow(
+            start=0.0, duration=frame / self.sample_rate, step=frame / self.sample_rate
+        )
+
+        # file is too short: consider it active
+        if n_frames < 1:
+            return SlidingWindowFeature(np.ones((1, 1), dtype=bool), frames)
+
+        energy = np.mean(y[: n_frames * frame].reshape(n_frames, frame) ** 2, axis=1)
+        energy = 10.0 * np.log10(energy + 1e-10)
+
+        # use 99th percentile rather than max to be robust to clicks
+        peak = np.percentile(energy, 99)
+        active = energy > peak - self.gate_threshold
+
+        return SlidingWindowFeature(active[:, np.newaxis], frames)
+
+    def _mask_activity(self, scores: SlidingWindowFeature) -> SlidingWindowFeature:
+        """Frame-wise activity based on speech activity detection scores"""
+
+        speech_prob = to_probability(scores.data, log_scale=self.gate_log_scale)
+        active = np.nan_to_num(speech_prob) > self.gate_threshold
+        return SlidingWindowFeature(active[:, np.newaxis], scores.sliding_window)
+
+    def _get_gate(
+        self, current_file, waveform: SlidingWindowFeature
+    ) -> Callable[[Segment], bool]:
+        """Get function deciding whether an audio chunk should be processed"""
+
+        if self.gate == GATE_ENERGY:
+            activity = self._energy_activity(waveform)
+        else:
+            activity = self._mask_activity(current_file[self.gate[1:]])
+
+        return partial(_is_active, activity)
+
+    def _apply(self, current_file) -> SlidingWindowFeature:
+        """Apply pretrained model on file (skipping chunks when gated)"""
+
+        if self.gate is None:
+            return super().__call__(current_file)
+
+        # load waveform, re-sample, convert to mono, augment, normalize
+        y, sample_rate = self.raw_audio_(current_file, return_sr=True)
+
+        # outputs of skipped chunks are set to NaN on purpose: no need to
+        # warn about it like FeatureExtraction.__call__ does.
+        features = self.get_features(
+            y.data, sample_rate, gate=self._get_gate(current_file, y)
+        )
+
+        return SlidingWindowFeature(features, self.sliding_window)
+
+    def _cache_key(self, current_file) -> Text:
+        """Build inference cache key for `current_file`"""
+
+        # (raw) feature extraction configuration
+        if not hasattr(self, "feature_config_"):
+            with open(self.config_yml_, "r") as fp:
+                config = yaml.load(fp, Loader=yaml.SafeLoader)
+            self.feature_config_ = config.get("feature_extraction", None)
+
+        # when gating on a protocol key, output depends on its content
+        gate = self.gate
+        if gate is not None and gate != GATE_ENERGY:
+            activity = self._mask_activity(current_file[gate[1:]])
+            frames = activity.sliding_window
+            gate = [
+                gate,
+                get_array_fingerprint(activity.data),
+                [frames.start, frames.duration, frames.step],
+            ]
+
+        return self.cache.hash(
+            get_file_checksum(self.weights_pt_),
+            self.epoch_,
+            self.duration,
+            self.step,
+            self.feature_config_,
+            get_audio_fingerprint(current_file),
+            current_file.get("channel", None),
+            self.return_intermediate,
+            self.quantize,
+            gate,
+            self.gate_threshold,
+            self.stateful,
+            self.share_encoder,
+        )
+
+    def __call__(self, current_file) -> SlidingWindowFeature:
+        """Apply pretrained model on file (using inference cache when available)
+
+        Parameters
+        ----------
+        current_file : dict
+            `pyannote.database` files.
+
+        Returns
+        -------
+        output : `pyannote.core.SlidingWindowFeature`
+            Model output.
+        """
+
+        # data augmentation makes output non-deterministic: do not cache it
+        if self.cache is None or self.augmentation is not None:
+            return self._apply(current_file)
+
+        key = self._cache_key(current_file)
+        data = self.cache.get(key)
+        if data is not None:
+            return SlidingWindowFeature(data, self.sliding_window)
+
+        output = self._apply(current_file)
+        self.cache.set(key, output.data)
+        return output
+
     def get_context_duration(self) -> float:
         # FIXME: add half window duration to context?
         return self.feature_extraction_.get_context_duration()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Process-wide registry of loaded models and configurations
+
+Loading a pretrained model means parsing `config.yml`, `specs.yml`, and
+`params.yml`, building the model architecture, and loading its weights. The
+registry makes sure this is only done once per process for a given (resolved)
+path, epoch, and device: `Pretrained` instances (and therefore `Wrapper`
+instances and pipelines) built on top of the same model share the same
+(read-only) `torch.nn.Module` instance.
+
+>>> from pyannote.audio.features.registry import MODEL_REGISTRY
+>>> MODEL_REGISTRY.report()     # cold vs. warm load times, memory usage
+>>> MODEL_REGISTRY.memory       # total memory used by registered models
+>>> MODEL_REGISTRY.evict(key)   # evict one entry
+>>> MODEL_REGISTRY.clear()      # evict all entries
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import List
+
+import torch
+
+
+def _get_nbytes(value: Any) -> int:
+    """Estimate memory footprint of (nested) tensors"""
+
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+
+    if isinstance(value, torch.nn.Module):
+        # state_dict (rather than parameters) also covers buffers and
+        # packed parameters of quantized modules
+        return sum(_get_nbytes(v) for v in value.state_dict().values())
+
+    if isinstance(value, (list, tuple)):
+        return sum(_get_nbytes(v) for v in value)
+
+    return 0
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value = None
+        self.nbytes = 0
+        self.cold = 0.0
+        self.warm = 0.0
+        self.hits = 0
+
+
+class ModelRegistry:
+    """Thread-safe registry of loaded models and configurations
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of entries. Least recently used entries are evicted
+        when it is exceeded. Defaults to 16. Use None for no limit.
+
+    Usage
+    -----
+    >>> registry = ModelRegistry()
+    >>> model = registry.get(key, load_model)  # calls load_model()
+    >>> model = registry.get(key, load_model)  # does not call load_model()
+    """
+
+    def __init__(self, max_entries: int = 16):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries: Dict[Hashable, _Entry] = OrderedDict()
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Get registered value (and load it if needed)
+
+        Parameters
+        ----------
+        key : Hashable
+            Registry key.
+        load : callable
+            Function called (without any argument) to load the value in case
+            it is not registered yet.
+
+        Returns
+        -------
+        value : Any
+            Registered value. It is shared by all callers and should therefore
+            be considered as read-only.
+        """
+
+        start = time.perf_counter()
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                entry = _Entry()
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+        # per-entry lock: concurrent requests for the same key wait for the
+        # first one to complete loading, while other keys are not blocked.
+        with entry.lock:
+
+            if entry.loaded:
+                entry.hits += 1
+                entry.warm += time.perf_counter() - start
+                return entry.value
+
+            try:
+                value = load()
+            except Exception:
+                with self._lock:
+                    if self._entries.get(key, None) is entry:
+                        del self._entries[key]
+                raise
+
+            entry.value = value
+            entry.nbytes = _get_nbytes(value)
+            entry.cold = time.perf_counter() - start
+            entry.loaded = True
+
+        self._evict_lru()
+
+        return value
+
+    def _evict_lru(self):
+        if self.max_entries is None:
+            return
+        with self._lock:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            return entry is not None and entry.loaded
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def evict(self, key: Hashable):
+        """Evict entry
+
+        Parameters
+        ----------
+        key : Hashable
+            Registry key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Evict all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def memory(self) -> int:
+        """Total memory used by registered models (in bytes)"""
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def report(self) -> List[Dict]:
+        """Report cold vs. warm load times and memory usage of each entry
+
+        Returns
+        -------
+        report : list of dict
+            One dictionary per entry (from least to most recently used) with
+            the following keys: "key", "cold" (time spent loading it, in
+            seconds), "hits" (number of warm loads), "warm" (average time
+            spent on warm loads, in seconds), and "nbytes" (memory usage).
+        """
+
+        with self._lock:
+            entries = list(self._entries.items())
+
+        return [
+            {
+                "key": key,
+                "cold": entry.cold,
+                "hits": entry.hits,
+                "warm": entry.warm / entry.hits if entry.hits else 0.0,
+                "nbytes": entry.nbytes,
+            }
+            for key, entry in entries
+            if entry.loaded
+        ]
+
+
+# process-wide registry
+MODEL_REGISTRY = ModelRegistry()
@@ -27,18 +27,35 @@
 # Hervé BREDIN - http://herve.niderb.fr
 
 
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Callable
+from typing import Hashable
 from typing import Text
 from typing import Union
 from typing import Dict
+from copy import deepcopy
 from functools import partial
 from pyannote.database import ProtocolFile
+from pyannote.database.util import get_unique_identifier
 from pyannote.core import Segment
 from pyannote.core import SlidingWindowFeature
+from pyannote.audio.utils.profiler import PROFILER
 import numpy as np
 
 Wrappable = Union[
-    "Precomputed", "Pretrained", "RawAudio", "FeatureExtraction", Dict, Text, Path
+    "Precomputed",
+    "Pretrained",
+    "RawAudio",
+    "FeatureExtraction",
+    "Wrapper",
+    Dict,
+    Text,
+    Path,
 ]
 
 # this needs to go here to make Wrapper instances pickable
@@ -46,6 +63,144 @@ def _use_existing_key(key, file):
     return file[key]
 
 
+def _load_from_hub(name: Text, **params):
+    """Load `torch.hub` model through the process-wide model registry
+
+    Returns a copy of the registered `Pretrained` instance that only shares
+    its (read-only) model and inference cache, so that setting attributes
+    (e.g. `step`, `device` or `augmentation`) does not affect other users of
+    the same model.
+    """
+
+    import torch
+    from pyannote.audio.features.registry import MODEL_REGISTRY
+
+    key = ("hub", name, tuple(sorted((k, repr(v)) for k, v in params.items())))
+    scorer = MODEL_REGISTRY.get(
+        key, partial(torch.hub.load, "pyannote/pyannote-audio", name, **params)
+    )
+    shared = [getattr(scorer, "model_", None), getattr(scorer, "cache", None)]
+    return deepcopy(scorer, {id(obj): obj for obj in shared if obj is not None})
+
+
+class _FileMemo:
+    """Per-file memo of scorer outputs
+
+    Outputs are indexed by file unique identifier (see `get_unique_identifier`)
+    so that copies of a file (e.g. `dict(current_file)`) share them. Only the
+    `max_files` most recently seen files are kept (use None for no limit).
+    Files without "uri" cannot be identified and are therefore not memoized.
+    """
+
+    def __init__(self, max_files: int = 2):
+        super().__init__()
+        self.max_files = max_files
+        self._lock = threading.RLock()
+        # file unique identifier --> {scorer key: output}
+        self._files = OrderedDict()
+
+    def get(self, current_file, key: Hashable, compute: Callable):
+
+        if "uri" not in current_file:
+            return compute()
+
+        file_id = get_unique_identifier(current_file)
+
+        with self._lock:
+            outputs = self._files.get(file_id, None)
+            if outputs is not None:
+                self._files.move_to_end(file_id)
+                if key in outputs:
+                    return outputs[key]
+
+        output = compute()
+
+        with self._lock:
+            outputs = self._files.setdefault(file_id, dict())
+            self._files.move_to_end(file_id)
+            outputs[key] = output
+            while self.max_files is not None and len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+        return output
+
+    def forget(self, current_file=None, key: Hashable = None):
+        """Forget memoized outputs
+
+        Parameters
+        ----------
+        current_file : ProtocolFile, optional
+            Only forget outputs for this file. Defaults to all files.
+        key : Hashable, optional
+            Only forget outputs of this scorer. Defaults to all scorers.
+        """
+
+        with self._lock:
+
+            if current_file is None:
+                file_ids = list(self._files)
+            elif "uri" in current_file:
+                file_ids = [get_unique_identifier(current_file)]
+            else:
+                file_ids = []
+
+            for file_id in file_ids:
+                if key is None:
+                    self._files.pop(file_id, None)
+                    continue
+                outputs = self._files.get(file_id, dict())
+                outputs.pop(key, None)
+                if not outputs:
+                    self._files.pop(file_id, None)
+
+
+# memo shared by all memoizing wrappers. it is only set within
+# `memoized_outputs` blocks, so that outputs never outlive them.
+_MEMO = ContextVar("pyannote_audio_wrapper_memo", default=None)
+
+
+@contextmanager
+def memoized_outputs():
+    """Share outputs of memoizing wrappers within a block
+
+    Outputs of `Wrapper(..., memoize=True)` instances are memoized from the
+    moment the (outermost) block is entered, and forgotten as soon as it is
+    exited. Memoization is disabled outside of such blocks, and in threads
+    started within them.
+
+    Usage
+    -----
+    >>> with memoized_outputs():
+    ...     hypothesis = pipeline(current_file)
+    """
+
+    # nested blocks share the memo of the outermost one
+    if _MEMO.get() is not None:
+        yield
+        return
+
+    token = _MEMO.set(_FileMemo())
+    try:
+        yield
+    finally:
+        _MEMO.reset(token)
+
+
+def memoizing(method: Callable) -> Callable:
+    """Decorator for methods sharing outputs of memoizing wrappers
+
+    Outputs are shared for the duration of the (outermost) decorated call.
+    See `memoized_outputs` for details.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with memoized_outputs():
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
 class Wrapper:
     """FeatureExtraction-compliant wrapper
 
@@ -53,6 +208,15 @@ class Wrapper:
     ----------
     wrappable : Wrappable
         Wrappable object. See "Usage" section for a detailed description.
+    memoize : bool, optional
+        Memoize the output of the wrapped object within `memoized_outputs`
+        blocks (e.g. one call to a `memoizing` pipeline). Memoized outputs are
+        indexed by file unique identifier and by wrapped object, and are
+        forgotten when the block is exited. They are only shared with wrappers
+        of the very same object, e.g. when wrapping an existing `Wrapper` to
+        use the same model in several places of a pipeline (such as speech
+        turn clustering and assignment) without processing the same file
+        several times. Defaults to False.
     **params : Dict
         Keyword parameters passed to the wrapped object when supported.
 
@@ -90,6 +254,10 @@ class Wrapper:
 
       lambda current_file: current_file['key']
 
+    * If `wrappable` is a `Wrapper`, it stands for the object it wraps (and
+      shares its memoized outputs). In this case, keyword parameters are not
+      used.
+
     In any other situation, it will raise an error.
 
     Notes
@@ -113,7 +281,7 @@ class Wrapper:
         ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """
 
-    def __init__(self, wrappable: Wrappable, **params):
+    def __init__(self, wrappable: Wrappable, memoize: bool = False, **params):
         super().__init__()
 
         from pyannote.audio.features import Pretrained
@@ -129,11 +297,16 @@ class Wrapper:
             wrappable, custom_params = dict(wrappable).popitem()
             params.update(**custom_params)
 
+        # If `wrappable` is a `Wrapper`, share the object it wraps (and
+        # therefore its memoized outputs)
+        if isinstance(wrappable, Wrapper):
+            scorer = wrappable.scorer_
+
         # If `wrappable` already complies with the `FeatureExtraction` API , it
         # is kept unchanged. This includes instances of any `FeatureExtraction`
         # subclass,`RawAudio` instances, `Precomputed` instances, and
         # `Pretrained` instances.
-        if isinstance(
+        elif isinstance(
             wrappable, (FeatureExtraction, RawAudio, Pretrained, Precomputed)
         ):
             scorer = wrappable
@@ -193,11 +366,7 @@ class Wrapper:
             # `torch.hub` model, wrap the corresponding `Pretrained`.
             else:
                 try:
-                    import torch
-
-                    scorer = torch.hub.load(
-                        "pyannote/pyannote-audio", wrappable, **params
-                    )
+                    scorer = _load_from_hub(wrappable, **params)
                     if not isinstance(scorer, Pretrained):
                         msg = (
                             f'"{wrappable}" exists on torch.hub but does not '
@@ -217,6 +386,16 @@ class Wrapper:
             raise ValueError(msg)
 
         self.scorer_ = scorer
+        self.memoize_ = memoize
+
+        # only wrappers of the very same object share memoized outputs
+        self.memo_key_ = scorer
+        if isinstance(wrappable, Wrapper):
+            self.name_ = wrappable.name_
+        elif scorer is wrappable:
+            self.name_ = type(scorer).__name__
+        else:
+            self.name_ = str(wrappable)
 
     def crop(
         self,
@@ -277,7 +456,20 @@ class Wrapper:
         frames : np.ndarray
             Frames.
         """
-        return self.scorer_(current_file)
+
+        with PROFILER.stage(f"wrapper/{self.name_}", current_file=current_file):
+
+            # there is no point in memoizing file[key] lookups
+            if not self.memoize_ or isinstance(self.scorer_, partial):
+                return self.scorer_(current_file)
+
+            memo = _MEMO.get()
+            if memo is None:
+                return self.scorer_(current_file)
+
+            return memo.get(
+                current_file, self.memo_key_, lambda: self.scorer_(current_file)
+            )
 
     # used to "inherit" most scorer_ attributes
     def __getattr__(self, name):
@@ -290,8 +482,23 @@ class Wrapper:
         return getattr(self.scorer_, name)
 
     def __setattr__(self, name, value):
-        if name == "scorer_":
+        if name in ["scorer_", "memoize_", "memo_key_", "name_"]:
             object.__setattr__(self, name, value)
 
         else:
             setattr(self.scorer_, name, value)
+            # outputs memoized before the modification are no longer valid
+            self.forget()
+
+    def forget(self, current_file: ProtocolFile = None):
+        """Forget memoized outputs
+
+        Parameters
+        ----------
+        current_file : ProtocolFile, optional
+            Only forget outputs for this file (e.g. after it was modified).
+            Defaults to all files.
+        """
+        memo = _MEMO.get()
+        if memo is not None:
+            memo.forget(current_file=current_file, key=self.memo_key_)
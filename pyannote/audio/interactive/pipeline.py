@@ -45,6 +45,7 @@ from pyannote.pipeline.parameter import Uniform
 
 from pyannote.audio.features.wrapper import Wrapper
 from pyannote.audio.features.utils import get_audio_duration
+from pyannote.audio.utils.profiler import profiled
 
 from pyannote.metrics.diarization import DiarizationErrorRate
 from pyannote.metrics.detection import DetectionErrorRate
@@ -149,6 +150,7 @@ class InteractiveDiarization(Pipeline):
             self.emb.duration = self.emb_duration
             self.emb.step = self.emb_step_ratio
 
+    @profiled("interactive_diarization/speech")
     def compute_speech(self, current_file: ProtocolFile) -> Timeline:
         """Apply speech activity detection
 
@@ -178,6 +180,7 @@ class InteractiveDiarization(Pipeline):
 
         return speech
 
+    @profiled("interactive_diarization/embedding")
     def compute_embedding(self, current_file: ProtocolFile) -> SlidingWindowFeature:
         """Extract speaker embedding
 
@@ -232,6 +235,7 @@ class InteractiveDiarization(Pipeline):
 
         return assignment
 
+    @profiled("interactive_diarization")
     def __call__(
         self,
         current_file: ProtocolFile,
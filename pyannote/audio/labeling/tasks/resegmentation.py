@@ -31,12 +31,21 @@
 from typing import Optional
 from typing import Type
 from typing import Iterable
+from typing import Iterator
 from typing import Dict
 from typing import Text
+from typing import Tuple
+from typing import Union
 import scipy.signal
 
+import copy
+import warnings
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import torch
-import tempfile
 import numpy as np
 from .base import LabelingTask
 from .base import LabelingTaskGenerator
@@ -49,10 +58,12 @@ from pyannote.database.protocol import SpeakerDiarizationProtocol
 from pyannote.database import get_annotated
 from pyannote.core.utils.numpy import one_hot_decoding
 from pyannote.core.utils.numpy import one_hot_encoding
-from pyannote.audio.train.schedulers import ConstantScheduler
 from torch.optim import SGD
 from pathlib import Path
 from pyannote.audio.utils.signal import Binarize
+from pyannote.audio.features.registry import MODEL_REGISTRY
+from pyannote.audio.utils.resources import plan_resources
+from pyannote.audio.utils.resources import ROLE_APPLY
 
 from pyannote.audio.features import FeatureExtraction
 from pyannote.database import ProtocolFile
@@ -61,6 +72,9 @@ from pyannote.audio.train.model import Resolution
 from pyannote.audio.train.model import Alignment
 from pyannote.audio.train.task import Task
 
+# protects initialization of shared initial states
+_WARM_START_LOCK = threading.Lock()
+
 
 class ResegmentationGenerator(LabelingTaskGenerator):
     """Batch generator for resegmentation self-training
@@ -251,6 +265,9 @@ class Resegmentation(LabelingTask):
     step : `float`, optional
         Ratio of audio chunk duration used as step between two consecutive
         audio chunks. Defaults to 0.1.
+    n_jobs : int, optional
+        Number of files self-trained concurrently by `apply_iter`.
+        Defaults to 1.
     batch_size : int, optional
         Batch size. Defaults to 32.
     device : `torch.device`, optional
@@ -261,6 +278,18 @@ class Resegmentation(LabelingTask):
     mask : str, optional
         When provided, current_file[mask] is used by the loss function to weigh
         samples.
+    pretrained : `Path`, optional
+        Path to model weights used to initialize self-training of every file.
+        Weights whose shape does not match (e.g. those of the final
+        classification layer, whose size depends on the number of speakers)
+        are skipped. Defaults to sharing the random initialization of the
+        first processed file.
+    patience : `int`, optional
+        Stop self-training early when the loss has not decreased (by more
+        than `tolerance`, relatively) for that many epochs. Defaults to always
+        train for `epochs` epochs.
+    tolerance : `float`, optional
+        Minimum relative decrease of the loss. Defaults to 1e-3.
     """
 
     def __init__(
@@ -279,6 +308,9 @@ class Resegmentation(LabelingTask):
         batch_size: int = 32,
         allow_overlap: bool = False,
         mask: Text = None,
+        pretrained: Optional[Union[Text, Path]] = None,
+        patience: Optional[int] = None,
+        tolerance: float = 1e-3,
     ):
 
         self.feature_extraction = feature_extraction
@@ -297,10 +329,20 @@ class Resegmentation(LabelingTask):
         self.allow_overlap = allow_overlap
         self.mask = mask
 
+        if pretrained is not None:
+            pretrained = Path(pretrained).expanduser().resolve(strict=True)
+        self.pretrained = pretrained
+
+        self.patience = patience
+        self.tolerance = tolerance
+
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
         self.device_ = torch.device(device)
 
+        # initial state shared by all files (see `_warm_start`)
+        self.initial_state_ = None
+
         super().__init__(
             duration=duration, batch_size=batch_size, per_epoch=None, step=step
         )
@@ -322,7 +364,7 @@ class Resegmentation(LabelingTask):
             )
 
     def get_batch_generator(
-        self, current_file: ProtocolFile
+        self, current_file: ProtocolFile, mask: Text = None
     ) -> ResegmentationGenerator:
         """Get batch generator for current file
 
@@ -331,6 +373,8 @@ class Resegmentation(LabelingTask):
         current_file : `dict`
             Dictionary obtained by iterating over a subset of a
             `pyannote.database.Protocol` instance.
+        mask : str, optional
+            Override `mask`.
 
         Returns
         -------
@@ -353,9 +397,185 @@ class Resegmentation(LabelingTask):
             batch_size=self.batch_size,
             lock_speech=self.lock_speech,
             allow_overlap=self.allow_overlap,
-            mask=self.mask,
+            mask=self.mask if mask is None else mask,
         )
 
+    def _warm_start(self, model: Model) -> Model:
+        """Initialize model with state shared by all files
+
+        Parameters
+        ----------
+        model : Model
+            Freshly created model.
+
+        Returns
+        -------
+        model : Model
+            Same model, initialized with `pretrained` weights (or with the
+            random initialization of the first processed file).
+        """
+
+        with _WARM_START_LOCK:
+            if self.initial_state_ is None:
+                if self.pretrained is None:
+                    state = model.state_dict()
+                else:
+                    state = MODEL_REGISTRY.get(
+                        ("weights", str(self.pretrained)),
+                        partial(
+                            torch.load,
+                            self.pretrained,
+                            map_location=lambda storage, loc: storage,
+                        ),
+                    )
+                self.initial_state_ = {
+                    name: tensor.detach().clone() for name, tensor in state.items()
+                }
+
+        current_state = model.state_dict()
+        state = {
+            name: tensor
+            for name, tensor in self.initial_state_.items()
+            if name in current_state and current_state[name].shape == tensor.shape
+        }
+        model.load_state_dict(state, strict=False)
+
+        if self.pretrained is None:
+            return model
+
+        # final (classification) layer is the last registered module. its
+        # size depends on the number of speakers: it is expected to be skipped
+        classifier = next(reversed(current_state)).rsplit(".", 1)[0]
+        others = [
+            name for name in current_state if name.rsplit(".", 1)[0] != classifier
+        ]
+        skipped = [name for name in others if name not in state]
+        if others and len(skipped) == len(others):
+            msg = (
+                f"None of the weights in {self.pretrained} matches the "
+                f"architecture of the resegmentation model."
+            )
+            raise ValueError(msg)
+
+        if skipped:
+            msg = (
+                f"The following weights could not be initialized from "
+                f"{self.pretrained}: {skipped}."
+            )
+            warnings.warn(msg)
+
+        return model
+
+    def _self_train(
+        self,
+        model: Model,
+        batch_generator: ResegmentationGenerator,
+        features: SlidingWindowFeature,
+        debugging: bool = False,
+    ) -> Tuple[SlidingWindowFeature, Dict]:
+        """Self-train model on current file and return its (ensembled) scores
+
+        Training happens in memory (no checkpoint is written to disk) and
+        scores of the last `ensemble` epochs are accumulated into a running
+        average as soon as they are computed.
+
+        This method stores training state as attributes (`model_`,
+        `optimizer_`, ...) and should therefore be called on a (shallow) copy
+        of the task when several files are processed concurrently.
+
+        Parameters
+        ----------
+        model : Model
+            Model to self-train.
+        batch_generator : ResegmentationGenerator
+            Batch generator for current file.
+        features : SlidingWindowFeature
+            Features of current file.
+        debugging : bool, optional
+            Also compute (and return) scores of every epoch.
+
+        Returns
+        -------
+        scores : SlidingWindowFeature
+            Scores averaged over the last `ensemble` epochs.
+        debug : dict
+            ['loss'] (`list`) : average loss of each epoch.
+            ['scores'] (`list`) : scores of each epoch (when debugging).
+        """
+
+        self.model_ = model.to(self.device_)
+        self.batch_generator_ = batch_generator
+        self.batches_per_epoch_ = batch_generator.batches_per_epoch
+        self.optimizer_ = SGD(self.parameters(), lr=self.learning_rate)
+        self.on_train_start()
+        self.model_.train()
+
+        # no need for background batch generation: one file is small enough
+        batches = batch_generator()
+
+        chunks = SlidingWindow(duration=self.duration, step=self.step * self.duration)
+
+        debug = {"loss": [], "scores": []}
+
+        best_loss, bad_epochs = np.inf, 0
+        sum_scores, n_scores = None, 0
+
+        for epoch in range(self.epochs):
+
+            epoch_loss = 0.0
+            for _ in range(self.batches_per_epoch_):
+                loss = self.batch_loss(next(batches))["loss"]
+                loss.backward()
+                self.optimizer_.step()
+                self.optimizer_.zero_grad()
+                epoch_loss += loss.item()
+            epoch_loss /= self.batches_per_epoch_
+            debug["loss"].append(epoch_loss)
+
+            if epoch_loss < best_loss * (1.0 - self.tolerance):
+                best_loss, bad_epochs = epoch_loss, 0
+            else:
+                bad_epochs += 1
+
+            last_epoch = epoch + 1 == self.epochs
+            plateau = self.patience is not None and bad_epochs >= self.patience
+
+            # do not compute scores that are not used in later ensembling
+            # (except when debugging). when stopping early, the current model
+            # is always part of the ensemble.
+            in_ensemble = epoch >= self.epochs - self.ensemble
+            if not (debugging or in_ensemble or plateau):
+                continue
+
+            self.model_.eval()
+            scores = self.model_.slide(
+                features,
+                chunks,
+                batch_size=self.batch_size,
+                device=self.device_,
+                return_intermediate=None,
+                progress_hook=None,
+            )
+            self.model_.train()
+
+            if debugging:
+                debug["scores"].append(scores)
+
+            if in_ensemble or plateau:
+                if sum_scores is None:
+                    sum_scores = np.array(scores.data, dtype=np.float64)
+                else:
+                    sum_scores += scores.data
+                n_scores += 1
+
+            if last_epoch or plateau:
+                break
+
+        self.on_train_end()
+
+        scores = SlidingWindowFeature(sum_scores / n_scores, scores.sliding_window)
+        return scores, debug
+
     def _decode(
         self,
         current_file: ProtocolFile,
@@ -421,83 +641,44 @@ class Resegmentation(LabelingTask):
 
         # when locking speech / non-speech status, we add a (or update
         # existing) mask so that the loss is not computed on non-speech regions
+        mask = self.mask
         if self.lock_speech:
 
+            frames = current_file["features"].sliding_window
             encoded = one_hot_encoding(
-                hypothesis,
-                get_annotated(current_file),
-                current_file["features"].sliding_window,
-                mode="center",
+                hypothesis, get_annotated(current_file), frames, mode="center",
+            )
+            speech = SlidingWindowFeature(
+                1.0 * (np.sum(encoded.data, axis=1, keepdims=True) > 0), frames
             )
-            speech = 1.0 * (np.sum(encoded, axis=1, keepdims=True) > 0)
             current_file["speech"] = speech
             debug["speech"] = speech
 
-            if self.mask is None:
-                self.mask = "speech"
+            if mask is None:
+                mask = "speech"
 
             else:
-                mask = current_file[self.mask]
-                current_file[self.mask] = mask * speech.align(mask)
+                current_file[mask] = current_file[mask] * speech.align(
+                    current_file[mask]
+                )
 
-            debug["mask"] = current_file[self.mask]
+            debug["mask"] = current_file[mask]
 
-        batch_generator = self.get_batch_generator(current_file)
+        batch_generator = self.get_batch_generator(current_file, mask=mask)
 
-        model = self.Architecture(
-            batch_generator.specifications, **self.architecture_params
-        )
-
-        chunks = SlidingWindow(duration=self.duration, step=self.step * self.duration)
-
-        # create a temporary directory to store models and log files
-        # it is removed automatically before returning.
-        with tempfile.TemporaryDirectory() as train_dir:
-
-            epochs = self.fit_iter(
-                model,
-                batch_generator,
-                warm_start=0,
-                epochs=self.epochs,
-                get_optimizer=SGD,
-                scheduler=ConstantScheduler(),
-                learning_rate=self.learning_rate,
-                train_dir=Path(train_dir),
-                verbosity=1,
-                device=self.device,
-                callbacks=None,
-                n_jobs=self.n_jobs,
+        model = self._warm_start(
+            self.Architecture(
+                batch_generator.specifications, **self.architecture_params
             )
+        )
 
-            scores = []
-            for i, current_model in enumerate(epochs):
-
-                # do not compute scores that are not used in later ensembling
-                # simply jump to next training epoch (except when debugging)
-                if not debugging and i < self.epochs - self.ensemble:
-                    continue
-
-                current_model.eval()
-
-                scores.append(
-                    current_model.slide(
-                        current_file["features"],
-                        chunks,
-                        batch_size=self.batch_size,
-                        device=self.device,
-                        return_intermediate=None,
-                        progress_hook=None,
-                    )
-                )
-                current_model.train()
-
-        debug["scores"] = scores
-
-        # ensemble scores
-        scores = SlidingWindowFeature(
-            np.mean([s.data for s in scores[-self.ensemble :]], axis=0),
-            scores[-1].sliding_window,
+        # training state is stored as attributes of the trainer: use a copy
+        # so that several files can be processed concurrently
+        trainer = copy.copy(self)
+        scores, training_debug = trainer._self_train(
+            model, batch_generator, current_file["features"], debugging=debugging
         )
+        debug.update(training_debug)
         debug["final_scores"] = scores
 
         labels = batch_generator.specifications["y"]["classes"]
@@ -511,6 +692,58 @@ class Resegmentation(LabelingTask):
         decoded.debug = debug
         return decoded
 
+    def apply_iter(
+        self, files: Iterable[ProtocolFile], n_jobs: Optional[int] = None
+    ) -> Iterator[Annotation]:
+        """Apply resegmentation to several files concurrently
+
+        Parameters
+        ----------
+        files : iterable of ProtocolFile
+            Files to process. Each of them should provide a "hypothesis" key
+            with the diarization output to resegment.
+        n_jobs : int, optional
+            Number of files processed concurrently. Defaults to `n_jobs`.
+
+        Yields
+        ------
+        new_hypothesis : Annotation
+            Updated diarization output, in the same order as `files`.
+
+        Notes
+        -----
+        When processing files concurrently, the current process is configured
+        following `plan_resources("apply", n_jobs=n_jobs)` so that the CPU
+        budget is shared between concurrent files rather than oversubscribed.
+        """
+
+        if n_jobs is None:
+            n_jobs = self.n_jobs
+
+        if n_jobs < 2:
+            for current_file in files:
+                yield self(current_file, current_file["hypothesis"])
+            return
+
+        # torch (and BLAS) threads are shared by all concurrent files
+        plan = plan_resources(ROLE_APPLY, n_jobs=n_jobs).apply()
+        n_jobs = plan.n_workers
+
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+
+            # only keep up to `n_jobs` files in flight so that memory usage
+            # does not grow with the number of files
+            pending = deque()
+            for current_file in files:
+                pending.append(
+                    executor.submit(self, current_file, current_file["hypothesis"])
+                )
+                if len(pending) >= n_jobs:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
 
 class ResegmentationWithOverlap(Resegmentation):
     """Re-segmentation with overlap
@@ -540,6 +773,10 @@ class ResegmentationWithOverlap(Resegmentation):
     mask : str, optional
         When provided, current_file[mask] is used by the loss function to weigh
         samples.
+    pretrained : `Path`, optional
+    patience : `int`, optional
+    tolerance : `float`, optional
+        See `Resegmentation`.
     """
 
     def __init__(
@@ -558,6 +795,9 @@ class ResegmentationWithOverlap(Resegmentation):
         device: torch.device = None,
         batch_size: int = 32,
         mask: Text = None,
+        pretrained: Optional[Union[Text, Path]] = None,
+        patience: Optional[int] = None,
+        tolerance: float = 1e-3,
     ):
 
         super().__init__(
@@ -574,6 +814,9 @@ class ResegmentationWithOverlap(Resegmentation):
             device=device,
             batch_size=batch_size,
             mask=mask,
+            pretrained=pretrained,
+            patience=patience,
+            tolerance=tolerance,
         )
 
         self.overlap_threshold = overlap_threshold
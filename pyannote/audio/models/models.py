@@ -30,12 +30,15 @@
 from typing import Optional
 from typing import Text
 
+import numpy as np
 import torch
 import torch.nn as nn
+from pyannote.core import SlidingWindow
 
 from .sincnet import SincNet
 from .tdnn import XVectorNet
 from .pooling import TemporalPooling
+from .pooling import StatsPool
 
 
 from .convolutional import Convolutional
@@ -238,6 +241,46 @@ class RNN(nn.Module):
 
         return output
 
+    @property
+    def stateful(self) -> bool:
+        """Whether hidden state can be carried from one sequence to the next
+
+        This is only the case for unidirectional, non-concatenated, recurrent
+        layers without temporal pooling.
+        """
+        return not (self.bidirectional or self.concatenate or self.pool is not None)
+
+    def forward_stateful(self, features, hidden=None):
+        """Apply recurrent layers starting from a given hidden state
+
+        Parameters
+        ----------
+        features : `torch.Tensor`
+            Features shaped as (batch_size, n_frames, n_features)
+        hidden : `torch.Tensor` or tuple of `torch.Tensor`, optional
+            Initial hidden state, as returned by a previous call.
+            Defaults to zeros.
+
+        Returns
+        -------
+        output : `torch.Tensor`
+            (batch_size, n_frames, hidden_size)
+        hidden : `torch.Tensor` or tuple of `torch.Tensor`
+            Final hidden state, meant to be passed to the next call.
+        """
+
+        if not self.stateful:
+            msg = (
+                '"forward_stateful" is only supported when "bidirectional" '
+                'and "concatenate" are False and "pool" is None.'
+            )
+            raise ValueError(msg)
+
+        if self.num_layers < 1:
+            return features, None
+
+        return self.rnn_(features, hidden)
+
     def dimension():
         doc = "Output features dimension."
 
@@ -564,6 +607,70 @@ class PyanNet(Model):
             return output
         return output, intermediate
 
+    @property
+    def supports_shared_encoder(self) -> bool:
+        """Whether SincNet can be shared by overlapping windows
+
+        This is the case unless SincNet is skipped or its waveform
+        normalization cannot be applied after sinc filters. See
+        `SincNet.supports_encode`.
+        """
+        return not self.sincnet.get("skip", False) and self.sincnet_.supports_encode
+
+    @property
+    def shared_resolution(self) -> SlidingWindow:
+        """Resolution of sinc filters activations"""
+        return self.sincnet_.shared_resolution
+
+    def shared_encode(self, waveforms: torch.Tensor):
+        """Apply sinc filters on the whole block"""
+        return self.sincnet_.encode(waveforms)
+
+    def shared_decode(self, encoded, starts: np.ndarray, n_frames: int):
+        """Apply remaining SincNet layers -> RNN -> FC -> output on each window"""
+
+        output = self.sincnet_.decode(encoded, starts, n_frames)
+        output = self.rnn_(output)
+        output = self.ff_(output)
+
+        if self.task.is_representation_learning:
+            return self.embedding_(output)
+
+        output = self.linear_(output)
+        return self.activation_(output)
+
+    @property
+    def supports_stateful(self) -> bool:
+        """Whether model supports stateful (chunk-free) inference
+
+        This is the case when recurrent layers are unidirectional (see
+        `RNN.stateful`) and model returns one vector per frame.
+        """
+        if self.task.is_representation_learning:
+            return False
+        return self.rnn_.stateful
+
+    @property
+    def stateful_margin(self) -> float:
+        """Context (in seconds) needed by SincNet on both sides of a frame"""
+        if self.sincnet.get("skip", False):
+            return 0.0
+        return self.resolution.duration
+
+    def stateful_frontend(self, waveforms: torch.Tensor) -> torch.Tensor:
+        """Apply SincNet (when not skipped)"""
+        if self.sincnet.get("skip", False):
+            return waveforms
+        return self.sincnet_(waveforms)
+
+    def stateful_forward(self, frames: torch.Tensor, state=None):
+        """Apply RNN (starting from `state`) -> FC -> output"""
+        output, state = self.rnn_.forward_stateful(frames, hidden=state)
+        output = self.ff_(output)
+        output = self.linear_(output)
+        output = self.activation_(output)
+        return output, state
+
     @property
     def dimension(self):
         if self.task.is_representation_learning:
@@ -696,11 +803,74 @@ class SincTDNN(Model):
         )
         output = self.tdnn_(output, return_intermediate=return_intermediate)
 
+        return self._head(output)
+
+    def _head(self, output: torch.Tensor) -> torch.Tensor:
         if self.task.is_representation_learning:
             return self.embedding_(output)
 
         return self.activation_(self.linear_(output))
 
+    @property
+    def supports_shared_encoder(self) -> bool:
+        """Whether encoder can be shared by overlapping windows
+
+        When SincNet does not rely on per-window normalization (i.e. both
+        `waveform_normalize` and `instance_normalize` are False), SincNet and
+        frame-level TDNN layers are shared and statistics pooling is computed
+        from cumulative sums. Otherwise, only sinc filters are shared (see
+        `SincNet.encode`) as subsequent activations depend on the window they
+        are extracted from, provided that SincNet supports it (see
+        `SincNet.supports_encode`).
+        """
+        return self._share_frames or self.sincnet_.supports_encode
+
+    @property
+    def _share_frames(self) -> bool:
+        return not (
+            self.sincnet_.waveform_normalize or self.sincnet_.instance_normalize
+        )
+
+    @property
+    def shared_resolution(self) -> SlidingWindow:
+        """Resolution of frame-level (TDNN) or sinc filters activations"""
+
+        if not self._share_frames:
+            return self.sincnet_.shared_resolution
+
+        sincnet = SincNet.get_resolution(self.task, **self.sincnet)
+        return SlidingWindow(
+            start=0.0,
+            duration=sincnet.duration + self.tdnn_.context * sincnet.step,
+            step=sincnet.step,
+        )
+
+    def shared_encode(self, waveforms: torch.Tensor):
+        """waveform -> SincNet -> frame-level TDNN (or sinc filters only)"""
+
+        if not self._share_frames:
+            return self.sincnet_.encode(waveforms)
+
+        return self.tdnn_.frames(self.sincnet_(waveforms))
+
+    def shared_decode(self, encoded, starts: np.ndarray, n_frames: int):
+        """StatsPool (from cumulative sums) -> segment-level TDNN -> output"""
+
+        return_intermediate = (
+            "segment6" if self.task.is_representation_learning else None
+        )
+
+        if not self._share_frames:
+            output = self.sincnet_.decode(encoded, starts, n_frames)
+            output = self.tdnn_(output, return_intermediate=return_intermediate)
+            return self._head(output)
+
+        starts = torch.as_tensor(starts, dtype=torch.long, device=encoded.device)
+        output = StatsPool.pool_windows(encoded[0], starts, n_frames)
+        output = self.tdnn_.segments(output, return_intermediate=return_intermediate)
+
+        return self._head(output)
+
     @property
     def dimension(self):
         if self.task.is_representation_learning:
@@ -141,6 +141,48 @@ class StatsPool(TemporalPooling):
         mean, std = torch.mean(x, dim=1), torch.std(x, dim=1)
         return torch.cat((mean, std), dim=1)
 
+    @staticmethod
+    def pool_windows(
+        x: torch.Tensor, starts: torch.Tensor, n_frames: int
+    ) -> torch.Tensor:
+        """Pool many (overlapping) windows of the same sequence at once
+
+        Mean and standard deviation of each window are computed from
+        cumulative sums of frames and squared frames, so that the cost does
+        not depend on the number of windows each frame belongs to.
+
+        Parameters
+        ----------
+        x : `torch.Tensor`, shape (seq_len, hidden_size)
+            One sequence.
+        starts : `torch.LongTensor`, shape (n_windows, )
+            Index of the first frame of each window.
+        n_frames : int
+            Number of frames per window.
+
+        Returns
+        -------
+        output : `torch.Tensor`, shape (n_windows, 2 * hidden_size)
+            Same as `forward` applied on the stacked windows.
+        """
+
+        # use double precision to avoid catastrophic cancellation
+        dtype = x.dtype
+        x = x.double()
+
+        zeros = x.new_zeros((1, x.shape[1]))
+        sum1 = torch.cat((zeros, torch.cumsum(x, dim=0)))
+        sum2 = torch.cat((zeros, torch.cumsum(x * x, dim=0)))
+
+        ends = starts + n_frames
+        mean = (sum1[ends] - sum1[starts]) / n_frames
+
+        # unbiased estimate, as in torch.std
+        var = (sum2[ends] - sum2[starts] - n_frames * mean * mean) / (n_frames - 1)
+        std = torch.sqrt(torch.clamp(var, min=0.0))
+
+        return torch.cat((mean, std), dim=1).to(dtype)
+
 
 class Pooling(nn.Module):
     """Pooling over the time dimension
@@ -63,11 +63,20 @@ class SincConv1d(nn.Module):
         Defaults to 50.
     min_band_hz: `int`, optional
         Defaults to 50.
+    fft : `bool`, optional
+        Compute convolution in the frequency domain. This is usually faster
+        for long kernels and long inputs. Defaults to False.
 
     Usage
     -----
     Same as `torch.nn.Conv1d`
 
+    Notes
+    -----
+    In evaluation mode (and when gradients are not needed), the filter bank
+    is only computed once and cached until parameters change, module is
+    moved to another device, or is switched back to training mode.
+
     Reference
     ---------
     Mirco Ravanelli, Yoshua Bengio. "Speaker Recognition from raw waveform with
@@ -95,6 +104,7 @@ class SincConv1d(nn.Module):
         dilation=1,
         bias=False,
         groups=1,
+        fft=False,
     ):
 
         super().__init__()
@@ -121,6 +131,10 @@ class SincConv1d(nn.Module):
         self.padding = padding
         self.dilation = dilation
 
+        if fft and dilation != 1:
+            raise ValueError("SincConv1d does not support dilation with fft.")
+        self.fft = fft
+
         if bias:
             raise ValueError("SincConv1d does not support bias.")
         if groups > 1:
@@ -156,22 +170,45 @@ class SincConv1d(nn.Module):
         n = (self.kernel_size - 1) / 2.0
         self.n_ = 2 * math.pi * torch.arange(-n, 0).view(1, -1) / self.sample_rate
 
-    def forward(self, waveforms):
-        """Get sinc filters activations
+        # cached filter bank (see get_filters)
+        self.cache_ = None
+
+    def train(self, mode=True):
+        self.cache_ = None
+        return super().train(mode=mode)
+
+    def _apply(self, fn):
+        self.cache_ = None
+        return super()._apply(fn)
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        self.cache_ = None
+        return super()._load_from_state_dict(*args, **kwargs)
+
+    def get_filters(self, device: torch.device) -> torch.Tensor:
+        """Get filter bank
 
         Parameters
         ----------
-        waveforms : `torch.Tensor` (batch_size, 1, n_samples)
-            Batch of waveforms.
+        device : `torch.device`
 
         Returns
         -------
-        features : `torch.Tensor` (batch_size, out_channels, n_samples_out)
-            Batch of sinc filters activations.
+        filters : `torch.Tensor` (out_channels, 1, kernel_size)
         """
 
-        self.n_ = self.n_.to(waveforms.device)
-        self.window_ = self.window_.to(waveforms.device)
+        # filters can only be cached when they do not need to be differentiated
+        cacheable = not (self.training or torch.is_grad_enabled())
+
+        # in-place modifications of parameters increase their version counter
+        key = (device, self.low_hz_._version, self.band_hz_._version)
+
+        if cacheable and self.cache_ is not None and self.cache_[0] == key:
+            return self.cache_[1]
+
+        if self.n_.device != device:
+            self.n_ = self.n_.to(device)
+            self.window_ = self.window_.to(device)
 
         low = self.min_low_hz + torch.abs(self.low_hz_)
 
@@ -200,7 +237,30 @@ class SincConv1d(nn.Module):
 
         band_pass = band_pass / (2 * band[:, None])
 
-        self.filters = (band_pass).view(self.out_channels, 1, self.kernel_size)
+        filters = (band_pass).view(self.out_channels, 1, self.kernel_size)
+
+        self.cache_ = (key, filters) if cacheable else None
+
+        return filters
+
+    def forward(self, waveforms):
+        """Get sinc filters activations
+
+        Parameters
+        ----------
+        waveforms : `torch.Tensor` (batch_size, 1, n_samples)
+            Batch of waveforms.
+
+        Returns
+        -------
+        features : `torch.Tensor` (batch_size, out_channels, n_samples_out)
+            Batch of sinc filters activations.
+        """
+
+        self.filters = self.get_filters(waveforms.device)
+
+        if self.fft:
+            return self._fft_conv1d(waveforms, self.filters)
 
         return F.conv1d(
             waveforms,
@@ -212,6 +272,28 @@ class SincConv1d(nn.Module):
             groups=1,
         )
 
+    def _fft_conv1d(self, waveforms, filters):
+        """Same as F.conv1d, computed in the frequency domain"""
+
+        import torch.fft
+
+        if self.padding:
+            waveforms = F.pad(waveforms, (self.padding, self.padding))
+
+        n_samples = waveforms.shape[2]
+        n_out = n_samples - self.kernel_size + 1
+        n_fft = n_samples + self.kernel_size - 1
+
+        # F.conv1d is a cross-correlation: flip filters to get a convolution
+        spectrum = torch.fft.rfft(waveforms, n=n_fft) * torch.fft.rfft(
+            torch.flip(filters, dims=[2]), n=n_fft
+        ).transpose(0, 1)
+        output = torch.fft.irfft(spectrum, n=n_fft)
+
+        return output[:, :, self.kernel_size - 1 : self.kernel_size - 1 + n_out][
+            :, :, :: self.stride
+        ]
+
 
 class SincNet(nn.Module):
     """SincNet (learnable) feature extraction
@@ -224,6 +306,9 @@ class SincNet(nn.Module):
     instance_normalize : `bool`, optional
         Standardize internal representation (to zero mean and unit standard
         deviation) and apply (learnable) affine transform. Defaults to True.
+    fft : `bool`, optional
+        Compute sinc filters activations in the frequency domain. See
+        `SincConv1d`. Defaults to False.
 
 
     Reference
@@ -293,6 +378,7 @@ class SincNet(nn.Module):
         instance_normalize=True,
         activation="leaky_relu",
         dropout=0.0,
+        fft=False,
     ):
         super().__init__()
 
@@ -372,6 +458,7 @@ class SincNet(nn.Module):
                     dilation=1,
                     bias=False,
                     groups=1,
+                    fft=fft,
                 )
             self.conv1d_.append(conv1d)
 
@@ -418,12 +505,18 @@ class SincNet(nn.Module):
         if self.waveform_normalize:
             output = self.waveform_normalize_(output)
 
+        return self._forward_from_sinc(self.conv1d_[0](output))
+
+    def _forward_from_sinc(self, output):
+        """Apply remaining layers on sinc filters activations"""
+
         layers = zip(self.conv1d_, self.max_pool1d_)
         for i, (conv1d, max_pool1d) in enumerate(layers):
 
-            output = conv1d(output)
             if i == 0:
                 output = torch.abs(output)
+            else:
+                output = conv1d(output)
 
             output = max_pool1d(output)
 
@@ -437,6 +530,122 @@ class SincNet(nn.Module):
 
         return output.transpose(1, 2)
 
+    @property
+    def shared_resolution(self) -> SlidingWindow:
+        """Resolution of sinc filters activations (relative to input start)"""
+        return SlidingWindow(
+            start=0.0,
+            duration=self.kernel_size[0] / self.sample_rate,
+            step=self.stride[0] / self.sample_rate,
+        )
+
+    @property
+    def supports_encode(self) -> bool:
+        """Whether `encode` and `decode` can be used in place of `forward`
+
+        This is only the case when waveform normalization (if any) is
+        per-instance (i.e. `InstanceNorm1d` not relying on running statistics),
+        as its effect can then be applied after sinc filters (see `encode`).
+        """
+
+        if not self.waveform_normalize:
+            return True
+
+        normalize = self.waveform_normalize_
+        return (
+            isinstance(normalize, nn.InstanceNorm1d)
+            and not normalize.track_running_stats
+        )
+
+    def encode(self, waveforms):
+        """Compute sinc filters activations once for many overlapping windows
+
+        Sinc filters are applied on the raw (i.e. not standardized) waveform.
+        Because convolution is linear, the effect of per-window waveform
+        normalization can then be applied afterwards by `decode`, using
+        cumulative sums of samples and squared samples.
+
+        Parameters
+        ----------
+        waveforms : (1, n_samples, 1)
+            Waveform covering all windows.
+
+        Returns
+        -------
+        encoded : tuple
+            To be passed to `decode`.
+        """
+
+        output = waveforms.transpose(1, 2)
+        activations = self.conv1d_[0](output)
+
+        if not self.waveform_normalize:
+            return activations, None, None
+
+        y = output[0, 0].double()
+        zero = y.new_zeros((1,))
+        sum1 = torch.cat((zero, torch.cumsum(y, dim=0)))
+        sum2 = torch.cat((zero, torch.cumsum(y * y, dim=0)))
+        return activations, sum1, sum2
+
+    def decode(self, encoded, starts: np.ndarray, n_frames: int) -> torch.Tensor:
+        """Extract SincNet features of each window from `encode` output
+
+        Parameters
+        ----------
+        encoded : tuple
+            Output of `encode`.
+        starts : (n_windows, ) np.ndarray
+            Index of the first sinc filters activation of each window
+            (see `shared_resolution`).
+        n_frames : int
+            Number of sinc filters activations per window.
+
+        Returns
+        -------
+        features : (n_windows, n_frames_out, out_channels[-1])
+            Same as `forward` applied on the batch of windows.
+        """
+
+        if not self.supports_encode:
+            msg = (
+                "Waveform normalization cannot be applied after sinc filters "
+                "(see `SincNet.supports_encode`)."
+            )
+            raise ValueError(msg)
+
+        activations, sum1, sum2 = encoded
+
+        output = torch.stack(
+            [activations[0, :, start : start + n_frames] for start in starts]
+        )
+
+        if self.waveform_normalize:
+
+            # per-window mean and (biased) variance of waveform
+            n_samples = (n_frames - 1) * self.stride[0] + self.kernel_size[0]
+            first = torch.as_tensor(
+                starts * self.stride[0], dtype=torch.long, device=sum1.device
+            )
+            last = first + n_samples
+            mean = (sum1[last] - sum1[first]) / n_samples
+            var = (sum2[last] - sum2[first]) / n_samples - mean * mean
+
+            normalize = self.waveform_normalize_
+            scale = 1.0 / torch.sqrt(
+                torch.clamp(var, min=0.0) + normalize.eps
+            ).to(output.dtype)
+            mean = mean.to(output.dtype).view(-1, 1, 1)
+
+            # conv(a * (x - m) + b) = a * (conv(x) - m * taps) + b * taps
+            filters = self.conv1d_[0].get_filters(output.device)
+            taps = filters.sum(dim=2).view(1, -1, 1)
+            output = scale.view(-1, 1, 1) * (output - mean * taps)
+            if normalize.affine:
+                output = normalize.weight * output + normalize.bias * taps
+
+        return self._forward_from_sinc(output)
+
     def dimension():
         doc = "Output features dimension."
 
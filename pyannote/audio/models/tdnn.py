@@ -188,6 +188,55 @@ class XVectorNet(nn.Module):
         self.segment7 = nn.Linear(embedding_dim, embedding_dim)
         self.embedding_dim = embedding_dim
 
+    @property
+    def context(self) -> int:
+        """Number of input frames consumed by frame-level layers"""
+        return sum(
+            (layer.temporal_conv.kernel_size[0] - 1) * layer.temporal_conv.dilation[0]
+            for layer in self.tdnn[:-1]
+        )
+
+    def frames(self, x: torch.Tensor) -> torch.Tensor:
+        """Calculate frame-level activations (i.e. before statistics pooling)
+
+        Parameters
+        ----------
+        x : (batch_size, n_frames, out_channels)
+            Batch of frames
+
+        Returns
+        -------
+        activations : (batch_size, n_frames - context, 1500)
+        """
+        return self.tdnn[:-1](x)
+
+    def segments(self, x: torch.Tensor, return_intermediate: Optional[str] = None):
+        """Calculate segment-level activations from pooled statistics
+
+        Parameters
+        ----------
+        x : (batch_size, 3000)
+            Output of statistics pooling.
+        return_intermediate : 'segment6' | 'segment7' | None
+            See `forward`.
+
+        Returns
+        -------
+        activations : (batch_size, embedding_dim)
+        """
+
+        x = self.segment6(x)
+
+        if return_intermediate == "segment6":
+            return x
+
+        x = self.segment7(F.relu(x))
+
+        if return_intermediate == "segment7":
+            return x
+
+        return F.relu(x)
+
     def forward(self, x: torch.Tensor, return_intermediate: Optional[str] = None):
         """Calculate X-Vector network activations.
            Return the requested intermediate layer without computing unnecessary activations.
@@ -212,14 +261,4 @@ class XVectorNet(nn.Module):
         if return_intermediate == "stats_pool":
             return x
 
-        x = self.segment6(x)
-
-        if return_intermediate == "segment6":
-            return x
-
-        x = self.segment7(F.relu(x))
-
-        if return_intermediate == "segment7":
-            return x
-
-        return F.relu(x)
+        return self.segments(x, return_intermediate=return_intermediate)
@@ -35,8 +35,5 @@ from .overlap_detection import OverlapDetection
 from .speech_turn_segmentation import SpeechTurnSegmentation
 from .speech_turn_segmentation import OracleSpeechTurnSegmentation
 from .speaker_diarization import SpeakerDiarization
-
-try:
-    from .resegmentation import Resegmentation
-except NotImplementedError:
-    pass
+from .online_diarization import OnlineSpeakerDiarization
+from .resegmentation import Resegmentation
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Clustering blocks"""
+
+from typing import Optional
+from typing import Text
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from scipy.cluster.hierarchy import fcluster
+from scipy.spatial.distance import squareform
+
+from pyannote.core.utils.distance import cdist
+from pyannote.core.utils.distance import pdist
+from pyannote.core.utils.distance import l2_normalize
+from pyannote.core.utils.hierarchy import linkage
+from pyannote.core.utils.hierarchy import fcluster_auto
+from pyannote.pipeline.blocks.clustering import (
+    HierarchicalAgglomerativeClustering as _HierarchicalAgglomerativeClustering,
+)
+
+
+class HierarchicalAgglomerativeClustering(_HierarchicalAgglomerativeClustering):
+    """Hierarchical agglomerative clustering
+
+    Same as pyannote.pipeline HierarchicalAgglomerativeClustering block, with
+    its two steps exposed separately: building the dendrogram (expensive, does
+    not depend on hyper-parameters) and obtaining flat clusters from it
+    (cheap). Callers caching dendrograms therefore get the exact same clusters
+    as those calling the block directly.
+
+    Parameters
+    ----------
+    method : `str`, optional
+        Linkage method. Defaults to 'pool'.
+    metric : `str`, optional
+        Distance metric. Defaults to 'cosine'
+    normalize : `bool`, optional
+        L2 normalize vectors before clustering.
+    use_threshold : `bool`, optional
+        Stop merging clusters when their distance is greater than the value of
+        `threshold` hyper-parameters. Defaults to relying on the within-class
+        sum of square elbow criterion to select the best number of clusters.
+
+    Hyper-parameters
+    ----------------
+    threshold : `float`
+        Stop merging clusters when their distance is greater than `threshold`.
+        Only used when `use_threshold` is True.
+    """
+
+    def dendrogram(self, X: np.ndarray) -> Optional[np.ndarray]:
+        """Compute agglomerative clustering all the way up to one cluster
+
+        Parameters
+        ----------
+        X : (n_samples, dimension) np.ndarray
+            Embeddings.
+
+        Returns
+        -------
+        Z : np.ndarray
+            Linkage matrix. None when there is only one sample.
+        """
+
+        n_samples, _ = X.shape
+
+        if n_samples < 1:
+            msg = "There should be at least one sample in `X`."
+            raise ValueError(msg)
+
+        if n_samples == 1:
+            return None
+
+        if self.normalize:
+            X = l2_normalize(X)
+
+        return linkage(X, method=self.method, metric=self.metric)
+
+    def flatten(self, Z: Optional[np.ndarray], X: np.ndarray) -> np.ndarray:
+        """Obtain flat clusters from dendrogram
+
+        Parameters
+        ----------
+        Z : np.ndarray
+            Linkage matrix, as returned by `dendrogram(X)`.
+        X : (n_samples, dimension) np.ndarray
+            Embeddings (only used when `use_threshold` is False).
+
+        Returns
+        -------
+        clusters : (n_samples, ) np.ndarray
+            Cluster of each sample (between 1 and N_CLUSTERS).
+        """
+
+        if Z is None:
+            return np.array([1], dtype=int)
+
+        if self.use_threshold:
+            return fcluster(Z, self.threshold, criterion="distance")
+
+        if self.normalize:
+            X = l2_normalize(X)
+
+        return fcluster_auto(X, Z, metric=self.metric)
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        """Apply hierarchical agglomerative clustering
+
+        Parameters
+        ----------
+        X : (n_samples, dimension) np.ndarray
+            Embeddings.
+
+        Returns
+        -------
+        clusters : (n_samples, ) np.ndarray
+            Cluster of each sample (between 1 and N_CLUSTERS).
+        """
+        return self.flatten(self.dendrogram(X), X)
+
+
+class TwoStageClustering(HierarchicalAgglomerativeClustering):
+    """Scalable agglomerative clustering
+
+    Hierarchical agglomerative clustering is quadratic in the number of
+    samples, both in time and memory. Samples are therefore first grouped
+    into (at most) `n_centroids` small clusters using mini-batch k-means, and
+    centroids are then clustered using agglomerative clustering with pooling,
+    where each centroid is weighted by the size of its k-means cluster.
+
+    This block behaves exactly like HierarchicalAgglomerativeClustering with
+    method="pool" (including its `threshold` hyper-parameter) when there are
+    no more than `n_centroids` samples.
+
+    Parameters
+    ----------
+    metric : {'euclidean', 'cosine', 'angular'}, optional
+        Metric used for comparing embeddings. Defaults to 'cosine'.
+    n_centroids : int, optional
+        Maximum number of first stage clusters. Defaults to 1000.
+    batch_size : int, optional
+        Mini-batch k-means batch size. Defaults to 1024.
+    random_state : int, optional
+        Mini-batch k-means random state, for reproducibility. Defaults to 0.
+
+    Hyper-parameters
+    ----------------
+    threshold : `float`
+        Stopping criterion (see HierarchicalAgglomerativeClustering).
+    """
+
+    def __init__(
+        self,
+        metric: Optional[Text] = "cosine",
+        n_centroids: int = 1000,
+        batch_size: int = 1024,
+        random_state: Optional[int] = 0,
+    ):
+        super().__init__(method="pool", metric=metric, use_threshold=True)
+        self.n_centroids = n_centroids
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def _over_cluster(self, X: np.ndarray):
+        """First stage: group samples into `n_centroids` small clusters
+
+        Returns
+        -------
+        centroids : (n_centroids, dimension) np.ndarray
+        sizes : (n_centroids, ) np.ndarray
+        assignment : (n_samples, ) np.ndarray
+            Index of the centroid of each sample.
+        """
+
+        # k-means is euclidean: work on the unit hypersphere for
+        # angle-based metrics (all-zero embeddings are left unchanged).
+        if self.metric in ["cosine", "angular"]:
+            X = l2_normalize(X)
+
+        kmeans = MiniBatchKMeans(
+            n_clusters=self.n_centroids,
+            batch_size=self.batch_size,
+            random_state=self.random_state,
+        )
+        assignment = kmeans.fit_predict(X)
+
+        # get rid of empty clusters
+        _, assignment, sizes = np.unique(
+            assignment, return_inverse=True, return_counts=True
+        )
+        centroids = np.zeros((len(sizes), X.shape[1]))
+        np.add.at(centroids, assignment, X)
+        centroids /= sizes[:, np.newaxis]
+
+        return centroids, sizes, assignment
+
+    def _weighted_pool(self, X: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Second stage: agglomerative clustering with (weighted) pooling
+
+        Closest clusters are merged (and their pooled embedding is the
+        weighted average of their embeddings) until their distance is
+        greater than `threshold`.
+
+        Returns
+        -------
+        clusters : (n_samples, ) np.ndarray
+            Cluster of each sample (between 1 and N_CLUSTERS).
+        """
+
+        n_samples = len(X)
+        X = np.array(X, dtype=np.float64)
+        weights = np.array(weights, dtype=np.float64)
+
+        D = squareform(pdist(X, metric=self.metric))
+        np.fill_diagonal(D, np.inf)
+
+        active = np.ones((n_samples,), dtype=bool)
+        parent = np.arange(n_samples)
+
+        for _ in range(n_samples - 1):
+
+            i, j = np.unravel_index(np.argmin(D), D.shape)
+            if D[i, j] > self.threshold:
+                break
+
+            # merge cluster j into cluster i
+            X[i] = (weights[i] * X[i] + weights[j] * X[j]) / (weights[i] + weights[j])
+            weights[i] += weights[j]
+            parent[parent == j] = i
+            active[j] = False
+            D[j, :] = np.inf
+            D[:, j] = np.inf
+
+            # update distances to pooled cluster i
+            d = cdist(X[i : i + 1], X[active], metric=self.metric)[0]
+            D[i, active] = d
+            D[active, i] = d
+            D[i, i] = np.inf
+
+        _, clusters = np.unique(parent, return_inverse=True)
+        return clusters + 1
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        """Apply clustering
+
+        Parameters
+        ----------
+        X : (n_samples, dimension) np.ndarray
+            Embeddings.
+
+        Returns
+        -------
+        clusters : (n_samples, ) np.ndarray
+            Cluster of each sample.
+        """
+
+        if len(X) <= self.n_centroids:
+            return super().__call__(X)
+
+        centroids, sizes, assignment = self._over_cluster(X)
+        return self._weighted_pool(centroids, sizes)[assignment]
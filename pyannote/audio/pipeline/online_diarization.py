@@ -0,0 +1,758 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Online speaker diarization
+
+Speech activity detection scores and speaker embeddings are consumed as they
+are produced (see `StreamingScorer`) by a `DiarizationStream` that keeps a
+bounded set of speaker centroids. Speaker labels are first provisional and
+become final once `latency` seconds of future embeddings are available: the
+memory used by a stream therefore depends on `latency` and `max_speakers`,
+but not on the duration of the stream.
+
+>>> pipeline = OnlineSpeakerDiarization(sad_scores="sad", embedding="emb",
+...                                     latency=2.0)
+>>> pipeline.instantiate(params)
+
+# live usage, with `chunks` an iterable of (n_samples, 1) audio chunks
+>>> for finalized, provisional in pipeline.live(chunks):
+...     pass
+
+# offline evaluation (e.g. DER vs. latency trade-off)
+>>> metric = pipeline.get_metric()
+>>> for current_file in protocol.test():
+...     metric(current_file["annotation"], pipeline(current_file),
+...            uem=get_annotated(current_file))
+"""
+
+from collections import deque
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Text
+from typing import Tuple
+
+import numpy as np
+
+from pyannote.core import Annotation
+from pyannote.core import Segment
+from pyannote.core import SlidingWindowFeature
+from pyannote.core.utils.distance import cdist
+from pyannote.pipeline import Pipeline
+from pyannote.pipeline.parameter import Uniform
+from pyannote.metrics.diarization import GreedyDiarizationErrorRate
+
+from pyannote.audio.features.wrapper import Wrapper, Wrappable
+from pyannote.audio.utils.profiler import profiled
+from pyannote.audio.utils.signal import Binarize
+from pyannote.audio.utils.signal import to_probability
+
+
+def _get_times(features: SlidingWindowFeature) -> np.ndarray:
+    """Middle time of each frame"""
+    window = features.sliding_window
+    return window.start + 0.5 * window.duration + window.step * np.arange(
+        len(features)
+    )
+
+
+class StreamingScorer:
+    """Apply a pretrained model on an audio stream, with bounded memory
+
+    The model is applied every `step` seconds on the latest `duration` seconds
+    of audio, and only returns outputs whose frame center was not covered
+    yet. Outputs therefore only depend on past audio.
+
+    Parameters
+    ----------
+    scorer : Wrappable
+        Pretrained model. See pyannote.audio.features.wrapper.Wrapper.
+    duration : float, optional
+        Duration of audio buffer, in seconds. Defaults to model duration.
+    step : float, optional
+        Model is applied every `step` seconds. Defaults to model step.
+
+    Usage
+    -----
+    >>> scorer = StreamingScorer("sad")
+    >>> for chunk in chunks:  # (n_samples, 1) chunks at scorer.sample_rate
+    ...     times, data = scorer.update(chunk)
+    """
+
+    def __init__(
+        self,
+        scorer: Wrappable,
+        duration: Optional[float] = None,
+        step: Optional[float] = None,
+    ):
+        super().__init__()
+
+        self.scorer = Wrapper(scorer)
+        self.sample_rate = self.scorer.sample_rate
+        self.duration = self.scorer.duration if duration is None else duration
+        if step is None:
+            step = self.scorer.step * self.scorer.duration
+        self.step = step
+
+        self._buffer_size = int(np.round(self.duration * self.sample_rate))
+        self._step_size = max(1, int(np.round(self.step * self.sample_rate)))
+        self.reset()
+
+    def reset(self):
+        """Start a new stream"""
+        self._buffer = np.zeros((0, 1), dtype=np.float32)
+        # absolute index of the first buffered sample
+        self._buffer_start = 0
+        # absolute index of the end of the next processed window
+        self._next_end = self._buffer_size
+        # middle time of the latest returned frame
+        self._last = -np.inf
+
+    def update(self, samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Process new audio samples
+
+        Parameters
+        ----------
+        samples : (n_samples, 1) np.ndarray
+            New audio samples (at `sample_rate`).
+
+        Returns
+        -------
+        times : (n_frames, ) np.ndarray
+            Middle time of new output frames (in seconds, since stream start).
+        data : (n_frames, dimension) np.ndarray
+            New output frames.
+        """
+
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1, 1)
+        self._buffer = np.vstack([self._buffer, samples])
+
+        times, data = [], []
+        buffer_end = self._buffer_start + len(self._buffer)
+        while self._next_end <= buffer_end:
+
+            start = self._next_end - self._buffer_size
+            waveform = self._buffer[
+                start - self._buffer_start : self._next_end - self._buffer_start
+            ]
+            output = self.scorer({"uri": "stream", "waveform": waveform})
+
+            t = start / self.sample_rate + _get_times(output)
+            new = t > self._last
+            if np.any(new):
+                times.append(t[new])
+                data.append(output.data[new])
+                self._last = t[new][-1]
+
+            self._next_end += self._step_size
+
+        # only keep what is needed for the next window
+        keep_from = self._next_end - self._buffer_size
+        if keep_from > self._buffer_start:
+            self._buffer = self._buffer[keep_from - self._buffer_start :]
+            self._buffer_start = keep_from
+
+        if not times:
+            return np.zeros((0,)), None
+        return np.hstack(times), np.vstack(data)
+
+
+class DiarizationStream:
+    """Incremental speaker diarization with bounded state
+
+    Speech regions are obtained with onset/offset thresholding of speech
+    probability. Each embedding frame is labeled once `latency` seconds of
+    future embeddings are available, using the average of (speech) embeddings
+    in a ±`latency` window: it is assigned to the closest speaker centroid if
+    closer than `threshold` and starts a new speaker otherwise (even in the
+    middle of a speech turn). Centroids are then updated with a running
+    average. Two centroids closer than `merge_threshold` are merged, and the
+    two closest centroids are merged when a new speaker is needed but
+    `max_speakers` centroids already exist. Labels that have already been
+    finalized are never modified: merges only apply to what comes next.
+
+    One should rather use `OnlineSpeakerDiarization.stream()` than
+    instantiate this class directly.
+
+    Parameters
+    ----------
+    onset, offset : float
+        Speech activity detection thresholds.
+    threshold : float
+        Maximum distance between an embedding and its speaker centroid.
+    merge_threshold : float
+        Centroids closer than this are merged.
+    metric : {'euclidean', 'cosine', 'angular'}, optional
+        Defaults to 'cosine'.
+    latency : float, optional
+        Delay (in seconds) after which labels are finalized. Defaults to 1s.
+    max_speakers : int, optional
+        Maximum number of speaker centroids. Defaults to 20.
+    max_weight : int, optional
+        Maximum weight of a centroid in its running average, so that it
+        keeps adapting to its speaker. Defaults to 100.
+    uri : Text, optional
+        Resource identifier of returned annotations.
+    """
+
+    def __init__(
+        self,
+        onset: float,
+        offset: float,
+        threshold: float,
+        merge_threshold: float,
+        metric: Text = "cosine",
+        latency: float = 1.0,
+        max_speakers: int = 20,
+        max_weight: int = 100,
+        uri: Optional[Text] = None,
+    ):
+        super().__init__()
+
+        self.threshold = threshold
+        self.merge_threshold = merge_threshold
+        self.metric = metric
+        self.latency = latency
+        self.max_speakers = max_speakers
+        self.max_weight = max_weight
+        self.uri = uri
+
+        # speech activity detection state
+        self._binarize = Binarize(onset=onset, offset=offset)
+        self._active = False
+        self._speech_start = None
+        self._speech_time = -np.inf
+        self._speech = deque()  # completed speech regions, as (start, end)
+
+        # embedding frames waiting for (or needed by) labeling
+        self._times = deque()
+        self._embeddings = deque()
+        self._n_labeled = 0  # number of frames of `_times` already labeled
+        self._boundary = None  # end of the latest labeled frame
+
+        # speaker centroids
+        self._centroids = None
+        self._weights = None
+        self._labels = None
+        self._n_speakers = 0
+
+        # finalized speaker turn that may still be extended, as
+        # [start, end, label]
+        self._turn = None
+
+    def _update_speech(self, times: np.ndarray, probability: np.ndarray):
+
+        if len(times) == 0:
+            return
+
+        # prepend current state so that thresholding resumes from it
+        data = np.hstack([[1.0 if self._active else 0.0], probability])
+        active = self._binarize.hysteresis(data[:, np.newaxis])[1:, 0]
+
+        previous = np.hstack([[self._active], active[:-1]])
+        for t, is_active in zip(times[active != previous], active[active != previous]):
+            if is_active:
+                self._speech_start = t
+            else:
+                self._speech.append((self._speech_start, t))
+                self._speech_start = None
+
+        self._active = bool(active[-1])
+        self._speech_time = times[-1]
+
+    def _speech_regions(self):
+        """Known speech regions (open region ends at latest known time)"""
+        regions = list(self._speech)
+        if self._active:
+            regions.append((self._speech_start, np.inf))
+        return regions
+
+    def _in_speech(self, times: np.ndarray) -> np.ndarray:
+        in_speech = np.zeros((len(times),), dtype=bool)
+        for start, end in self._speech_regions():
+            in_speech |= (times >= start) & (times <= end)
+        return in_speech
+
+    def _assign(self, x: np.ndarray, update: bool = True) -> int:
+        """Assign embedding to closest speaker (and update centroids)"""
+
+        if self._centroids is not None:
+            distance = cdist(x[np.newaxis], self._centroids, metric=self.metric)[0]
+            k = int(np.argmin(distance))
+            if distance[k] <= self.threshold:
+                if update:
+                    return self._update_centroid(k, x)
+                return self._labels[k]
+
+        if not update:
+            return None
+
+        # new speaker
+        if self._centroids is None:
+            self._centroids = x[np.newaxis].copy()
+            self._weights = np.ones((1,))
+            self._labels = [self._n_speakers]
+        else:
+            if len(self._centroids) >= self.max_speakers:
+                self._merge_closest()
+            self._centroids = np.vstack([self._centroids, x])
+            self._weights = np.hstack([self._weights, 1.0])
+            self._labels.append(self._n_speakers)
+        self._n_speakers += 1
+        return self._labels[-1]
+
+    def _update_centroid(self, k: int, x: np.ndarray):
+        """Update centroid k with embedding x and return its (final) label"""
+
+        w = self._weights[k]
+        self._centroids[k] = (w * self._centroids[k] + x) / (w + 1)
+        self._weights[k] = min(w + 1, self.max_weight)
+
+        # merge centroids that got too close to the updated one
+        if len(self._centroids) > 1:
+            distance = cdist(
+                self._centroids[k : k + 1], self._centroids, metric=self.metric
+            )[0]
+            distance[k] = np.inf
+            j = int(np.argmin(distance))
+            if distance[j] < self.merge_threshold:
+                return self._merge(k, j)
+
+        return self._labels[k]
+
+    def _merge_closest(self):
+        distance = cdist(self._centroids, self._centroids, metric=self.metric)
+        np.fill_diagonal(distance, np.inf)
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        self._merge(i, j)
+
+    def _merge(self, i: int, j: int):
+        """Merge centroids i and j and return label of merged centroid"""
+
+        # keep the label of the most established speaker
+        if self._weights[j] > self._weights[i]:
+            i, j = j, i
+
+        wi, wj = self._weights[i], self._weights[j]
+        self._centroids[i] = (wi * self._centroids[i] + wj * self._centroids[j]) / (
+            wi + wj
+        )
+        self._weights[i] = min(wi + wj, self.max_weight)
+
+        self._centroids = np.delete(self._centroids, j, axis=0)
+        self._weights = np.delete(self._weights, j)
+        label = self._labels[i]
+        del self._labels[j]
+        return label
+
+    def _smoothed(self, t: float) -> Optional[np.ndarray]:
+        """Average speech embedding in [t - latency, t + latency]"""
+
+        times = np.array(self._times)
+        close = np.abs(times - t) <= self.latency
+        close &= self._in_speech(times)
+        X = [self._embeddings[i] for i in np.where(close)[0]]
+        X = [x for x in X if x is not None]
+        if not X:
+            return None
+        return np.mean(X, axis=0)
+
+    def _emit(self, start: float, end: float, label, finalized: Annotation):
+        """Add labeled region to finalized speaker turns"""
+
+        if end <= start:
+            return
+
+        if self._turn is not None:
+            turn_start, turn_end, turn_label = self._turn
+            if turn_label == label and start <= turn_end + 1e-6:
+                self._turn[1] = max(turn_end, end)
+                return
+            finalized[Segment(turn_start, turn_end)] = turn_label
+
+        self._turn = [start, end, label]
+
+    def _label_frame(self, i: int, end: float, finalized: Annotation):
+
+        t = self._times[i]
+        start = self._boundary
+        self._boundary = end
+
+        regions = [
+            (max(s, start), min(e, end))
+            for s, e in self._speech_regions()
+            if s < end and e > start
+        ]
+        if not regions:
+            return
+
+        x = self._smoothed(t)
+        if x is None:
+            # no usable embedding: extend previous speaker turn, if any
+            if self._turn is None:
+                return
+            label = self._turn[2]
+        else:
+            label = self._assign(x)
+
+        for s, e in regions:
+            self._emit(s, e, label, finalized)
+
+    def _prune(self):
+
+        if self._boundary is None:
+            return
+
+        # labeled frames are only needed for smoothing the next ones
+        if self._n_labeled < len(self._times):
+            horizon = self._times[self._n_labeled] - self.latency
+        else:
+            horizon = self._boundary
+        while self._n_labeled > 0 and self._times[0] < horizon:
+            self._times.popleft()
+            self._embeddings.popleft()
+            self._n_labeled -= 1
+
+        horizon = min(horizon, self._boundary)
+        while self._speech and self._speech[0][1] < horizon:
+            self._speech.popleft()
+
+    def update(
+        self,
+        speech: Tuple[np.ndarray, np.ndarray] = None,
+        embedding: Tuple[np.ndarray, np.ndarray] = None,
+    ) -> Annotation:
+        """Process new speech activity detection and embedding frames
+
+        Parameters
+        ----------
+        speech : (times, probability) tuple, optional
+            Middle time (in seconds) and speech probability of new frames.
+        embedding : (times, embeddings) tuple, optional
+            Middle time (in seconds) and (n_frames, dimension) embeddings of
+            new frames. Embeddings containing NaN are ignored.
+
+        Returns
+        -------
+        finalized : `Annotation`
+            Speaker turns finalized by this update.
+        """
+
+        if speech is not None:
+            self._update_speech(*speech)
+
+        if embedding is not None:
+            times, X = embedding
+            for t, x in zip(times, X if X is not None else []):
+                self._times.append(t)
+                self._embeddings.append(None if np.any(np.isnan(x)) else x)
+
+        return self._finalize(flush=False)
+
+    def _finalize(self, flush: bool = False) -> Annotation:
+
+        finalized = Annotation(uri=self.uri, modality="speaker")
+
+        while self._n_labeled < len(self._times):
+
+            i = self._n_labeled
+            t = self._times[i]
+            if self._boundary is None:
+                self._boundary = t
+
+            if i + 1 < len(self._times):
+                end = 0.5 * (t + self._times[i + 1])
+            elif flush:
+                end = max(t, self._speech_time)
+            else:
+                break
+
+            # wait for future embeddings and speech activity detection (the
+            # latter over the whole smoothing window, so that labels do not
+            # depend on how the stream is chunked)
+            horizon = max(end, t + self.latency)
+            if not flush and (
+                self._times[-1] < t + self.latency or self._speech_time < horizon
+            ):
+                break
+
+            self._label_frame(i, end, finalized)
+            self._n_labeled += 1
+
+        if flush and self._turn is not None:
+            start, end, label = self._turn
+            finalized[Segment(start, end)] = label
+            self._turn = None
+
+        self._prune()
+        return finalized
+
+    def flush(self) -> Annotation:
+        """Finalize all pending frames (e.g. at the end of the stream)
+
+        Returns
+        -------
+        finalized : `Annotation`
+            Speaker turns finalized by this call.
+        """
+        if self._active:
+            self._speech.append((self._speech_start, self._speech_time))
+            self._active = False
+        return self._finalize(flush=True)
+
+    def provisional(self) -> Annotation:
+        """Provisional labels of frames that are not finalized yet
+
+        Returns
+        -------
+        provisional : `Annotation`
+            Current speaker turn (finalized labels, but possibly extended by
+            next updates) and provisional labels of pending frames. These are
+            obtained the same way as finalized ones (i.e. from embeddings
+            smoothed over the available context) but using current centroids
+            (which are left unchanged).
+        """
+
+        provisional = Annotation(uri=self.uri, modality="speaker")
+
+        label = None
+        if self._turn is not None:
+            start, end, label = self._turn
+            provisional[Segment(start, end)] = label
+
+        start = self._boundary
+        for i in range(self._n_labeled, len(self._times) - 1):
+            t = self._times[i]
+            end = 0.5 * (t + self._times[i + 1])
+            if start is None:
+                start = t
+            # no usable embedding: extend previous speaker turn, if any
+            x = self._smoothed(t)
+            if x is not None:
+                label = self._assign(x, update=False)
+            if label is not None and self._in_speech(np.array([t]))[0]:
+                provisional[Segment(start, end)] = label
+            start = end
+
+        return provisional.support()
+
+
+class OnlineSpeakerDiarization(Pipeline):
+    """Online speaker diarization pipeline
+
+    Parameters
+    ----------
+    sad_scores : Wrappable, optional
+        Describes how raw speech activity detection scores should be obtained.
+        See pyannote.audio.features.wrapper.Wrapper documentation for details.
+        Defaults to "@sad_scores" that indicates that protocol files provide
+        the scores in the "sad_scores" key. Live processing (`live`) requires
+        a pretrained model.
+    embedding : Wrappable, optional
+        Describes how raw speaker embeddings should be obtained. Defaults to
+        "@emb" that indicates that protocol files provide the embeddings in
+        the "emb" key. Live processing (`live`) requires a pretrained model.
+    metric : {'euclidean', 'cosine', 'angular'}, optional
+        Metric used for comparing embeddings. Defaults to 'cosine'.
+    latency : float, optional
+        Delay (in seconds) after which speaker labels are finalized. Note that
+        embeddings themselves are extracted from sliding windows and therefore
+        add half their window duration to the actual latency. Defaults to 1s.
+    max_speakers : int, optional
+        Maximum number of speaker centroids kept in memory. Defaults to 20.
+    chunk_duration : float, optional
+        When applied on a whole file (e.g. for offline evaluation), scores are
+        fed to the stream by chunks of `chunk_duration` seconds. This has no
+        effect on the output. Defaults to 10s.
+    sad_log_scale : bool, optional
+        Set to True to indicate that speech activity detection scores are
+        log-probabilities, or to False to indicate that they are
+        probabilities. Defaults to deriving it from the pretrained model
+        providing the scores, if any, and to guessing it from the scores
+        otherwise (see `pyannote.audio.utils.signal.to_probability`).
+
+    Hyper-parameters
+    ----------------
+    onset, offset : `float`
+        Speech activity detection thresholds.
+    threshold : `float`
+        Maximum distance between an embedding and its speaker centroid.
+    merge_threshold : `float`
+        Speaker centroids closer than this are merged.
+    """
+
+    def __init__(
+        self,
+        sad_scores: Wrappable = None,
+        embedding: Wrappable = None,
+        metric: Optional[str] = "cosine",
+        latency: float = 1.0,
+        max_speakers: int = 20,
+        chunk_duration: float = 10.0,
+        sad_log_scale: Optional[bool] = None,
+    ):
+        super().__init__()
+
+        if sad_scores is None:
+            sad_scores = "@sad_scores"
+        self.sad_scores = sad_scores
+        self._sad_scores = Wrapper(self.sad_scores, memoize=True)
+        if sad_log_scale is None:
+            sad_log_scale = getattr(self._sad_scores, "log_scale", None)
+        self.sad_log_scale = sad_log_scale
+
+        if embedding is None:
+            embedding = "@emb"
+        self.embedding = embedding
+        self._embedding = Wrapper(self.embedding, memoize=True)
+
+        self.metric = metric
+        self.latency = latency
+        self.max_speakers = max_speakers
+        self.chunk_duration = chunk_duration
+
+        # hyper-parameters
+        self.onset = Uniform(0.0, 1.0)
+        self.offset = Uniform(0.0, 1.0)
+        self.threshold = Uniform(0.0, 2.0)
+        self.merge_threshold = Uniform(0.0, 2.0)
+
+    def stream(self, uri: Optional[Text] = None) -> DiarizationStream:
+        """Start a new stream
+
+        Parameters
+        ----------
+        uri : Text, optional
+            Resource identifier of returned annotations.
+
+        Returns
+        -------
+        stream : `DiarizationStream`
+        """
+        return DiarizationStream(
+            self.onset,
+            self.offset,
+            self.threshold,
+            self.merge_threshold,
+            metric=self.metric,
+            latency=self.latency,
+            max_speakers=self.max_speakers,
+            uri=uri,
+        )
+
+    def _to_probability(self, data: np.ndarray) -> np.ndarray:
+        """Convert raw speech activity detection scores to speech probability"""
+        return to_probability(data, log_scale=self.sad_log_scale)
+
+    @profiled("online_diarization")
+    def __call__(self, current_file: dict) -> Annotation:
+        """Apply online speaker diarization on a whole file
+
+        The file is processed as if it were streamed: output is therefore
+        the same as the one obtained with `live`, except for the fact that
+        (precomputed) scores may have been extracted with more context.
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol.
+
+        Returns
+        -------
+        hypothesis : `pyannote.core.Annotation`
+            Finalized speaker turns.
+        """
+
+        sad_scores = self._sad_scores(current_file)
+        sad_times = _get_times(sad_scores)
+        speech_prob = self._to_probability(sad_scores.data)
+
+        embedding = self._embedding(current_file)
+        emb_times = _get_times(embedding)
+
+        uri = current_file.get("uri", None)
+        stream = self.stream(uri=uri)
+        hypothesis = Annotation(uri=uri, modality="speaker")
+
+        end = max(
+            sad_times[-1] if len(sad_times) else 0.0,
+            emb_times[-1] if len(emb_times) else 0.0,
+        )
+        chunks = np.append(
+            np.arange(0.0, max(end, self.chunk_duration), self.chunk_duration), np.inf
+        )
+        sad_chunks = np.searchsorted(sad_times, chunks)
+        emb_chunks = np.searchsorted(emb_times, chunks)
+        for (s, e), (i, j) in zip(
+            zip(sad_chunks[:-1], sad_chunks[1:]), zip(emb_chunks[:-1], emb_chunks[1:])
+        ):
+            finalized = stream.update(
+                speech=(sad_times[s:e], speech_prob[s:e]),
+                embedding=(emb_times[i:j], embedding.data[i:j]),
+            )
+            hypothesis.update(finalized, copy=False)
+
+        hypothesis.update(stream.flush(), copy=False)
+        return hypothesis
+
+    def live(
+        self, chunks: Iterable[np.ndarray]
+    ) -> Iterator[Tuple[Annotation, Annotation]]:
+        """Apply online speaker diarization on an audio stream
+
+        Parameters
+        ----------
+        chunks : iterable of (n_samples, 1) np.ndarray
+            Audio chunks (at the sample rate expected by both models).
+
+        Yields
+        ------
+        finalized : `Annotation`
+            Speaker turns finalized since previous chunk.
+        provisional : `Annotation`
+            Provisional speaker turns (see `DiarizationStream.provisional`).
+        """
+
+        sad_scorer = StreamingScorer(self.sad_scores)
+        emb_scorer = StreamingScorer(self.embedding)
+
+        stream = self.stream(uri="stream")
+        for chunk in chunks:
+            sad_times, sad_scores = sad_scorer.update(chunk)
+            speech = None
+            if len(sad_times) > 0:
+                speech = (sad_times, self._to_probability(sad_scores))
+            embedding = emb_scorer.update(chunk)
+            finalized = stream.update(speech=speech, embedding=embedding)
+            yield finalized, stream.provisional()
+
+        yield stream.flush(), Annotation(uri="stream", modality="speaker")
+
+    def get_metric(self) -> GreedyDiarizationErrorRate:
+        """Return new instance of diarization error rate metric"""
+        return GreedyDiarizationErrorRate(collar=0.0, skip_overlap=False)
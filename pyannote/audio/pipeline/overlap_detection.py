@@ -46,6 +46,9 @@ from pyannote.metrics.detection import DetectionRecall
 from pyannote.metrics.detection import DetectionPrecisionRecallFMeasure
 from pyannote.metrics import f_measure
 from pyannote.audio.features.wrapper import Wrapper, Wrappable
+from pyannote.audio.utils.profiler import profiled
+from .utils import get_overlap
+from .utils import LRUCache
 
 
 class OverlapDetection(Pipeline):
@@ -83,11 +86,16 @@ class OverlapDetection(Pipeline):
         if scores is None:
             scores = "@ovl_scores"
         self.scores = scores
-        self._scores = Wrapper(self.scores)
+        self._scores = Wrapper(self.scores, memoize=True)
 
         self.precision = precision
         self.fscore = fscore
 
+        # overlap references, indexed by reference annotation content, so that
+        # they are only computed once per file when the pipeline is evaluated
+        # repeatedly (e.g. during tuning)
+        self._overlap_references = LRUCache(max_entries=1024)
+
         # hyper-parameters
         self.onset = Uniform(0.0, 1.0)
         self.offset = Uniform(0.0, 1.0)
@@ -108,8 +116,8 @@ class OverlapDetection(Pipeline):
             pad_offset=self.pad_offset,
         )
 
-    def __call__(self, current_file: dict) -> Annotation:
-        """Apply overlap detection
+    def get_probability(self, current_file: dict) -> SlidingWindowFeature:
+        """Get overlap probability
 
         Parameters
         ----------
@@ -119,8 +127,8 @@ class OverlapDetection(Pipeline):
 
         Returns
         -------
-        overlap : `pyannote.core.Annotation`
-            Overlap regions.
+        overlap_prob : `pyannote.core.SlidingWindowFeature`
+            Overlapped speech probability.
         """
 
         ovl_scores = self._scores(current_file)
@@ -143,6 +151,25 @@ class OverlapDetection(Pipeline):
         else:
             overlap_prob = SlidingWindowFeature(data, ovl_scores.sliding_window)
 
+        return overlap_prob
+
+    @profiled("overlap_detection")
+    def __call__(self, current_file: dict) -> Annotation:
+        """Apply overlap detection
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol. May contain a
+            'ovl_scores' key providing precomputed scores.
+
+        Returns
+        -------
+        overlap : `pyannote.core.Annotation`
+            Overlap regions.
+        """
+
+        overlap_prob = self.get_probability(current_file)
         overlap = self._binarize.apply(overlap_prob)
 
         overlap.uri = current_file.get("uri", None)
@@ -163,14 +190,41 @@ class OverlapDetection(Pipeline):
             Overlapped speech reference.
         """
 
-        overlap = Timeline(uri=reference.uri)
-        for (s1, t1), (s2, t2) in reference.co_iter(reference):
-            l1 = reference[s1, t1]
-            l2 = reference[s2, t2]
-            if l1 == l2:
-                continue
-            overlap.add(s1 & s2)
-        return overlap.support().to_annotation()
+        return get_overlap(reference).to_annotation()
+
+    def _to_overlap(self, reference: Annotation) -> Annotation:
+        """Cached version of `to_overlap`"""
+        key = (reference.uri, tuple(reference.itertracks(yield_label=True)))
+        return self._overlap_references.get(key, lambda: self.to_overlap(reference))
+
+    def _get_overlap_reference(self, current_file: dict) -> Annotation:
+        """Get overlapped speech reference of a file
+
+        Relies on precomputed current_file["overlap_reference"] when
+        available, and computes (and stores) it otherwise.
+        """
+
+        if "overlap_reference" not in current_file:
+            current_file["overlap_reference"] = self._to_overlap(
+                current_file["annotation"]
+            )
+        return current_file["overlap_reference"]
+
+    def get_reference(self, current_file: dict) -> Timeline:
+        """Get reference overlapped speech regions (as used by `get_metric`)
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol. May contain a
+            'overlap_reference' key providing precomputed reference.
+
+        Returns
+        -------
+        overlap : `pyannote.core.Timeline`
+            Reference overlapped speech regions.
+        """
+        return self._get_overlap_reference(current_file).get_timeline()
 
     def get_metric(self, **kwargs) -> DetectionPrecisionRecallFMeasure:
         """Get overlapped speech detection metric
@@ -193,7 +247,7 @@ class OverlapDetection(Pipeline):
                 **kwargs
             ) -> dict:
                 return super().compute_components(
-                    self.to_overlap(reference), hypothesis, uem=uem, **kwargs
+                    self._to_overlap(reference), hypothesis, uem=uem, **kwargs
                 )
 
         return _Metric()
@@ -206,7 +260,8 @@ class OverlapDetection(Pipeline):
         Parameters
         ----------
         current_file : `dict`
-            File as provided by a pyannote.database protocol.
+            File as provided by a pyannote.database protocol. May contain a
+            'overlap_reference' key providing precomputed reference.
         hypothesis : `pyannote.core.Annotation`
             Overlap regions.
 
@@ -219,13 +274,7 @@ class OverlapDetection(Pipeline):
         precision = DetectionPrecision()
         recall = DetectionRecall()
 
-        if "overlap_reference" in current_file:
-            overlap_reference = current_file["overlap_reference"]
-
-        else:
-            reference = current_file["annotation"]
-            overlap_reference = self.to_overlap(reference)
-            current_file["overlap_reference"] = overlap_reference
+        overlap_reference = self._get_overlap_reference(current_file)
 
         uem = get_annotated(current_file)
         p = precision(overlap_reference, hypothesis, uem=uem)
@@ -25,15 +25,15 @@
 
 # AUTHORS
 # Hervé BREDIN - http://herve.niderb.fr
-
-raise NotImplementedError("FIXME")
-
+from typing import Iterable
+from typing import Iterator
 from typing import Optional
+from typing import Text
+from typing import Union
 from pathlib import Path
-import yaml
 
+import numpy as np
 import torch
-from functools import partial
 from pyannote.core.utils.helper import get_class_by_name
 
 from pyannote.pipeline import Pipeline
@@ -42,6 +42,7 @@ from pyannote.pipeline.parameter import LogUniform
 from pyannote.pipeline.parameter import Uniform
 
 from pyannote.core import Annotation
+from pyannote.core import SlidingWindowFeature
 from pyannote.metrics.diarization import GreedyDiarizationErrorRate
 
 from pyannote.audio.labeling.tasks.resegmentation import (
@@ -78,6 +79,25 @@ class Resegmentation(Pipeline):
         Defaults to 32.
     gpu : `boolean`, optional
         Defaults to False.
+    pretrained : `Path`, optional
+        Path to model weights used to initialize self-training of every file.
+        Defaults to sharing one random initialization among all files.
+    patience : `int`, optional
+        Stop self-training of a file early when its loss has not decreased for
+        that many epochs. Defaults to always train for `epochs` epochs.
+    n_jobs : `int`, optional
+        Number of files processed concurrently by `apply_iter`. Defaults to 1.
+
+    Usage
+    -----
+    Calling the pipeline (as done by `pyannote-pipeline apply` and during
+    hyper-parameter tuning) processes one file at a time. Use `apply_iter`
+    to self-train several files concurrently:
+
+    >>> pipeline = Resegmentation(n_jobs=4).instantiate(params)
+    >>> files = list(protocol.test())
+    >>> for current_file, hypothesis in zip(files, pipeline.apply_iter(files)):
+    ...     pipeline.write_rttm(fp, hypothesis)
 
     Sample configuration file
     -------------------------
@@ -87,6 +107,9 @@ class Resegmentation(Pipeline):
             duration: 3
             batch_size: 32
             gpu: True
+            pretrained: /path/to/train/weights/0100.pt
+            patience: 3
+            n_jobs: 4
             overlap: True
             keep_sad: True
             feature_extraction:
@@ -134,7 +157,11 @@ class Resegmentation(Pipeline):
         duration: Optional[float] = 2.0,
         batch_size: Optional[float] = 32,
         gpu: Optional[bool] = False,
+        pretrained: Optional[Union[Text, Path]] = None,
+        patience: Optional[int] = None,
+        n_jobs: int = 1,
     ):
+        super().__init__()
 
         # feature extraction
         if feature_extraction is None:
@@ -191,6 +218,10 @@ class Resegmentation(Pipeline):
         self.gpu = gpu
         self.device_ = torch.device("cuda") if self.gpu else torch.device("cpu")
 
+        self.pretrained = pretrained
+        self.patience = patience
+        self.n_jobs = n_jobs
+
         # hyper-parameters
         self.learning_rate = LogUniform(1e-3, 1)
         self.epochs = Integer(10, 50)
@@ -203,21 +234,27 @@ class Resegmentation(Pipeline):
 
         ensemble = min(self.epochs, self.ensemble)
 
+        kwargs = {
+            "lock_speech": self.keep_sad,
+            "mask": None if self.mask is None else "mask",
+            "epochs": self.epochs,
+            "learning_rate": self.learning_rate,
+            "ensemble": ensemble,
+            "n_jobs": self.n_jobs,
+            "device": self.device_,
+            "duration": self.duration,
+            "batch_size": self.batch_size,
+            "pretrained": self.pretrained,
+            "patience": self.patience,
+        }
+
         if self.overlap:
             self._resegmentation = _ResegmentationWithOverlap(
                 self.feature_extraction_,
                 self.Architecture_,
                 self.architecture_params_,
-                keep_sad=self.keep_sad,
-                mask_dimension=self.mask_dimension_,
-                mask_logscale=self.mask_logscale_,
                 overlap_threshold=self.overlap_threshold,
-                epochs=self.epochs,
-                learning_rate=self.learning_rate,
-                ensemble=ensemble,
-                device=self.device_,
-                duration=self.duration,
-                batch_size=self.batch_size,
+                **kwargs,
             )
 
         else:
@@ -225,17 +262,23 @@ class Resegmentation(Pipeline):
                 self.feature_extraction_,
                 self.Architecture_,
                 self.architecture_params_,
-                keep_sad=self.keep_sad,
-                mask_dimension=self.mask_dimension_,
-                mask_logscale=self.mask_logscale_,
-                epochs=self.epochs,
-                learning_rate=self.learning_rate,
-                ensemble=ensemble,
-                device=self.device_,
-                duration=self.duration,
-                batch_size=self.batch_size,
+                **kwargs,
             )
 
+    def _get_mask(self, current_file: dict) -> dict:
+        """Select (and rescale) mask dimension"""
+
+        if self.mask is None:
+            return current_file
+
+        current_file = dict(current_file)
+        scores = current_file["mask"]
+        data = scores.data[:, self.mask_dimension_ : self.mask_dimension_ + 1]
+        if self.mask_logscale_:
+            data = np.exp(data)
+        current_file["mask"] = SlidingWindowFeature(data, scores.sliding_window)
+        return current_file
+
     def __call__(self, current_file: dict) -> Annotation:
         """Apply resegmentation
 
@@ -252,7 +295,26 @@ class Resegmentation(Pipeline):
             Resegmented hypothesis.
         """
 
-        return self._resegmentation.apply(current_file)
+        return self._resegmentation(
+            self._get_mask(current_file), current_file["hypothesis"]
+        )
+
+    def apply_iter(self, files: Iterable[dict]) -> Iterator[Annotation]:
+        """Apply resegmentation to several files concurrently
+
+        Parameters
+        ----------
+        files : iterable of `dict`
+            Files as provided by a pyannote.database protocol.
+
+        Yields
+        ------
+        new_hypothesis : `pyannote.core.Annotation`
+            Resegmented hypothesis, in the same order as `files`.
+        """
+
+        files = (self._get_mask(current_file) for current_file in files)
+        return self._resegmentation.apply_iter(files, n_jobs=self.n_jobs)
 
     def get_metric(self) -> GreedyDiarizationErrorRate:
         """Return new instance of detection error rate metric"""
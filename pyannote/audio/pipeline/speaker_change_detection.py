@@ -45,6 +45,7 @@ from pyannote.metrics.segmentation import SegmentationPurityCoverageFMeasure
 from pyannote.metrics.diarization import DiarizationPurityCoverageFMeasure
 
 from pyannote.audio.features.wrapper import Wrapper, Wrappable
+from pyannote.audio.utils.profiler import profiled
 
 
 class SpeakerChangeDetection(Pipeline):
@@ -86,7 +87,7 @@ class SpeakerChangeDetection(Pipeline):
         if scores is None:
             scores = "@scd_scores"
         self.scores = scores
-        self._scores = Wrapper(self.scores)
+        self._scores = Wrapper(self.scores, memoize=True)
 
         self.purity = purity
         self.fscore = fscore
@@ -101,8 +102,8 @@ class SpeakerChangeDetection(Pipeline):
 
         self._peak = Peak(alpha=self.alpha, min_duration=self.min_duration)
 
-    def __call__(self, current_file: dict) -> Annotation:
-        """Apply change detection
+    def get_probability(self, current_file: dict) -> SlidingWindowFeature:
+        """Get speaker change probability
 
         Parameters
         ----------
@@ -112,8 +113,8 @@ class SpeakerChangeDetection(Pipeline):
 
         Returns
         -------
-        speech : `pyannote.core.Annotation`
-            Speech regions.
+        change_prob : `pyannote.core.SlidingWindowFeature`
+            Speaker change probability.
         """
 
         scd_scores = self._scores(current_file)
@@ -133,6 +134,26 @@ class SpeakerChangeDetection(Pipeline):
         # and regression scores)
         change_prob = SlidingWindowFeature(data[:, -1], scd_scores.sliding_window)
 
+        return change_prob
+
+    @profiled("speaker_change_detection")
+    def __call__(self, current_file: dict) -> Annotation:
+        """Apply change detection
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol.  May contain a
+            'scd_scores' key providing precomputed scores.
+
+        Returns
+        -------
+        speech : `pyannote.core.Annotation`
+            Speech regions.
+        """
+
+        change_prob = self.get_probability(current_file)
+
         # peak detection
         change = self._peak.apply(change_prob)
         change.uri = current_file.get("uri", None)
@@ -26,13 +26,17 @@
 # AUTHORS
 # Hervé BREDIN - http://herve.niderb.fr
 
+import json
 from pathlib import Path
+from typing import Dict
 from typing import Optional
+from typing import Tuple
 from typing import Union
 from typing import Text
 
 from pyannote.core import Annotation
 from pyannote.database import get_annotated
+from pyannote.database.util import get_unique_identifier
 
 from pyannote.metrics.diarization import GreedyDiarizationErrorRate
 from pyannote.metrics.diarization import DiarizationPurityCoverageFMeasure
@@ -42,6 +46,11 @@ from .speech_turn_segmentation import OracleSpeechTurnSegmentation
 
 from .speech_turn_clustering import SpeechTurnClustering
 from .speech_turn_assignment import SpeechTurnClosestAssignment
+from .utils import LRUCache
+from .utils import get_input_fingerprint
+from pyannote.audio.utils.profiler import PROFILER
+from pyannote.audio.utils.profiler import profiled
+from pyannote.audio.features.wrapper import memoizing
 
 from pyannote.pipeline import Pipeline
 from pyannote.pipeline.parameter import Uniform
@@ -77,8 +86,23 @@ class SpeakerDiarization(Pipeline):
         files provide the embeddings in the "emb" key.
     metric : {'euclidean', 'cosine', 'angular'}, optional
         Metric used for comparing embeddings. Defaults to 'cosine'.
-    method : {'pool', 'affinity_propagation'}
+    method : {'pool', 'affinity_propagation', 'two_stage'}
         Clustering method. Defaults to 'pool'.
+    cache_dendrogram : `bool`, optional
+        Cache dendrograms so that trials that do not change speech turns
+        only pay for thresholding them (see `SpeechTurnClustering`).
+        Defaults to False.
+    memoize : `bool`, optional
+        Memoize the output of the segmentation and clustering stages, keyed by
+        file, by its inputs (see `pyannote.audio.pipeline.utils.
+        get_input_fingerprint`), and by the hyper-parameters actually used by
+        each stage, so that hyper-parameter search trials that do not change
+        them (e.g. only `min_duration` or the clustering threshold) reuse
+        previous results. Use `memoization_report()` to get hit rates, and
+        `clear_memoized()` after modifying models or precomputed inputs in
+        place. Defaults to False.
+    max_memoized : `int`, optional
+        Maximum number of memoized outputs, per stage. Defaults to 1024.
     evaluation_only : `bool`
         Only process the evaluated regions. Default to False.
     purity : `float`, optional
@@ -99,6 +123,9 @@ class SpeakerDiarization(Pipeline):
         embedding: Union[Text, Path] = None,
         metric: Optional[str] = "cosine",
         method: Optional[str] = "pool",
+        cache_dendrogram: Optional[bool] = False,
+        memoize: Optional[bool] = False,
+        max_memoized: Optional[int] = 1024,
         evaluation_only: Optional[bool] = False,
         purity: Optional[float] = None,
     ):
@@ -128,14 +155,114 @@ class SpeakerDiarization(Pipeline):
         self.embedding = embedding
         self.metric = metric
         self.method = method
+        self.cache_dendrogram = cache_dendrogram
         self.speech_turn_clustering = SpeechTurnClustering(
-            embedding=self.embedding, metric=self.metric, method=self.method
+            embedding=self.embedding,
+            metric=self.metric,
+            method=self.method,
+            cache_dendrogram=self.cache_dendrogram,
         )
 
+        # share embedding extraction (and memoized embeddings) with clustering
         self.speech_turn_assignment = SpeechTurnClosestAssignment(
-            embedding=self.embedding, metric=self.metric
+            embedding=self.speech_turn_clustering._embedding, metric=self.metric
         )
 
+        self.memoize = memoize
+        self._memoized = {
+            "segmentation": LRUCache(max_entries=max_memoized),
+            "clustering": LRUCache(max_entries=max_memoized),
+        }
+
+    @staticmethod
+    def _get_params(pipeline: Pipeline) -> Text:
+        """Hashable version of (instantiated) hyper-parameters"""
+        return json.dumps(pipeline.parameters(instantiated=True), sort_keys=True)
+
+    # protocol keys used when inputs are not provided explicitly
+    DEFAULT_INPUTS = {
+        "sad_scores": "@sad_scores",
+        "scd_scores": "@scd_scores",
+        "embedding": "@emb",
+    }
+
+    def _get_inputs(self, current_file: dict, *names: Text) -> Tuple:
+        """Identify inputs of a stage (see `get_input_fingerprint`)"""
+
+        inputs = []
+        for name in names:
+            wrappable = getattr(self, name)
+            if wrappable is None:
+                wrappable = self.DEFAULT_INPUTS[name]
+            inputs.append(get_input_fingerprint(current_file, wrappable))
+        return tuple(inputs)
+
+    def clear_memoized(self):
+        """Forget memoized outputs (and reset memoization statistics)"""
+        for cache in self._memoized.values():
+            cache.clear()
+
+    def memoization_report(self) -> Dict[Text, Dict]:
+        """Report memoization hit rates
+
+        Returns
+        -------
+        report : dict
+            Dictionary indexed by stage ("segmentation" and "clustering") with
+            the following keys: "hits", "misses", "hit_rate", and "entries"
+            (number of currently memoized outputs).
+        """
+        return {
+            stage: {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": cache.hit_rate,
+                "entries": len(cache),
+            }
+            for stage, cache in self._memoized.items()
+        }
+
+    @profiled("speaker_diarization/segmentation")
+    def _segment(self, current_file: dict) -> Annotation:
+        """Segmentation into speech turns (memoized if requested)"""
+
+        if not self.memoize:
+            return self.speech_turn_segmentation(current_file)
+
+        key = (
+            get_unique_identifier(current_file),
+            self._get_inputs(current_file, "sad_scores", "scd_scores"),
+            self._get_params(self.speech_turn_segmentation),
+        )
+        speech_turns = self._memoized["segmentation"].get(
+            key, lambda: self.speech_turn_segmentation(current_file)
+        )
+        # downstream stages must not alter memoized output
+        return speech_turns.copy()
+
+    @profiled("speaker_diarization/clustering")
+    def _cluster(self, current_file: dict, long_speech_turns: Annotation) -> Annotation:
+        """Clustering of long speech turns (memoized if requested)"""
+
+        if not self.memoize:
+            return self.speech_turn_clustering(current_file, long_speech_turns)
+
+        # long speech turns only depend on segmentation and min_duration
+        key = (
+            get_unique_identifier(current_file),
+            self._get_inputs(current_file, "sad_scores", "scd_scores", "embedding"),
+            self._get_params(self.speech_turn_segmentation),
+            self.min_duration,
+            self._get_params(self.speech_turn_clustering),
+        )
+        clusters = self._memoized["clustering"].get(
+            key, lambda: self.speech_turn_clustering(current_file, long_speech_turns)
+        )
+        # downstream stages must not alter memoized output
+        return clusters.copy()
+
+    @profiled("speaker_diarization")
+    @memoizing
     def __call__(self, current_file: dict) -> Annotation:
         """Apply speaker diarization
 
@@ -151,7 +278,7 @@ class SpeakerDiarization(Pipeline):
         """
 
         # segmentation into speech turns
-        speech_turns = self.speech_turn_segmentation(current_file)
+        speech_turns = self._segment(current_file)
 
         # some files are only partially annotated and therefore one cannot
         # evaluate speaker diarization results on the whole file.
@@ -184,16 +311,17 @@ class SpeakerDiarization(Pipeline):
             return speech_turns
 
         # first: cluster long speech turns
-        long_speech_turns = self.speech_turn_clustering(current_file, long_speech_turns)
+        long_speech_turns = self._cluster(current_file, long_speech_turns)
 
         # then: assign short speech turns to clusters
         long_speech_turns.rename_labels(generator="string", copy=False)
 
         if len(shrt_speech_turns) > 0:
             shrt_speech_turns.rename_labels(generator="int", copy=False)
-            shrt_speech_turns = self.speech_turn_assignment(
-                current_file, shrt_speech_turns, long_speech_turns
-            )
+            with PROFILER.stage("speaker_diarization/assignment"):
+                shrt_speech_turns = self.speech_turn_assignment(
+                    current_file, shrt_speech_turns, long_speech_turns
+                )
         # merge short/long speech turns
         return long_speech_turns.update(shrt_speech_turns, copy=False).support(
             collar=0.0
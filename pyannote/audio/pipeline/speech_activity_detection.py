@@ -36,6 +36,7 @@ from pyannote.pipeline import Pipeline
 from pyannote.pipeline.parameter import Uniform
 
 from pyannote.core import Annotation
+from pyannote.core import Timeline
 from pyannote.core import SlidingWindowFeature
 
 from pyannote.audio.utils.signal import Binarize
@@ -44,6 +45,7 @@ from pyannote.audio.features import Precomputed
 from pyannote.metrics.detection import DetectionErrorRate
 from pyannote.metrics.detection import DetectionPrecisionRecallFMeasure
 from pyannote.audio.features.wrapper import Wrapper, Wrappable
+from pyannote.audio.utils.profiler import profiled
 
 
 class OracleSpeechActivityDetection(Pipeline):
@@ -97,7 +99,7 @@ class SpeechActivityDetection(Pipeline):
         if scores is None:
             scores = "@sad_scores"
         self.scores = scores
-        self._scores = Wrapper(self.scores)
+        self._scores = Wrapper(self.scores, memoize=True)
 
         self.fscore = fscore
 
@@ -121,8 +123,8 @@ class SpeechActivityDetection(Pipeline):
             pad_offset=self.pad_offset,
         )
 
-    def __call__(self, current_file: dict) -> Annotation:
-        """Apply speech activity detection
+    def get_probability(self, current_file: dict) -> SlidingWindowFeature:
+        """Get speech probability
 
         Parameters
         ----------
@@ -132,8 +134,8 @@ class SpeechActivityDetection(Pipeline):
 
         Returns
         -------
-        speech : `pyannote.core.Annotation`
-            Speech regions.
+        speech_prob : `pyannote.core.SlidingWindowFeature`
+            Speech probability.
         """
 
         sad_scores = self._scores(current_file)
@@ -156,11 +158,45 @@ class SpeechActivityDetection(Pipeline):
         else:
             speech_prob = SlidingWindowFeature(data, sad_scores.sliding_window)
 
+        return speech_prob
+
+    @profiled("speech_activity_detection")
+    def __call__(self, current_file: dict) -> Annotation:
+        """Apply speech activity detection
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol. May contain a
+            'sad_scores' key providing precomputed scores.
+
+        Returns
+        -------
+        speech : `pyannote.core.Annotation`
+            Speech regions.
+        """
+
+        speech_prob = self.get_probability(current_file)
         speech = self._binarize.apply(speech_prob)
 
         speech.uri = current_file.get("uri", None)
         return speech.to_annotation(generator="string", modality="speech")
 
+    def get_reference(self, current_file: dict) -> Timeline:
+        """Get reference speech regions (as used by `get_metric` metrics)
+
+        Parameters
+        ----------
+        current_file : `dict`
+            File as provided by a pyannote.database protocol.
+
+        Returns
+        -------
+        speech : `pyannote.core.Timeline`
+            Reference speech regions.
+        """
+        return current_file["annotation"].get_timeline().support()
+
     def get_metric(
         self, parallel=False
     ) -> Union[DetectionErrorRate, DetectionPrecisionRecallFMeasure]:
@@ -35,6 +35,7 @@ from pyannote.pipeline.blocks.classification import ClosestAssignment
 from pyannote.core import Annotation
 from .utils import assert_int_labels
 from .utils import assert_string_labels
+from .utils import EmbeddingIndex
 from ..features import Precomputed
 
 from pyannote.audio.features.wrapper import Wrapper, Wrappable
@@ -60,7 +61,7 @@ class SpeechTurnClosestAssignment(Pipeline):
         if embedding is None:
             embedding = "@emb"
         self.embedding = embedding
-        self._embedding = Wrapper(self.embedding)
+        self._embedding = Wrapper(self.embedding, memoize=True)
 
         self.metric = metric
 
@@ -89,53 +90,38 @@ class SpeechTurnClosestAssignment(Pipeline):
         assert_string_labels(targets, "targets")
         assert_int_labels(speech_turns, "speech_turns")
 
-        embedding = self._embedding(current_file)
+        index = EmbeddingIndex(self._embedding(current_file))
 
         # gather targets embedding
+        # (being more and more permissive until we have at least one embedding)
         labels = targets.labels()
-        X_targets, targets_labels = [], []
-        for l, label in enumerate(labels):
+        X_targets = index.mean(
+            [targets.label_timeline(label, copy=False) for label in labels],
+            modes=["center", "loose"],
+        )
 
-            timeline = targets.label_timeline(label, copy=False)
-
-            # be more and more permissive until we have
-            # at least one embedding for current speech turn
-            for mode in ["center", "loose"]:
-                x = embedding.crop(timeline, mode=mode)
-                if len(x) > 0:
-                    break
-
-            # skip labels so small we don't have any embedding for it
-            if len(x) < 1:
-                continue
-
-            targets_labels.append(label)
-            X_targets.append(np.mean(x, axis=0))
+        # skip labels so small we don't have any embedding for it
+        found = ~np.any(np.isnan(X_targets), axis=1)
+        targets_labels = [label for label, f in zip(labels, found) if f]
+        X_targets = X_targets[found]
 
         # gather speech turns embedding
         labels = speech_turns.labels()
-        X, assigned_labels, skipped_labels = [], [], []
-        for l, label in enumerate(labels):
-
-            timeline = speech_turns.label_timeline(label, copy=False)
-
-            # be more and more permissive until we have
-            # at least one embedding for current speech turn
-            for mode in ["center", "loose"]:
-                x = embedding.crop(timeline, mode=mode)
-                if len(x) > 0:
-                    break
+        X = index.mean(
+            [speech_turns.label_timeline(label, copy=False) for label in labels],
+            modes=["center", "loose"],
+        )
 
-            # skip labels so small we don't have any embedding for it
-            if len(x) < 1:
-                skipped_labels.append(label)
-                continue
+        found = ~np.any(np.isnan(X), axis=1)
+        assigned_labels = [label for label, f in zip(labels, found) if f]
+        X = X[found]
 
-            assigned_labels.append(label)
-            X.append(np.mean(x, axis=0))
+        # nothing to assign (e.g. when all speech turns fall into gated windows)
+        if len(X) < 1 or len(X_targets) < 1:
+            return speech_turns
 
         # assign speech turns to closest class
-        assignments = self.closest_assignment(np.vstack(X_targets), np.vstack(X))
+        assignments = self.closest_assignment(X_targets, X)
         mapping = {
             label: targets_labels[k]
             for label, k in zip(assigned_labels, assignments)
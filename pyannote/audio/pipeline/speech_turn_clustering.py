@@ -32,11 +32,16 @@ from typing import Optional
 from pyannote.core import Annotation
 from pyannote.core import Timeline
 from pyannote.core.utils.numpy import one_hot_decoding
+from pyannote.database.util import get_unique_identifier
 from pyannote.pipeline import Pipeline
 from pyannote.audio.features import Precomputed
-from pyannote.pipeline.blocks.clustering import HierarchicalAgglomerativeClustering
 from pyannote.pipeline.blocks.clustering import AffinityPropagationClustering
 from .utils import assert_string_labels
+from .utils import get_input_fingerprint
+from .utils import EmbeddingIndex
+from .utils import LRUCache
+from .clustering import HierarchicalAgglomerativeClustering
+from .clustering import TwoStageClustering
 
 from pyannote.audio.features.wrapper import Wrapper, Wrappable
 
@@ -53,14 +58,30 @@ class SpeechTurnClustering(Pipeline):
         the scores in the "emb" key.
     metric : {'euclidean', 'cosine', 'angular'}, optional
         Metric used for comparing embeddings. Defaults to 'cosine'.
-    method : {'pool', 'affinity_propagation'}
+    method : {'pool', 'affinity_propagation', 'two_stage'}
         Set method used for clustering. "pool" stands for agglomerative
         hierarchical clustering with embedding pooling. "affinity_propagation"
-        is for clustering based on affinity propagation. Defaults to "pool".
+        is for clustering based on affinity propagation. "two_stage" is a
+        scalable version of "pool" meant for large numbers of embeddings (e.g.
+        with `window_wise` on long files), sharing the same `threshold`
+        hyper-parameter: see `TwoStageClustering`. Defaults to "pool".
     window_wise : `bool`, optional
         Set `window_wise` to True to apply clustering on embedding extracted
         using the built-in sliding window. Defaults to apply clustering at
         speech turn level (one average embedding per speech turn).
+    cache_dendrogram : `bool`, optional
+        Set `cache_dendrogram` to True to cache the dendrogram of each file
+        (keyed by its speech turns and embeddings), so that only the cheap
+        thresholding step is performed when the pipeline is applied again on
+        the same speech turns with a different `threshold` (e.g. during
+        hyper-parameter tuning). Speech turns or embeddings changing (e.g.
+        because upstream segmentation hyper-parameters changed) automatically
+        lead to a new dendrogram. Embeddings extracted by a model are
+        identified by the model itself: use `clear_dendrograms()` after
+        modifying it in place. Only available for speech turn level
+        agglomerative clustering. Defaults to False.
+    max_cached_dendrograms : `int`, optional
+        Maximum number of cached dendrograms. Defaults to 1024.
     """
 
     def __init__(
@@ -69,13 +90,15 @@ class SpeechTurnClustering(Pipeline):
         metric: Optional[str] = "cosine",
         method: Optional[str] = "pool",
         window_wise: Optional[bool] = False,
+        cache_dendrogram: Optional[bool] = False,
+        max_cached_dendrograms: Optional[int] = 1024,
     ):
         super().__init__()
 
         if embedding is None:
             embedding = "@emb"
         self.embedding = embedding
-        self._embedding = Wrapper(self.embedding)
+        self._embedding = Wrapper(self.embedding, memoize=True)
 
         self.metric = metric
         self.method = method
@@ -94,6 +117,9 @@ class SpeechTurnClustering(Pipeline):
             # have more accurate embeddings, therefore should be prefered for
             # exemplars
 
+        elif self.method == "two_stage":
+            self.clustering = TwoStageClustering(metric=self.metric)
+
         else:
             self.clustering = HierarchicalAgglomerativeClustering(
                 method=self.method, metric=self.metric, use_threshold=True
@@ -101,6 +127,18 @@ class SpeechTurnClustering(Pipeline):
 
         self.window_wise = window_wise
 
+        self.cache_dendrogram = cache_dendrogram
+        if self.cache_dendrogram and (
+            self.window_wise or self.method in ["affinity_propagation", "two_stage"]
+        ):
+            msg = (
+                f"Dendrogram caching is only available for speech turn level "
+                f"agglomerative clustering (got method={self.method} and "
+                f"window_wise={self.window_wise})."
+            )
+            raise ValueError(msg)
+        self._dendrograms = LRUCache(max_entries=max_cached_dendrograms)
+
     def _window_level(self, current_file: dict, speech_regions: Timeline) -> Annotation:
         """Apply clustering at window level
 
@@ -129,8 +167,14 @@ class SpeechTurnClustering(Pipeline):
             ]
         )
 
-        # apply clustering
-        y_pred = self.clustering(X)
+        # apply clustering (skipping embeddings of gated windows, if any)
+        valid = ~np.any(np.isnan(X), axis=1)
+        if np.all(valid):
+            y_pred = self.clustering(X)
+        else:
+            y_pred = np.zeros((len(X),), dtype=np.int8)
+            if np.any(valid):
+                y_pred[valid] = self.clustering(X[valid])
 
         # reconstruct
         y = np.zeros(len(embedding), dtype=np.int8)
@@ -159,6 +203,49 @@ class SpeechTurnClustering(Pipeline):
         # reconstruct hypothesis
         return one_hot_decoding(y, window)
 
+    def _embed(self, current_file: dict, speech_turns: Annotation):
+        """Average embeddings of each speech turn label
+
+        Returns
+        -------
+        clustered_labels : list
+            Labels with at least one embedding.
+        skipped_labels : list
+            Labels so small that we don't have any embedding for them.
+        X : (len(clustered_labels), dimension) np.ndarray
+            Average embedding of each clustered label.
+        """
+
+        index = EmbeddingIndex(self._embedding(current_file))
+
+        # be more and more permissive until we have
+        # at least one embedding for each speech turn
+        labels = speech_turns.labels()
+        X = index.mean(
+            [speech_turns.label_timeline(label, copy=False) for label in labels],
+            modes=["strict", "center", "loose"],
+        )
+
+        # skip labels so small we don't have any embedding for it
+        found = ~np.any(np.isnan(X), axis=1)
+        clustered_labels = [label for label, f in zip(labels, found) if f]
+        skipped_labels = [label for label, f in zip(labels, found) if not f]
+        return clustered_labels, skipped_labels, X[found]
+
+    def _dendrogram(self, current_file: dict, speech_turns: Annotation):
+        """Same as `_embed` but also returns the dendrogram
+
+        Dendrogram is None when there is less than two clustered labels.
+        """
+
+        clustered_labels, skipped_labels, X = self._embed(current_file, speech_turns)
+        Z = self.clustering.dendrogram(X) if len(X) > 1 else None
+        return clustered_labels, skipped_labels, X, Z
+
+    def clear_dendrograms(self):
+        """Forget cached dendrograms"""
+        self._dendrograms.clear()
+
     def _turn_level(self, current_file: dict, speech_turns: Annotation) -> Annotation:
         """Apply clustering at speech turn level
 
@@ -177,31 +264,27 @@ class SpeechTurnClustering(Pipeline):
 
         assert_string_labels(speech_turns, "speech_turns")
 
-        embedding = self._embedding(current_file)
-
-        labels = speech_turns.labels()
-        X, clustered_labels, skipped_labels = [], [], []
-        for l, label in enumerate(labels):
-
-            timeline = speech_turns.label_timeline(label, copy=False)
-
-            # be more and more permissive until we have
-            # at least one embedding for current speech turn
-            for mode in ["strict", "center", "loose"]:
-                x = embedding.crop(timeline, mode=mode)
-                if len(x) > 0:
-                    break
-
-            # skip labels so small we don't have any embedding for it
-            if len(x) < 1:
-                skipped_labels.append(label)
-                continue
-
-            clustered_labels.append(label)
-            X.append(np.mean(x, axis=0))
+        if self.cache_dendrogram:
+            key = (
+                get_unique_identifier(current_file),
+                get_input_fingerprint(current_file, self.embedding),
+                tuple(
+                    (segment, label)
+                    for segment, _, label in speech_turns.itertracks(yield_label=True)
+                ),
+            )
+            clustered_labels, skipped_labels, X, Z = self._dendrograms.get(
+                key, lambda: self._dendrogram(current_file, speech_turns)
+            )
+            # same thresholding step as self.clustering(X)
+            clusters = self.clustering.flatten(Z, X) if len(X) > 0 else []
 
-        # apply clustering of label embeddings
-        clusters = self.clustering(np.vstack(X))
+        else:
+            clustered_labels, skipped_labels, X = self._embed(
+                current_file, speech_turns
+            )
+            # apply clustering of label embeddings
+            clusters = self.clustering(X) if len(X) > 0 else []
 
         # map each clustered label to its cluster (between 1 and N_CLUSTERS)
         mapping = {label: k for label, k in zip(clustered_labels, clusters)}
@@ -38,6 +38,7 @@ from .speech_activity_detection import SpeechActivityDetection
 from .speech_activity_detection import OracleSpeechActivityDetection
 
 from pyannote.database import get_annotated
+from pyannote.audio.utils.profiler import profiled
 from pyannote.metrics.diarization import DiarizationPurityCoverageFMeasure
 
 
@@ -105,6 +106,7 @@ class SpeechTurnSegmentation(Pipeline):
         self.non_speech = non_speech
         self.purity = purity
 
+    @profiled("speech_turn_segmentation")
     def __call__(self, current_file: dict) -> Annotation:
         """Apply speech turn segmentation
 
@@ -0,0 +1,522 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Threshold sweeps for fast pipeline validation
+
+Rather than instantiating a pipeline and evaluating it on all validation files
+for one threshold at a time, sweeps evaluate a whole grid of thresholds in one
+pass over the validation files, and return the whole curve.
+
+>>> from pyannote.audio.pipeline.sweep import DetectionSweep
+>>> sweep = DetectionSweep(min_duration_on=0.1, min_duration_off=0.1)
+>>> for current_file in validation_files:
+...     sweep.update(pipeline.get_probability(current_file),
+...                  pipeline.get_reference(current_file),
+...                  uem=get_annotated(current_file))
+>>> curve = sweep.curve()     # precision, recall, ... for each threshold
+>>> best = sweep.optimum()    # best thresholds and corresponding value
+
+`SegmentationSweep` does the same for speaker change detection (peak
+detection threshold vs. segmentation purity and coverage).
+"""
+
+from typing import Dict
+from typing import Optional
+
+import numpy as np
+from sortedcontainers import SortedList
+
+from pyannote.core import Annotation
+from pyannote.core import SlidingWindowFeature
+from pyannote.core import Timeline
+
+from pyannote.audio.utils.signal import Binarize
+from pyannote.audio.utils.signal import Peak
+
+# maximum number of (frame, threshold) pairs processed at once
+MAX_CHUNK_SIZE = 1 << 22
+
+
+def _to_arrays(timeline: Timeline):
+    """Get (sorted) start and end times of timeline support"""
+    segments = list(timeline.support())
+    starts = np.array([segment.start for segment in segments], dtype=np.float64)
+    ends = np.array([segment.end for segment in segments], dtype=np.float64)
+    return starts, ends
+
+
+def _coverage(starts: np.ndarray, ends: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Duration of the union of disjoint sorted intervals before `t`"""
+
+    if len(starts) == 0:
+        return np.zeros_like(t, dtype=np.float64)
+
+    durations = ends - starts
+    cumulative = np.hstack([[0.0], np.cumsum(durations)])
+
+    # index of the last interval starting before t
+    k = np.searchsorted(starts, t, side="right") - 1
+    i = np.maximum(k, 0)
+    partial = np.clip(t - starts[i], 0.0, durations[i])
+    return np.where(k >= 0, cumulative[i] + partial, 0.0)
+
+
+class DetectionSweep:
+    """Evaluate detection for a grid of onset/offset thresholds
+
+    Detection is evaluated in terms of precision, recall, f-score, and
+    detection error rate, exactly as `pyannote.metrics.detection` metrics do
+    (with no collar and without skipping overlap regions), though for all
+    thresholds at once.
+
+    Parameters
+    ----------
+    onset : np.ndarray, optional
+        Onset thresholds. Defaults to 101 thresholds evenly spread on [0, 1].
+    offset : np.ndarray, optional
+        Offset thresholds (one per onset threshold). Defaults to `onset`.
+    min_duration_on, min_duration_off, pad_onset, pad_offset : float, optional
+        Fixed hyper-parameters. See `pyannote.audio.utils.signal.Binarize`.
+        Default to 0.
+    fscore : bool, optional
+        Make `optimum` maximize f-score. Defaults to minimizing detection
+        error rate.
+    """
+
+    def __init__(
+        self,
+        onset: Optional[np.ndarray] = None,
+        offset: Optional[np.ndarray] = None,
+        min_duration_on: float = 0.0,
+        min_duration_off: float = 0.0,
+        pad_onset: float = 0.0,
+        pad_offset: float = 0.0,
+        fscore: bool = False,
+    ):
+        super().__init__()
+
+        if onset is None:
+            onset = np.linspace(0.0, 1.0, 101)
+        self.onset = np.asarray(onset, dtype=np.float64)
+        self.offset = self.onset if offset is None else np.asarray(offset)
+
+        if self.offset.shape != self.onset.shape:
+            msg = (
+                f"`onset` and `offset` should have the same shape "
+                f"(is: {self.onset.shape} and {self.offset.shape})."
+            )
+            raise ValueError(msg)
+
+        self.min_duration_on = min_duration_on
+        self.min_duration_off = min_duration_off
+        self.pad_onset = pad_onset
+        self.pad_offset = pad_offset
+        self.fscore = fscore
+
+        self.reset()
+
+    def reset(self):
+        """Forget about previously accumulated files"""
+        n_thresholds = len(self.onset)
+        self.relevant_retrieved_ = np.zeros(n_thresholds)
+        self.retrieved_ = np.zeros(n_thresholds)
+        self.relevant_ = 0.0
+
+    def update(
+        self,
+        probability: SlidingWindowFeature,
+        reference: Timeline,
+        uem: Optional[Timeline] = None,
+    ):
+        """Accumulate one file
+
+        Parameters
+        ----------
+        probability : SlidingWindowFeature
+            (n_samples, ) or (n_samples, 1) detection probability.
+        reference : Timeline
+            Reference regions.
+        uem : Timeline, optional
+            Evaluation map. Defaults to the extent of both reference and
+            (all possible) hypothesis regions.
+        """
+
+        data = probability.data
+        if len(data.shape) > 1:
+            data = data[:, 0]
+        n_samples = len(data)
+
+        if uem is None:
+            window = probability.sliding_window
+            uem = Timeline(segments=[window[0] | window[n_samples - 1]])
+            if reference:
+                uem.add(reference.extent())
+
+        uem = uem.support()
+        reference = reference.crop(uem, mode="intersection").support()
+        uem_starts, uem_ends = _to_arrays(uem)
+        ref_starts, ref_ends = _to_arrays(reference)
+
+        self.relevant_ += np.sum(ref_ends - ref_starts)
+
+        n_thresholds = len(self.onset)
+        chunk_size = max(1, MAX_CHUNK_SIZE // max(1, n_samples))
+        for c in range(0, n_thresholds, chunk_size):
+            thresholds = slice(c, c + chunk_size)
+
+            binarize = Binarize(
+                onset=self.onset[thresholds],
+                offset=self.offset[thresholds],
+                min_duration_on=self.min_duration_on,
+                min_duration_off=self.min_duration_off,
+                pad_onset=self.pad_onset,
+                pad_offset=self.pad_offset,
+            )
+
+            # one (read-only) copy of the probability per threshold
+            n = len(binarize.onset)
+            tiled = np.broadcast_to(data[:, np.newaxis], (n_samples, n))
+            boundaries = binarize.boundaries(
+                SlidingWindowFeature(tiled, probability.sliding_window)
+            )
+
+            starts = np.hstack([s for s, _ in boundaries])
+            ends = np.hstack([e for _, e in boundaries])
+            which = np.repeat(np.arange(n), [len(s) for s, _ in boundaries])
+
+            # duration of hypothesis regions within uem...
+            before_end = _coverage(uem_starts, uem_ends, ends)
+            before_start = _coverage(uem_starts, uem_ends, starts)
+            retrieved = np.bincount(
+                which, weights=before_end - before_start, minlength=n
+            )
+            self.retrieved_[thresholds] += retrieved
+
+            # ... and within (uem-cropped) reference regions
+            before_end = _coverage(ref_starts, ref_ends, ends)
+            before_start = _coverage(ref_starts, ref_ends, starts)
+            relevant_retrieved = np.bincount(
+                which, weights=before_end - before_start, minlength=n
+            )
+            self.relevant_retrieved_[thresholds] += relevant_retrieved
+
+    def curve(self) -> Dict[str, np.ndarray]:
+        """Get detection performance for each pair of thresholds
+
+        Returns
+        -------
+        curve : dict
+            Dictionary of np.ndarrays with the following keys: "onset",
+            "offset", "precision", "recall", "fscore", "detection_error_rate",
+            "false_alarm" and "missed_detection" (in seconds).
+        """
+
+        retrieved = self.retrieved_
+        relevant_retrieved = self.relevant_retrieved_
+        relevant = self.relevant_
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(retrieved > 0, relevant_retrieved / retrieved, 1.0)
+            recall = (
+                relevant_retrieved / relevant
+                if relevant > 0
+                else np.ones_like(relevant_retrieved)
+            )
+            fscore = np.where(
+                precision + recall > 0,
+                2 * precision * recall / (precision + recall),
+                0.0,
+            )
+
+        false_alarm = retrieved - relevant_retrieved
+        missed_detection = relevant - relevant_retrieved
+        error = false_alarm + missed_detection
+        if relevant > 0:
+            detection_error_rate = error / relevant
+        else:
+            detection_error_rate = np.where(error > 0, 1.0, 0.0)
+
+        return {
+            "onset": self.onset,
+            "offset": self.offset,
+            "precision": precision,
+            "recall": recall,
+            "fscore": fscore,
+            "detection_error_rate": detection_error_rate,
+            "false_alarm": false_alarm,
+            "missed_detection": missed_detection,
+        }
+
+    def optimum(self) -> Dict[str, float]:
+        """Get best pair of thresholds
+
+        Returns
+        -------
+        optimum : dict
+            Dictionary with the following keys: "onset", "offset", and "value"
+            (f-score when `fscore` is True, detection error rate otherwise).
+        """
+
+        curve = self.curve()
+        if self.fscore:
+            values = curve["fscore"]
+            best = int(np.argmax(values))
+        else:
+            values = curve["detection_error_rate"]
+            best = int(np.argmin(values))
+
+        return {
+            "onset": float(self.onset[best]),
+            "offset": float(self.offset[best]),
+            "value": float(values[best]),
+        }
+
+
+class _RangeMax:
+    """Constant-time range maximum queries (sparse table)"""
+
+    def __init__(self, values: np.ndarray):
+        self.levels = [np.asarray(values, dtype=np.float64)]
+        width = 1
+        while 2 * width <= len(values):
+            previous = self.levels[-1]
+            self.levels.append(np.maximum(previous[:-width], previous[width:]))
+            width *= 2
+
+    def __call__(self, i: int, j: int) -> float:
+        """Maximum of values[i:j+1] (0. when empty)"""
+        if j < i:
+            return 0.0
+        k = (j - i + 1).bit_length() - 1
+        level = self.levels[k]
+        return max(level[i], level[j - (1 << k) + 1])
+
+
+class SegmentationSweep:
+    """Evaluate speaker change detection for all peak detection thresholds
+
+    Segmentation is evaluated in terms of purity, coverage, and f-score,
+    exactly as `pyannote.metrics.segmentation` metrics do. Peak candidates
+    (local maxima) do not depend on the threshold: they are computed once per
+    file and segmentation is refined incrementally by adding them one at a
+    time, in decreasing order of height. This provides the whole curve in one
+    pass.
+
+    Parameters
+    ----------
+    min_duration : float, optional
+        Fixed hyper-parameter. See `pyannote.audio.utils.signal.Peak`.
+        Defaults to 0.
+    tolerance : float, optional
+        Metric tolerance. See `pyannote.metrics.segmentation`. Defaults to 0.5.
+
+    Notes
+    -----
+    Scores are expected to cover the whole reference.
+    """
+
+    def __init__(self, min_duration: float = 0.0, tolerance: float = 0.5):
+        super().__init__()
+        self.min_duration = min_duration
+        self.tolerance = tolerance
+        self._peak = Peak(min_duration=min_duration)
+        self.reset()
+
+    def reset(self):
+        """Forget about previously accumulated files"""
+        # one (heights, purity, coverage, total) tuple per file
+        self.files_ = []
+
+    def _partition(self, reference: Annotation):
+        """Get reference coverage and partition, as used by the metric"""
+
+        # reference where short intra-label gaps are removed
+        filled = Timeline()
+        for label in reference.labels():
+            label_timeline = reference.label_timeline(label)
+            for gap in label_timeline.gaps():
+                if gap.duration < self.tolerance:
+                    label_timeline.add(gap)
+            for segment in label_timeline.support():
+                filled.add(segment)
+
+        coverage_starts, coverage_ends = _to_arrays(filled)
+
+        boundaries = sorted(
+            set(segment.start for segment in filled)
+            | set(segment.end for segment in filled)
+        )
+        boundaries = np.array(boundaries, dtype=np.float64)
+        starts, ends = boundaries[:-1], boundaries[1:]
+
+        # only keep pieces within coverage
+        middles = 0.5 * (starts + ends)
+        c = np.searchsorted(coverage_starts, middles, side="right") - 1
+        inside = (c >= 0) & (middles < coverage_ends[np.maximum(c, 0)])
+
+        return coverage_starts, coverage_ends, starts[inside], ends[inside]
+
+    def update(self, probability: SlidingWindowFeature, reference: Annotation):
+        """Accumulate one file
+
+        Parameters
+        ----------
+        probability : SlidingWindowFeature
+            Speaker change probability.
+        reference : Annotation
+            Reference annotation.
+        """
+
+        times, heights, _ = self._peak.candidates(probability)
+
+        # add candidates by decreasing height
+        order = np.argsort(-heights, kind="stable")
+        times, heights = times[order], heights[order]
+
+        coverage_starts, coverage_ends, starts, ends = self._partition(reference)
+        total = float(np.sum(coverage_ends - coverage_starts))
+
+        if len(starts) == 0:
+            zeros = np.zeros(len(heights) + 1)
+            self.files_.append((heights, zeros, zeros, 0.0))
+            return
+
+        lengths = ends - starts
+        range_max = _RangeMax(lengths)
+
+        def best_overlap(a: float, b: float) -> float:
+            """Largest overlap between [a, b] and reference pieces"""
+            i = np.searchsorted(starts, a, side="right") - 1
+            j = np.searchsorted(ends, b, side="left")
+            if i == j:
+                return b - a
+            return max(ends[i] - a, b - starts[j], range_max(i + 1, j - 1))
+
+        # initially, each coverage component is one hypothesis segment...
+        cuts = SortedList(np.hstack([coverage_starts, coverage_ends]))
+        purity = sum(
+            best_overlap(start, end)
+            for start, end in zip(coverage_starts, coverage_ends)
+        )
+        # ... and each reference piece is fully covered
+        coverage = total
+        sub_lengths = dict()
+
+        purities = [purity]
+        coverages = [coverage]
+
+        for t in times:
+
+            # candidates outside of coverage or already there do not change
+            # anything within coverage
+            c = np.searchsorted(coverage_starts, t, side="right") - 1
+            if c < 0 or t >= coverage_ends[c] or t in cuts:
+                purities.append(purity)
+                coverages.append(coverage)
+                continue
+
+            # split hypothesis segment [p, n] into [p, t] and [t, n]
+            index = cuts.bisect(t)
+            p, n = cuts[index - 1], cuts[index]
+            purity += best_overlap(p, t) + best_overlap(t, n) - best_overlap(p, n)
+
+            # split part [q, m] of reference piece r into [q, t] and [t, m]
+            r = np.searchsorted(starts, t, side="right") - 1
+            if starts[r] < t < ends[r]:
+                q, m = max(p, starts[r]), min(n, ends[r])
+                if r not in sub_lengths:
+                    sub_lengths[r] = SortedList([lengths[r]])
+                pieces = sub_lengths[r]
+                best = pieces[-1]
+                pieces.remove(m - q)
+                pieces.update([t - q, m - t])
+                coverage += pieces[-1] - best
+
+            cuts.add(t)
+            purities.append(purity)
+            coverages.append(coverage)
+
+        self.files_.append((heights, np.array(purities), np.array(coverages), total))
+
+    def curve(self) -> Dict[str, np.ndarray]:
+        """Get segmentation performance for each threshold
+
+        Returns
+        -------
+        curve : dict
+            Dictionary of np.ndarrays with the following keys: "alpha",
+            "purity", "coverage", and "fscore". Thresholds are all the peak
+            heights within [0, 1] (where performance changes), and 0.
+        """
+
+        alpha = np.unique(np.hstack([[0.0]] + [h for h, _, _, _ in self.files_]))
+        alpha = alpha[(alpha >= 0.0) & (alpha <= 1.0)]
+
+        purity = np.zeros(len(alpha))
+        coverage = np.zeros(len(alpha))
+        total = 0.0
+        for heights, purities, coverages, file_total in self.files_:
+            # number of candidates higher than alpha
+            k = len(heights) - np.searchsorted(
+                np.sort(heights), alpha, side="right"
+            )
+            purity += purities[k]
+            coverage += coverages[k]
+            total += file_total
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            purity = purity / total if total > 0 else np.ones(len(alpha))
+            coverage = coverage / total if total > 0 else np.ones(len(alpha))
+            fscore = np.where(
+                purity + coverage > 0,
+                2 * purity * coverage / (purity + coverage),
+                0.0,
+            )
+
+        return {
+            "alpha": alpha,
+            "purity": purity,
+            "coverage": coverage,
+            "fscore": fscore,
+        }
+
+    def optimum(self) -> Dict[str, float]:
+        """Get threshold maximizing f-score
+
+        Returns
+        -------
+        optimum : dict
+            Dictionary with the following keys: "alpha" and "value" (f-score).
+        """
+
+        curve = self.curve()
+        best = int(np.argmax(curve["fscore"]))
+        return {
+            "alpha": float(curve["alpha"][best]),
+            "value": float(curve["fscore"][best]),
+        }
@@ -28,10 +28,24 @@
 
 
 import yaml
+import json
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import Text
+
+import numpy as np
 from pyannote.core import Annotation
+from pyannote.core import Segment
+from pyannote.core import SlidingWindowFeature
+from pyannote.core import Timeline
 from pyannote.pipeline import Pipeline
 from pyannote.core.utils.helper import get_class_by_name
+from pyannote.audio.features.cache import get_array_fingerprint
 
 
 def assert_string_labels(annotation: Annotation, name: str):
@@ -92,3 +106,334 @@ def load_pretrained_pipeline(train_dir: Path) -> Pipeline:
     pipeline = Klass(**config["pipeline"].get("params", {}))
 
     return pipeline.load_params(train_dir / "params.yml")
+
+
+def get_input_fingerprint(current_file: dict, wrappable: Any) -> Hashable:
+    """Identify the input described by `wrappable` for `current_file`
+
+    This is meant to be used as part of memoization keys, so that memoized
+    outputs are not reused when the same file comes with different inputs.
+
+    Parameters
+    ----------
+    current_file : `dict`
+        File as provided by a pyannote.database protocol.
+    wrappable : `Wrappable` or "oracle"
+        Input description (see `pyannote.audio.features.wrapper.Wrapper`).
+
+    Returns
+    -------
+    fingerprint : Hashable
+        Inputs provided by protocol files ("@key") are identified by their
+        content, "oracle" inputs by the reference annotation, and any other
+        input (model or precomputed directory) by its description.
+    """
+
+    if isinstance(wrappable, Text) and wrappable.startswith("@"):
+        value = current_file[wrappable[1:]]
+        return get_array_fingerprint(getattr(value, "data", value))
+
+    if isinstance(wrappable, Text) and wrappable == "oracle":
+        return tuple(
+            (segment.start, segment.end, str(label))
+            for segment, _, label in current_file["annotation"].itertracks(
+                yield_label=True
+            )
+        )
+
+    if isinstance(wrappable, (Text, Path)):
+        return str(wrappable)
+
+    if isinstance(wrappable, dict):
+        return json.dumps(wrappable, sort_keys=True, default=str)
+
+    # instances (e.g. `Pretrained`) are identified by identity
+    return wrappable
+
+
+def get_overlap(annotation: Annotation) -> Timeline:
+    """Get regions where at least two different labels are active
+
+    This is a vectorized sweep-line over sorted segment boundaries, in
+    O(n log n) for n tracks. Overlapping tracks sharing the same label are
+    not considered as overlap.
+
+    Parameters
+    ----------
+    annotation : `Annotation`
+        Annotation (e.g. speaker diarization reference).
+
+    Returns
+    -------
+    overlap : `Timeline`
+        Overlap regions.
+    """
+
+    overlap = Timeline(uri=annotation.uri)
+
+    tracks = list(annotation.itertracks(yield_label=True))
+    if len(tracks) < 2:
+        return overlap
+
+    _, labels = np.unique([label for _, _, label in tracks], return_inverse=True)
+    starts = np.array([segment.start for segment, _, _ in tracks])
+    ends = np.array([segment.end for segment, _, _ in tracks])
+
+    # merge overlapping tracks of the same label (running maximum of end
+    # times is computed per label thanks to a per-label offset)
+    order = np.lexsort((starts, labels))
+    labels, starts, ends = labels[order], starts[order], ends[order]
+    span = np.max(ends) - np.min(starts) + 1.0
+    running = np.maximum.accumulate(ends + labels * span) - labels * span
+    new = np.ones((len(starts),), dtype=bool)
+    new[1:] = (labels[1:] != labels[:-1]) | (starts[1:] > running[:-1])
+    first = np.where(new)[0]
+    starts, ends = starts[first], np.maximum.reduceat(ends, first)
+
+    # sweep: +1 at each start, -1 at each end (ends first in case of ties)
+    times = np.hstack([starts, ends])
+    deltas = np.hstack([np.ones_like(starts), -np.ones_like(ends)])
+    order = np.lexsort((deltas, times))
+    times, count = times[order], np.cumsum(deltas[order])
+
+    # elementary regions [times[i], times[i + 1]] with count[i] active labels
+    # (zero-duration regions are skipped so that they do not split overlaps)
+    positive = times[1:] > times[:-1]
+    active = (count[:-1] >= 2)[positive]
+    region_starts, region_ends = times[:-1][positive], times[1:][positive]
+
+    # merge contiguous overlap regions
+    padded = np.hstack([[False], active, [False]])
+    onsets = np.where(padded[1:-1] & ~padded[:-2])[0]
+    offsets = np.where(padded[1:-1] & ~padded[2:])[0]
+    for onset, offset in zip(onsets, offsets):
+        overlap.add(Segment(region_starts[onset], region_ends[offset]))
+
+    return overlap
+
+
+class EmbeddingIndex:
+    """Integral embeddings for fast averaging over (sets of) segments
+
+    Cumulative sums of embeddings (and of the number of valid embeddings) are
+    computed once per file, so that averaging embeddings over any timeline is
+    a matter of a few subtractions instead of cropping and averaging actual
+    embeddings. Embeddings of gated windows (i.e. NaN) are ignored.
+
+    Parameters
+    ----------
+    embedding : `SlidingWindowFeature`
+        Embeddings.
+
+    Usage
+    -----
+    >>> index = EmbeddingIndex(embedding)
+    >>> X = index.mean([speech_turns.label_timeline(label)
+    ...                 for label in speech_turns.labels()])
+    """
+
+    def __init__(self, embedding: SlidingWindowFeature):
+        super().__init__()
+
+        data = embedding.data
+        self.sliding_window = embedding.sliding_window
+        self.n_samples_, self.dimension_ = data.shape
+
+        valid = ~np.any(np.isnan(data), axis=1)
+        self.cumsum_ = np.zeros((self.n_samples_ + 1, self.dimension_))
+        data = np.where(valid[:, np.newaxis], data, 0.0)
+        np.cumsum(data, axis=0, out=self.cumsum_[1:])
+        self.count_ = np.hstack([[0], np.cumsum(valid)])
+
+    def _ranges(self, starts: np.ndarray, ends: np.ndarray, mode: Text):
+        """Vectorized version of SlidingWindowFeature.crop ranges"""
+
+        window = self.sliding_window
+
+        if mode == "loose":
+            i = np.ceil((starts - window.duration - window.start) / window.step)
+            j = np.floor((ends - window.start) / window.step)
+
+        elif mode == "strict":
+            i = np.ceil((starts - window.start) / window.step)
+            j = np.floor((ends - window.duration - window.start) / window.step)
+
+        elif mode == "center":
+            # same as window.closest_frame
+            i = np.rint((starts - window.start - 0.5 * window.duration) / window.step)
+            j = np.rint((ends - window.start - 0.5 * window.duration) / window.step)
+
+        else:
+            msg = f"Unsupported cropping mode: {mode}."
+            raise ValueError(msg)
+
+        # frames [i, e[ clipped to available frames
+        i = np.clip(i.astype(np.int64), 0, self.n_samples_)
+        e = np.clip(j.astype(np.int64) + 1, 0, self.n_samples_)
+        return i, e
+
+    def _sum(
+        self,
+        which: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        mode: Text,
+        n_timelines: int,
+    ):
+        """Sum (and count) valid embeddings of each timeline"""
+
+        i, e = self._ranges(starts, ends, mode)
+        keep = e > i
+        which, i, e = which[keep], i[keep], e[keep]
+
+        sums = np.zeros((n_timelines, self.dimension_))
+        if len(which) == 0:
+            return sums, np.zeros((n_timelines,))
+
+        # segments are sorted by timeline, then by time. offsetting frames by
+        # timeline makes it possible to remove frames shared by consecutive
+        # segments of the same timeline in one vectorized pass
+        offset = which * (self.n_samples_ + 1)
+        i, e = i + offset, e + offset
+        previous = np.hstack([[0], np.maximum.accumulate(e)[:-1]]).astype(np.int64)
+        i = np.maximum(i, previous)
+        e = np.maximum(e, i)
+        i, e = i - offset, e - offset
+
+        np.add.at(sums, which, self.cumsum_[e] - self.cumsum_[i])
+        counts = np.bincount(
+            which, weights=self.count_[e] - self.count_[i], minlength=n_timelines
+        )
+        return sums, counts
+
+    def mean(
+        self,
+        timelines: List[Timeline],
+        modes: Iterable[Text] = ("strict", "center", "loose"),
+    ) -> np.ndarray:
+        """Average embeddings of each timeline
+
+        Parameters
+        ----------
+        timelines : list of `Timeline`
+            Timelines.
+        modes : iterable of {"strict", "center", "loose"}, optional
+            Cropping modes (see `SlidingWindowFeature.crop`), from the least
+            to the most permissive. Next one is only used for timelines that
+            do not have any (valid) embedding with the previous one. Defaults
+            to ("strict", "center", "loose").
+
+        Returns
+        -------
+        X : (n_timelines, dimension) np.ndarray
+            Average embedding of each timeline. Set to NaN for timelines that
+            do not have any (valid) embedding, whatever the cropping mode.
+        """
+
+        n_timelines = len(timelines)
+
+        which, starts, ends = [], [], []
+        for t, timeline in enumerate(timelines):
+            for segment in timeline.support():
+                which.append(t)
+                starts.append(segment.start)
+                ends.append(segment.end)
+        which = np.array(which, dtype=np.int64)
+        starts = np.array(starts, dtype=np.float64)
+        ends = np.array(ends, dtype=np.float64)
+
+        X = np.full((n_timelines, self.dimension_), np.nan)
+        todo = np.ones((n_timelines,), dtype=bool)
+
+        for mode in modes:
+
+            selected = todo[which]
+            sums, counts = self._sum(
+                which[selected], starts[selected], ends[selected], mode, n_timelines
+            )
+
+            found = todo & (counts > 0)
+            X[found] = sums[found] / counts[found, np.newaxis]
+            todo &= ~found
+
+            if not np.any(todo):
+                break
+
+        return X
+
+
+class LRUCache:
+    """Bounded in-memory cache with least recently used eviction
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of entries. Least recently used entries are evicted
+        when it is exceeded. Defaults to 128. Use None for no limit.
+
+    Usage
+    -----
+    >>> cache = LRUCache()
+    >>> value = cache.get(key, compute)  # calls compute()
+    >>> value = cache.get(key, compute)  # does not call compute()
+    >>> cache.hit_rate
+    0.5
+    """
+
+    def __init__(self, max_entries: int = 128):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Get cached value (and compute it if needed)
+
+        Parameters
+        ----------
+        key : Hashable
+            Cache key.
+        compute : callable
+            Function called (without any argument) to compute the value in
+            case it is not cached yet.
+
+        Returns
+        -------
+        value : Any
+            Cached value. It is shared by all callers and should therefore be
+            considered as read-only.
+        """
+
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of calls to `get` that did not need any computation"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """Evict all entries (and reset statistics)"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -61,6 +61,7 @@ try:
 except ImportError as e:
     from typing_extensions import Literal
 from typing import Callable
+from pyannote.core import Segment
 from pyannote.core import SlidingWindow
 from pyannote.core import SlidingWindowFeature
 
@@ -79,6 +80,7 @@ import pescador
 import torch
 from torch.nn import Module
 from functools import partial
+import warnings
 
 
 class Model(Module):
@@ -374,6 +376,190 @@ class Model(Module):
         msg = f"{self.task} tasks do not define attribute 'classes'."
         raise AttributeError(msg)
 
+    @property
+    def supports_stateful(self) -> bool:
+        """Whether model supports stateful (chunk-free) inference
+
+        Models supporting it return one vector per frame and can be split
+        into a stateless front-end (`stateful_frontend`) followed by a causal
+        part carrying a state from one block of frames to the next
+        (`stateful_forward`). Defaults to False.
+        """
+        return False
+
+    @property
+    def stateful_margin(self) -> float:
+        """Context (in seconds) needed by `stateful_frontend` on both sides"""
+        return 0.0
+
+    def stateful_frontend(self, sequences: torch.Tensor) -> torch.Tensor:
+        """Apply stateless front-end
+
+        Parameters
+        ----------
+        sequences : (batch_size, n_samples, n_features) `torch.Tensor`
+
+        Returns
+        -------
+        frames : (batch_size, n_frames, dimension) `torch.Tensor`
+            One vector per frame of `self.resolution`.
+        """
+        return sequences
+
+    def stateful_forward(self, frames: torch.Tensor, state=None):
+        """Apply causal part of the model, starting from `state`
+
+        Parameters
+        ----------
+        frames : (batch_size, n_frames, dimension) `torch.Tensor`
+            Output of `stateful_frontend`.
+        state : optional
+            State returned by previous call. Defaults to initial state.
+
+        Returns
+        -------
+        output : (batch_size, n_frames, dimension) `torch.Tensor`
+        state :
+            Final state, meant to be passed to the next call.
+        """
+        msg = f"{self.__class__.__name__} does not support stateful inference."
+        raise NotImplementedError(msg)
+
+    @property
+    def supports_shared_encoder(self) -> bool:
+        """Whether model supports sharing its encoder across overlapping windows
+
+        Models supporting it can be split into an encoder (`shared_encode`),
+        applied once on a block of consecutive overlapping windows, and a head
+        (`shared_decode`), applied on the part of the encoder output that
+        corresponds to each window. Defaults to False.
+        """
+        return False
+
+    @property
+    def shared_resolution(self) -> SlidingWindow:
+        """Frame resolution of `shared_encode` output
+
+        Frame timestamps are relative to the beginning of the encoded block.
+        """
+        msg = f"{self.__class__.__name__} does not support encoder sharing."
+        raise NotImplementedError(msg)
+
+    def shared_encode(self, sequences: torch.Tensor):
+        """Apply encoder on a block of consecutive windows
+
+        Parameters
+        ----------
+        sequences : (1, n_samples, n_features) `torch.Tensor`
+
+        Returns
+        -------
+        encoded :
+            Encoder output, with one frame per frame of `shared_resolution`.
+        """
+        msg = f"{self.__class__.__name__} does not support encoder sharing."
+        raise NotImplementedError(msg)
+
+    def shared_decode(self, encoded, starts: np.ndarray, n_frames: int):
+        """Apply head on each window of an encoded block
+
+        Parameters
+        ----------
+        encoded :
+            Output of `shared_encode`.
+        starts : (n_windows, ) np.ndarray
+            Index of the first encoded frame of each window.
+        n_frames : int
+            Number of encoded frames per window.
+
+        Returns
+        -------
+        output : (n_windows, ...) `torch.Tensor`
+            Same as `forward` applied on the batch of windows.
+        """
+        msg = f"{self.__class__.__name__} does not support encoder sharing."
+        raise NotImplementedError(msg)
+
+    def _slide_shared(
+        self,
+        features: SlidingWindowFeature,
+        chunks: List[Segment],
+        active: np.ndarray,
+        fixed: float,
+        batch_size: int = 32,
+        device: torch.device = None,
+    ):
+        """Apply model on batches of windows, sharing encoder computation
+
+        Yields the output of the model for each batch of (active) windows.
+        """
+
+        resolution = self.shared_resolution
+
+        # (tolerance prevents rounding errors from adding or removing a frame)
+        def _n_frames(duration: float) -> int:
+            n = (duration - resolution.duration) / resolution.step
+            return int(np.floor(n + 1e-6)) + 1
+
+        n_frames = _n_frames(fixed)
+
+        # never encode more than `batch_size` non-overlapping windows at once
+        max_span = batch_size * fixed
+
+        def _apply(batch):
+
+            span = Segment(chunks[batch[0]].start, chunks[batch[-1]].end)
+            X = features.crop(span, mode="center", fixed=span.duration)
+            tX = torch.tensor(X[np.newaxis], dtype=torch.float32, device=device)
+
+            # windows start at the same input frame as in regular sliding
+            # window inference (i.e. the one closest to their start time)
+            first = features.sliding_window.closest_frame(span.start)
+            offsets = np.array(
+                [features.sliding_window.closest_frame(chunks[c].start) for c in batch]
+            )
+            offsets = (offsets - first) * features.sliding_window.step
+
+            # index of first encoded frame of each window
+            n_encoded = _n_frames(span.duration)
+            starts = (offsets - resolution.start) / resolution.step
+            aligned = np.abs(starts - np.round(starts)) < 1e-3
+            starts = np.round(starts).astype(int)
+            starts = np.clip(starts, 0, max(0, n_encoded - n_frames))
+
+            with torch.no_grad():
+
+                if np.all(aligned):
+                    encoded = self.shared_encode(tX)
+                    return self.shared_decode(encoded, starts, n_frames)
+
+                # windows that do not start on the grid of encoded frames
+                # cannot share encoder computation and are processed as usual
+                output = [None] * len(batch)
+                if np.any(aligned):
+                    encoded = self.shared_encode(tX)
+                    decoded = self.shared_decode(encoded, starts[aligned], n_frames)
+                    for i, output_ in zip(np.where(aligned)[0], decoded):
+                        output[i] = output_
+                for i in np.where(~aligned)[0]:
+                    x = features.crop(chunks[batch[i]], mode="center", fixed=fixed)
+                    tx = torch.tensor(x[np.newaxis], dtype=torch.float32, device=device)
+                    output[i] = self(tx)[0]
+                return torch.stack(output)
+
+        batch = []
+        for c in np.where(active)[0]:
+            if batch and (
+                len(batch) == batch_size
+                or chunks[c].end - chunks[batch[0]].start > max_span
+            ):
+                yield _apply(batch)
+                batch = []
+            batch.append(c)
+
+        if batch:
+            yield _apply(batch)
+
     def slide(
         self,
         features: SlidingWindowFeature,
@@ -384,6 +570,9 @@ class Model(Module):
         postprocess: Callable[[np.ndarray], np.ndarray] = None,
         return_intermediate=None,
         progress_hook=None,
+        gate: Callable[[Segment], bool] = None,
+        stateful: bool = False,
+        share_encoder: bool = False,
     ) -> SlidingWindowFeature:
         """Slide and apply model on features
 
@@ -411,12 +600,62 @@ class Model(Module):
             Experimental. Not documented yet.
         progress_hook : callable
             Experimental. Not documented yet.
+        gate : callable, optional
+            Function deciding whether a chunk should be processed at all. It
+            expects a chunk `Segment` as input and returns False when the
+            chunk can be skipped (e.g. because it does not contain any speech).
+            Outputs of skipped chunks (and frames only covered by skipped
+            chunks) are set to NaN. Defaults to processing every chunk.
+        stateful : bool, optional
+            Set to True to use stateful (chunk-free) inference when the model
+            supports it (see `supports_stateful`): instead of applying the
+            model on overlapping windows, consecutive non-overlapping blocks
+            of `sliding_window.duration` are processed in order and the state
+            of recurrent layers is carried from one block to the next. Each
+            frame is therefore only processed once. Falls back to regular
+            sliding window inference when not supported. Defaults to False.
+        share_encoder : bool, optional
+            Set to True to apply the encoder of the model only once on blocks
+            of consecutive overlapping windows (instead of once per window)
+            when the model supports it (see `supports_shared_encoder`). Windows
+            that do not start on the grid of encoded frames (see
+            `shared_resolution`), and models that do not support it, fall
+            back to regular sliding window inference. Defaults to False.
         """
 
         if device is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
         device = torch.device(device)
 
+        if stateful:
+            if self.supports_stateful and return_intermediate is None:
+                return self._slide_stateful(
+                    features,
+                    sliding_window,
+                    device=device,
+                    postprocess=postprocess,
+                    progress_hook=progress_hook,
+                    gate=gate,
+                )
+
+            msg = (
+                f"{self.__class__.__name__} does not support stateful "
+                f"inference with this configuration: falling back to "
+                f"sliding window inference."
+            )
+            warnings.warn(msg)
+
+        if share_encoder and (
+            not self.supports_shared_encoder or return_intermediate is not None
+        ):
+            msg = (
+                f"{self.__class__.__name__} does not support encoder sharing "
+                f"with this configuration: falling back to sliding window "
+                f"inference."
+            )
+            warnings.warn(msg)
+            share_encoder = False
+
         if skip_average is None:
             skip_average = (self.resolution == RESOLUTION_CHUNK) or (
                 return_intermediate is not None
@@ -445,28 +684,42 @@ class Model(Module):
             chunks = list(sliding_window(support, align_last=True))
             fixed = sliding_window.duration
 
+        if gate is None:
+            active = np.ones((len(chunks),), dtype=bool)
+        else:
+            active = np.array([gate(window) for window in chunks], dtype=bool)
+
         if progress_hook is not None:
-            n_chunks = len(chunks)
+            n_chunks = int(np.sum(active))
             n_done = 0
             progress_hook(n_done, n_chunks)
 
-        batches = pescador.maps.buffer_stream(
-            iter(
-                {"X": features.crop(window, mode="center", fixed=fixed)}
-                for window in chunks
-            ),
-            batch_size,
-            partial=True,
-        )
+        if share_encoder:
+            outputs = self._slide_shared(
+                features, chunks, active, fixed, batch_size=batch_size, device=device
+            )
 
-        fX = []
-        for batch in batches:
+        else:
+            batches = pescador.maps.buffer_stream(
+                iter(
+                    {"X": features.crop(window, mode="center", fixed=fixed)}
+                    for window, is_active in zip(chunks, active)
+                    if is_active
+                ),
+                batch_size,
+                partial=True,
+            )
 
-            tX = torch.tensor(batch["X"], dtype=torch.float32, device=device)
+            def _apply(batch):
+                tX = torch.tensor(batch["X"], dtype=torch.float32, device=device)
+                # FIXME: fix support for return_intermediate
+                with torch.no_grad():
+                    return self(tX, return_intermediate=return_intermediate)
 
-            # FIXME: fix support for return_intermediate
-            with torch.no_grad():
-                tfX = self(tX, return_intermediate=return_intermediate)
+            outputs = (_apply(batch) for batch in batches)
+
+        fX = []
+        for tfX in outputs:
 
             tfX_npy = tfX.detach().to("cpu").numpy()
             if postprocess is not None:
@@ -475,10 +728,24 @@ class Model(Module):
             fX.append(tfX_npy)
 
             if progress_hook is not None:
-                n_done += len(batch["X"])
+                n_done += len(tfX_npy)
                 progress_hook(n_done, n_chunks)
 
-        fX = np.vstack(fX)
+        if gate is not None:
+            # shape of the output of one chunk
+            if fX:
+                shape = fX[0].shape[1:]
+            elif self.resolution == RESOLUTION_CHUNK:
+                shape = (dimension,)
+            else:
+                n = len(resolution.crop(chunks[0], mode=self.alignment, fixed=fixed))
+                shape = (n, dimension)
+            gated = np.full((len(chunks),) + shape, np.nan, dtype=np.float32)
+            if fX:
+                gated[active] = np.vstack(fX)
+            fX = gated
+        else:
+            fX = np.vstack(fX)
 
         if skip_average:
             return SlidingWindowFeature(fX, sliding_window)
@@ -492,7 +759,11 @@ class Model(Module):
         # k[i] is the number of chunks that overlap with frame #i
         k = np.zeros((n_frames, 1), dtype=np.int8)
 
-        for chunk, fX_ in zip(chunks, fX):
+        for chunk, fX_, is_active in zip(chunks, fX, active):
+
+            # skipped chunks do not contribute
+            if not is_active:
+                continue
 
             # indices of frames overlapped by chunk
             indices = resolution.crop(chunk, mode=self.alignment, fixed=fixed)
@@ -507,4 +778,139 @@ class Model(Module):
         # compute average embedding of each frame
         data = data / np.maximum(k, 1)
 
+        # frames only covered by skipped chunks have no output
+        if gate is not None:
+            data[k[:, 0] == 0] = np.nan
+
+        return SlidingWindowFeature(data, resolution)
+
+    def _slide_stateful(
+        self,
+        features: SlidingWindowFeature,
+        sliding_window: SlidingWindow,
+        device: torch.device = None,
+        postprocess: Callable[[np.ndarray], np.ndarray] = None,
+        progress_hook=None,
+        gate: Callable[[Segment], bool] = None,
+    ) -> SlidingWindowFeature:
+        """Apply model on consecutive blocks, carrying state from one to the next
+
+        See `Model.slide` for a description of the parameters.
+
+        Notes
+        -----
+        Blocks are extended by `stateful_margin` on both sides before being
+        processed by the (stateless) front-end, so that frames at block
+        boundaries are neither missing nor duplicated. The front-end therefore
+        still sees windows of (about) the same duration as during training,
+        which matters for per-window normalization (e.g. in SincNet).
+
+        When `gate` is provided, skipped blocks have NaN outputs and the
+        state is reset after each of them.
+        """
+
+        resolution = self.resolution
+        if resolution == RESOLUTION_FRAME:
+            resolution = features.sliding_window
+
+        support = features.extent
+        margin = self.stateful_margin
+
+        # split support into consecutive non-overlapping blocks
+        block_duration = sliding_window.duration
+        n_blocks = max(1, int(np.ceil(support.duration / block_duration)))
+        blocks = [
+            Segment(
+                support.start + b * block_duration,
+                min(support.end, support.start + (b + 1) * block_duration),
+            )
+            for b in range(n_blocks)
+        ]
+
+        if progress_hook is not None:
+            progress_hook(0, n_blocks)
+
+        n_frames = resolution.samples(support.end, mode="center")
+        data = None
+
+        # index of last processed frame
+        last = -1
+        state = None
+
+        for b, block in enumerate(blocks):
+
+            is_last = b + 1 == n_blocks
+
+            if gate is not None and not gate(block):
+                state = None
+                # frames whose middle falls within skipped block are skipped
+                last = max(
+                    last,
+                    int(
+                        np.ceil(
+                            (block.end - resolution.start - 0.5 * resolution.duration)
+                            / resolution.step
+                        )
+                    )
+                    - 1,
+                )
+            else:
+                segment = Segment(
+                    max(support.start, block.start - margin),
+                    min(support.end, block.end + margin),
+                )
+                X = features.crop(segment, mode="center", fixed=segment.duration)
+                tX = torch.tensor(X[np.newaxis], dtype=torch.float32, device=device)
+
+                with torch.no_grad():
+                    frames = self.stateful_frontend(tX)
+
+                indices = resolution.crop(
+                    segment, mode=self.alignment, fixed=segment.duration
+                )
+                n = min(len(indices), frames.shape[1])
+                indices = indices[:n]
+
+                # only keep frames that were not processed yet and whose
+                # middle falls within the current block
+                middles = (
+                    resolution.start
+                    + indices * resolution.step
+                    + 0.5 * resolution.duration
+                )
+                keep = (
+                    (indices > last)
+                    & (indices < n_frames)
+                    & ((middles < block.end) | is_last)
+                )
+
+                if np.any(keep):
+                    frames = frames[:, torch.tensor(keep, device=frames.device)]
+                    with torch.no_grad():
+                        output, state = self.stateful_forward(frames, state=state)
+
+                    fX = output.detach().to("cpu").numpy()
+                    if postprocess is not None:
+                        fX = postprocess(fX)
+
+                    # frames that are never written (e.g. those of skipped
+                    # blocks) have no output
+                    if data is None:
+                        data = np.full(
+                            (n_frames, fX.shape[2]), np.nan, dtype=np.float32
+                        )
+
+                    data[indices[keep]] = fX[0]
+                    last = indices[keep][-1]
+
+            if progress_hook is not None:
+                progress_hook(b + 1, n_blocks)
+
+        if data is None:
+            try:
+                dimension = self.dimension
+            except AttributeError:
+                dimension = len(self.classes)
+            data = np.full((n_frames, dimension), np.nan, dtype=np.float32)
+
         return SlidingWindowFeature(data, resolution)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Inference benchmarks
+
+>>> from pyannote.audio.features import Pretrained
+>>> from pyannote.audio.utils.benchmark import benchmark_shared_encoder
+>>> pretrained = Pretrained(validate_dir=...)
+>>> for result in benchmark_shared_encoder(pretrained.model_, device="cpu"):
+...     print(result)
+"""
+
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+import torch
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+
+from pyannote.audio.train.model import Model
+
+
+def benchmark_shared_encoder(
+    model: Model,
+    duration: float = 60.0,
+    chunk_duration: float = 2.0,
+    steps: Tuple[float] = (0.1, 0.25),
+    batch_size: int = 32,
+    device: Optional[Union[str, torch.device]] = None,
+    sample_rate: int = 16000,
+    seed: int = 0,
+) -> List[Dict]:
+    """Compare sliding window inference with and without encoder sharing
+
+    Parameters
+    ----------
+    model : Model
+        Model expecting raw waveforms as input, and supporting encoder
+        sharing (see `Model.supports_shared_encoder`).
+    duration : float, optional
+        Duration of (random) waveform used for benchmarking. Defaults to 60s.
+    chunk_duration : float, optional
+        Duration of sliding windows. Defaults to 2s.
+    steps : tuple of float, optional
+        Steps between consecutive sliding windows, as ratio of their duration.
+        Defaults to (0.1, 0.25).
+    batch_size : int, optional
+        Defaults to 32.
+    device : torch.device, optional
+        Defaults to using GPU when available.
+    sample_rate : int, optional
+        Defaults to 16kHz.
+    seed : int, optional
+        Random seed used to generate the waveform.
+
+    Returns
+    -------
+    results : list of dict
+        One dictionary per step with the following keys: "step", "windowed"
+        and "shared" (inference time in seconds, without and with encoder
+        sharing), "speedup" (ratio between both), and "error" (maximum
+        absolute difference between both outputs).
+    """
+
+    if not model.supports_shared_encoder:
+        msg = f"{model.__class__.__name__} does not support encoder sharing."
+        raise ValueError(msg)
+
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    device = torch.device(device)
+
+    model = model.eval().to(device)
+
+    random_state = np.random.RandomState(seed)
+    n_samples = int(duration * sample_rate)
+    waveform = 0.1 * random_state.randn(n_samples, 1).astype(np.float32)
+    features = SlidingWindowFeature(
+        waveform,
+        SlidingWindow(
+            start=-0.5 / sample_rate, duration=1.0 / sample_rate, step=1.0 / sample_rate
+        ),
+    )
+
+    results = []
+    for step in steps:
+
+        sliding_window = SlidingWindow(
+            duration=chunk_duration, step=step * chunk_duration
+        )
+
+        outputs, timings = [], []
+        for share_encoder in [False, True]:
+            start = time.perf_counter()
+            output = model.slide(
+                features,
+                sliding_window,
+                batch_size=batch_size,
+                device=device,
+                share_encoder=share_encoder,
+            )
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            timings.append(time.perf_counter() - start)
+            outputs.append(output.data)
+
+        windowed, shared = timings
+        results.append(
+            {
+                "step": step,
+                "windowed": windowed,
+                "shared": shared,
+                "speedup": windowed / shared,
+                "error": float(np.nanmax(np.abs(outputs[0] - outputs[1]))),
+            }
+        )
+
+    return results
@@ -28,7 +28,12 @@
 
 import os
 import errno
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import IO
+from typing import Iterator
 from typing import Text
 from typing import Union
 
@@ -55,3 +60,61 @@ def mkdir_p(path: Union[Text, Path]):
             pass
         else:
             raise exc
+
+
+_UMASK_LOCK = threading.Lock()
+
+
+def _get_umask() -> int:
+    """Get current process umask"""
+
+    # Linux exposes the umask without having to modify it
+    try:
+        with open("/proc/self/status", "r") as fp:
+            for line in fp:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    with _UMASK_LOCK:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
+
+@contextmanager
+def atomic_open(path: Union[Text, Path], mode: Text = "w") -> Iterator[IO]:
+    """Open file for writing, only replacing it once writing succeeded
+
+    Content is written to a temporary file (in the same directory) that is
+    renamed on success, so that neither an interrupted write nor concurrent
+    writers ever leave a partially written file behind, and concurrent
+    readers always see a complete file.
+
+    Parameters
+    ----------
+    path : Text or Path
+        Path to file.
+    mode : {"w", "wb"}, optional
+        Writing mode. Defaults to "w".
+
+    Usage
+    -----
+    >>> with atomic_open("/path/to/file.txt") as fp:
+    ...     fp.write("content")
+    """
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as fp:
+            yield fp
+        # temporary files are only readable by their owner: use the same
+        # permissions as a file created by `open` instead
+        os.chmod(tmp, 0o666 & ~_get_umask())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Per-stage profiling of pipelines
+
+The process-wide `PROFILER` records wall time, CPU time, peak resident memory
+increase, and number of calls of each instrumented stage (pipeline steps and
+`Wrapper` calls), per file. It is disabled by default, in which case
+instrumented code only pays for one attribute lookup.
+
+>>> from pyannote.audio.utils.profiler import PROFILER
+>>> PROFILER.enable()
+>>> for current_file in protocol.test():
+...     hypothesis = pipeline(current_file)
+>>> print(PROFILER.summary())                   # real-time factor per stage
+>>> PROFILER.to_json("profile.json")            # per-file and total report
+>>> PROFILER.to_tensorboard(SummaryWriter(log_dir))
+
+Instrumenting code is done with either the `profiled` method decorator or
+the `PROFILER.stage` context manager:
+
+>>> @profiled("my_pipeline")
+... def __call__(self, current_file):
+...     with PROFILER.stage("my_pipeline/step"):
+...         ...
+
+Stages are nested: the time spent in a stage includes the time spent in the
+stages it calls. CPU time is process-wide (so that multi-threaded inference
+is fully accounted for) and is therefore over-estimated when several files
+are processed concurrently.
+"""
+
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Text
+from typing import Union
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from pyannote.database.util import get_unique_identifier
+
+
+def _get_max_rss() -> int:
+    """Peak resident set size of current process (in bytes)"""
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else 1024 * max_rss
+
+
+def _get_duration(current_file) -> Optional[float]:
+    """Audio duration (or None when it cannot be obtained)"""
+
+    try:
+        if "duration" in current_file:
+            return float(current_file["duration"])
+
+        from pyannote.audio.features.utils import get_audio_duration
+
+        return get_audio_duration(current_file)
+
+    except Exception:
+        return None
+
+
+def _get_uri(current_file) -> Text:
+    try:
+        return get_unique_identifier(current_file)
+    except Exception:
+        return current_file.get("uri", None)
+
+
+class _Stats:
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rss = 0
+
+    def add(self, other: "_Stats"):
+        self.calls += other.calls
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.rss += other.rss
+
+    def to_dict(self, duration: Optional[float]) -> Dict:
+        return {
+            "calls": self.calls,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "rss": self.rss,
+            "rtf": self.wall / duration if duration else None,
+        }
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Profiler:
+    """Thread-safe per-stage profiler
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Defaults to False.
+    """
+
+    def __init__(self, enabled: bool = False):
+        super().__init__()
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self):
+        """Start recording"""
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording (already recorded stats are kept)"""
+        self.enabled = False
+
+    def reset(self):
+        """Forget recorded stats"""
+        with self._lock:
+            # uri --> {stage: _Stats}
+            self._stats: Dict[Text, Dict[Text, _Stats]] = dict()
+            # uri --> audio duration
+            self._durations: Dict[Text, Optional[float]] = dict()
+
+    def stage(self, name: Text, current_file: Optional[dict] = None):
+        """Context manager recording one call to stage `name`
+
+        Parameters
+        ----------
+        name : Text
+            Stage name.
+        current_file : dict, optional
+            File processed by this stage. Defaults to the file processed by
+            the (outermost) enclosing stage that was given one, in the same
+            thread.
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._stage(name, current_file)
+
+    @contextmanager
+    def _stage(self, name: Text, current_file: Optional[dict]):
+
+        uri = getattr(self._local, "uri", None)
+        owner = uri is None and current_file is not None
+        if owner:
+            uri = _get_uri(current_file)
+            self._local.uri = uri
+            with self._lock:
+                known = uri in self._durations
+            if not known:
+                duration = _get_duration(current_file)
+                with self._lock:
+                    self._durations[uri] = duration
+
+        wall, cpu, rss = time.perf_counter(), time.process_time(), _get_max_rss()
+        try:
+            yield
+        finally:
+            stats = _Stats()
+            stats.calls = 1
+            stats.wall = time.perf_counter() - wall
+            stats.cpu = time.process_time() - cpu
+            stats.rss = _get_max_rss() - rss
+
+            with self._lock:
+                file_stats = self._stats.setdefault(uri, dict())
+                file_stats.setdefault(name, _Stats()).add(stats)
+
+            if owner:
+                self._local.uri = None
+
+    def report(self) -> Dict:
+        """Per-file and aggregated statistics
+
+        Returns
+        -------
+        report : dict
+            {"files": {uri: {"duration": duration, "stages": stages}},
+             "total": {"duration": total_duration, "stages": stages}}
+            where `stages` is a dictionary indexed by stage name, whose values
+            are dictionaries with the following keys: "calls" (number of
+            calls), "wall" and "cpu" (wall and CPU time, in seconds), "rss"
+            (increase of peak resident memory, in bytes), and "rtf" (real-time
+            factor, i.e. ratio of wall time to audio duration, or None when
+            audio duration is not known). Stages called outside of any file
+            only contribute to "total".
+        """
+
+        with self._lock:
+            items = [
+                (uri, self._durations.get(uri, None), dict(stages))
+                for uri, stages in self._stats.items()
+            ]
+
+        files = dict()
+        total = dict()
+        total_duration = 0.0
+        for uri, duration, stages in items:
+
+            for name, stats in stages.items():
+                total.setdefault(name, _Stats()).add(stats)
+
+            if uri is None:
+                continue
+
+            total_duration += duration or 0.0
+            files[uri] = {
+                "duration": duration,
+                "stages": {
+                    name: stats.to_dict(duration) for name, stats in stages.items()
+                },
+            }
+
+        return {
+            "files": files,
+            "total": {
+                "duration": total_duration,
+                "stages": {
+                    name: stats.to_dict(total_duration) for name, stats in total.items()
+                },
+            },
+        }
+
+    def summary(self) -> Text:
+        """Human-readable summary of aggregated statistics"""
+
+        total = self.report()["total"]
+        lines = [f"Profiled {total['duration']:.1f}s of audio:"]
+        for name, stats in sorted(total["stages"].items()):
+            rtf = "n/a" if stats["rtf"] is None else f"{stats['rtf']:.3f}"
+            lines.append(
+                f"  {name}: {stats['calls']:d} call(s), "
+                f"{stats['wall']:.1f}s wall, {stats['cpu']:.1f}s CPU, "
+                f"+{stats['rss'] / 1024 ** 2:.0f}MB peak RSS, RTF={rtf}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, path: Union[Text, Path]):
+        """Export report as JSON file"""
+        with open(path, "w") as fp:
+            json.dump(self.report(), fp, indent=2)
+
+    def to_tensorboard(self, writer, global_step: int = 0, prefix: Text = "profile"):
+        """Export aggregated statistics as TensorBoard scalars
+
+        Parameters
+        ----------
+        writer : SummaryWriter
+            TensorBoard writer.
+        global_step : int, optional
+            Defaults to 0.
+        prefix : Text, optional
+            Scalars are named "{prefix}/{stage}/{statistic}".
+            Defaults to "profile".
+        """
+
+        for name, stats in self.report()["total"]["stages"].items():
+            for key in ["wall", "cpu", "rss", "rtf"]:
+                if stats[key] is None:
+                    continue
+                writer.add_scalar(
+                    f"{prefix}/{name}/{key}", stats[key], global_step=global_step
+                )
+
+
+# process-wide profiler
+PROFILER = Profiler()
+
+
+def profiled(name: Text) -> Callable:
+    """Decorator for methods processing a file (passed as first argument)
+
+    Parameters
+    ----------
+    name : Text
+        Stage name.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, current_file, *args, **kwargs):
+            if not PROFILER.enabled:
+                return method(self, current_file, *args, **kwargs)
+            with PROFILER.stage(name, current_file=current_file):
+                return method(self, current_file, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""CPU resource planner for nested parallelism
+
+Training, validation, and inference combine several levels of parallelism:
+process pools (e.g. for evaluating pipelines on validation files), background
+threads (e.g. for generating training samples), torch intra-op and inter-op
+thread pools, and BLAS thread pools (numpy, scipy). Left alone, each of them
+assumes it owns all CPUs, which leads to heavy oversubscription on many-core
+hosts.
+
+>>> from pyannote.audio.utils.resources import plan_resources
+>>> plan = plan_resources("validate", budget=64, n_jobs=16)
+>>> plan.apply()                      # configure current process
+>>> pool = plan.pool()                # process pool with configured workers
+>>> print(plan.report())              # effective layout
+
+Total budget defaults to the value of PYANNOTE_AUDIO_CPUS environment
+variable, if set, and to the number of CPUs available to current process.
+"""
+
+import os
+import multiprocessing
+from typing import NamedTuple
+from typing import Optional
+from typing import Text
+
+import torch
+
+try:
+    from typing import Literal
+except ImportError as e:
+    from typing_extensions import Literal
+
+ROLE_TRAIN = "train"
+ROLE_VALIDATE = "validate"
+ROLE_APPLY = "apply"
+ROLE_EXTRACT = "extract"
+Role = Literal[ROLE_TRAIN, ROLE_VALIDATE, ROLE_APPLY, ROLE_EXTRACT]
+
+# environment variables read by BLAS / OpenMP libraries when they are loaded
+BLAS_ENVIRONMENT_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+]
+
+
+def get_cpu_budget() -> int:
+    """Get default total number of CPUs"""
+
+    budget = os.environ.get("PYANNOTE_AUDIO_CPUS", None)
+    if budget is not None:
+        return max(1, int(budget))
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def set_blas_threads(n_threads: int):
+    """Limit number of BLAS threads of current process (and its children)"""
+
+    for variable in BLAS_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(n_threads)
+
+    # BLAS libraries already loaded by current process ignore environment
+    # variables: rely on threadpoolctl (when available) to limit them
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError as e:
+        return
+    threadpool_limits(limits=n_threads, user_api="blas")
+
+
+def configure_worker(intra_op_threads: int, blas_threads: int):
+    """Configure number of torch and BLAS threads of current (worker) process"""
+    torch.set_num_threads(intra_op_threads)
+    set_blas_threads(blas_threads)
+
+
+class ResourcePlan(NamedTuple):
+    """Allocation of CPUs to the various levels of parallelism
+
+    Parameters
+    ----------
+    role : {"train", "validate", "apply", "extract"}
+    budget : int
+        Total number of CPUs.
+    n_workers : int
+        Number of worker processes (1 means no process pool).
+    n_threads : int
+        Number of background threads of main process (e.g. for generating
+        training samples).
+    intra_op_threads : int
+        Number of torch intra-op threads of main process.
+    inter_op_threads : int
+        Number of torch inter-op threads of main process.
+    blas_threads : int
+        Number of BLAS threads of main process.
+    worker_threads : int
+        Number of torch intra-op threads (and BLAS threads) of each worker.
+    """
+
+    role: Text
+    budget: int
+    n_workers: int
+    n_threads: int
+    intra_op_threads: int
+    inter_op_threads: int
+    blas_threads: int
+    worker_threads: int
+
+    def apply(self) -> "ResourcePlan":
+        """Configure current process according to plan"""
+
+        torch.set_num_threads(self.intra_op_threads)
+
+        # inter-op thread pool can only be configured once, before being used
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError as e:
+            pass
+
+        set_blas_threads(self.blas_threads)
+
+        return self
+
+    def pool(self) -> multiprocessing.Pool:
+        """Create process pool whose workers are configured according to plan"""
+
+        # children inherit environment variables of their parent
+        for variable in BLAS_ENVIRONMENT_VARIABLES:
+            os.environ[variable] = str(self.worker_threads)
+
+        try:
+            return multiprocessing.Pool(
+                self.n_workers,
+                initializer=configure_worker,
+                initargs=(self.worker_threads, self.worker_threads),
+            )
+        finally:
+            for variable in BLAS_ENVIRONMENT_VARIABLES:
+                os.environ[variable] = str(self.blas_threads)
+
+    def report(self) -> Text:
+        """Human-readable description of the effective layout"""
+
+        lines = [
+            f"CPU budget for {self.role}: {self.budget:d} CPU(s)",
+            f"  main process: {self.intra_op_threads:d} torch intra-op "
+            f"thread(s), {self.inter_op_threads:d} torch inter-op thread(s), "
+            f"{self.blas_threads:d} BLAS thread(s)",
+        ]
+        if self.n_threads > 0:
+            lines.append(f"  background threads: {self.n_threads:d}")
+        if self.n_workers > 1:
+            lines.append(
+                f"  worker processes: {self.n_workers:d} x "
+                f"{self.worker_threads:d} thread(s)"
+            )
+        return "\n".join(lines)
+
+
+def plan_resources(
+    role: Role,
+    budget: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    num_threads: Optional[int] = None,
+) -> ResourcePlan:
+    """Allocate CPUs for a given role
+
+    Parameters
+    ----------
+    role : {"train", "validate", "apply", "extract"}
+        "train" shares the budget between background threads generating
+        training samples (`n_jobs`, capped by a quarter of the budget) and
+        torch threads. "validate" alternates between inference (using all
+        CPUs) and evaluation in `n_jobs` single-threaded worker processes.
+        "apply" splits the budget between `n_jobs` (defaults to 1) inference
+        workers. "extract" uses `n_jobs` (defaults to the budget)
+        single-threaded worker processes.
+    budget : int, optional
+        Total number of CPUs. See `get_cpu_budget`.
+    n_jobs : int, optional
+        Requested number of background threads (for "train") or worker
+        processes (otherwise). It is capped by the budget.
+    num_threads : int, optional
+        Maximum number of torch intra-op threads per inference process (for
+        "apply"), typically tuned by `pyannote.audio.features.autotune`.
+        Defaults to using the whole share of the budget.
+
+    Returns
+    -------
+    plan : ResourcePlan
+    """
+
+    if budget is None:
+        budget = get_cpu_budget()
+    budget = max(1, int(budget))
+
+    if role == ROLE_TRAIN:
+        # sampling threads mostly wait for torch to consume their batches:
+        # never give them more than a quarter of the budget, so that torch
+        # keeps (most of) the CPUs
+        n_threads = max(1, budget // 4)
+        if n_jobs is not None:
+            n_threads = max(1, min(n_jobs, n_threads))
+        intra_op_threads = max(1, budget - n_threads)
+        return ResourcePlan(
+            role=role,
+            budget=budget,
+            n_workers=1,
+            n_threads=n_threads,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=1,
+            # background threads mostly rely on numpy
+            blas_threads=1,
+            worker_threads=1,
+        )
+
+    if role == ROLE_VALIDATE:
+        n_workers = budget if n_jobs is None else max(1, min(n_jobs, budget))
+        return ResourcePlan(
+            role=role,
+            budget=budget,
+            n_workers=n_workers,
+            n_threads=0,
+            intra_op_threads=budget,
+            inter_op_threads=1,
+            blas_threads=budget,
+            worker_threads=1,
+        )
+
+    if role == ROLE_APPLY:
+        n_workers = 1 if n_jobs is None else max(1, min(n_jobs, budget))
+        worker_threads = max(1, budget // n_workers)
+        intra_op_threads = worker_threads if n_workers > 1 else budget
+        if num_threads is not None:
+            worker_threads = max(1, min(num_threads, worker_threads))
+            intra_op_threads = max(1, min(num_threads, intra_op_threads))
+        return ResourcePlan(
+            role=role,
+            budget=budget,
+            n_workers=n_workers,
+            n_threads=0,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=1,
+            blas_threads=worker_threads if n_workers > 1 else budget,
+            worker_threads=worker_threads,
+        )
+
+    if role == ROLE_EXTRACT:
+        n_workers = budget if n_jobs is None else max(1, min(n_jobs, budget))
+        return ResourcePlan(
+            role=role,
+            budget=budget,
+            n_workers=n_workers,
+            n_threads=0,
+            intra_op_threads=1 if n_workers > 1 else budget,
+            inter_op_threads=1,
+            blas_threads=1 if n_workers > 1 else budget,
+            worker_threads=1,
+        )
+
+    msg = (
+        f'"role" must be one of "{ROLE_TRAIN}", "{ROLE_VALIDATE}", '
+        f'"{ROLE_APPLY}", or "{ROLE_EXTRACT}" (is: "{role}").'
+    )
+    raise ValueError(msg)
@@ -31,14 +31,49 @@
 """
 
 
+from typing import Optional
+
 import numpy as np
 import scipy.signal
 from pyannote.core import Segment, Timeline
+from pyannote.core.segment import SEGMENT_PRECISION
 from pyannote.core.utils.generators import pairwise
 from sklearn.mixture import GaussianMixture
 from pyannote.core.utils.numpy import one_hot_decoding
 
 
+def to_probability(data: np.ndarray, log_scale: Optional[bool] = None) -> np.ndarray:
+    """Convert raw detection scores to probability
+
+    Parameters
+    ----------
+    data : (num_frames, ) or (num_frames, num_classes) np.ndarray
+        Raw scores. When there is more than one class, the first one is
+        expected to be the negative class (e.g. non-speech).
+    log_scale : bool, optional
+        Set to True to indicate that scores are log-probabilities (e.g. output
+        of a multi-class classification model), or to False to indicate that
+        they are probabilities. Defaults to guessing it from the scores
+        themselves (log-scaled when their average is negative), which should
+        only be relied upon when their origin is unknown.
+
+    Returns
+    -------
+    probability : (num_frames, ) np.ndarray
+        Probability of the positive class (e.g. speech).
+    """
+
+    if log_scale is None:
+        log_scale = bool(np.nanmean(data) < 0)
+
+    if log_scale:
+        data = np.exp(data)
+
+    if data.ndim > 1 and data.shape[1] > 1:
+        return 1.0 - data[:, 0]
+    return data.reshape((len(data),))
+
+
 class Peak(object):
     """Peak detection
 
@@ -65,18 +100,27 @@ class Peak(object):
         self.min_duration = min_duration
         self.log_scale = log_scale
 
-    def apply(self, predictions, dimension=0):
-        """Peak detection
+    def candidates(self, predictions, dimension=0):
+        """Get peak candidates
 
-        Parameter
-        ---------
+        Local maxima do not depend on `alpha` (nor `scale`): they can be
+        computed once and for all, and thresholded later.
+
+        Parameters
+        ----------
         predictions : SlidingWindowFeature
             Predictions returned by segmentation approaches.
+        dimension : int, optional
+            Which dimension to process.
 
         Returns
         -------
-        segmentation : Timeline
-            Partition.
+        times : np.ndarray
+            Sorted timestamps of local maxima.
+        heights : np.ndarray
+            Corresponding (non log-scaled) predictions.
+        y : np.ndarray
+            Whole (non log-scaled) predictions.
         """
 
         if len(predictions.data.shape) == 1:
@@ -95,6 +139,28 @@ class Peak(object):
         order = max(1, int(np.rint(self.min_duration / precision)))
         indices = scipy.signal.argrelmax(y, order=order)[0]
 
+        # same as [sw[i].middle for i in indices]
+        starts = sw.start + indices * sw.step
+        times = 0.5 * (starts + (starts + sw.duration))
+
+        return times, y[indices], y
+
+    def apply(self, predictions, dimension=0):
+        """Peak detection
+
+        Parameter
+        ---------
+        predictions : SlidingWindowFeature
+            Predictions returned by segmentation approaches.
+
+        Returns
+        -------
+        segmentation : Timeline
+            Partition.
+        """
+
+        times, heights, y = self.candidates(predictions, dimension=dimension)
+
         if self.scale == "absolute":
             mini = 0
             maxi = 1
@@ -109,8 +175,9 @@ class Peak(object):
 
         threshold = mini + self.alpha * (maxi - mini)
 
-        peak_time = np.array([sw[i].middle for i in indices if y[i] > threshold])
+        peak_time = times[heights > threshold]
 
+        sw = predictions.sliding_window
         n_windows = len(y)
         start_time = sw[0].start
         end_time = sw[n_windows].end
@@ -172,90 +239,186 @@ class Binarize(object):
         self.min_duration_on = min_duration_on
         self.min_duration_off = min_duration_off
 
-    def apply(self, predictions, dimension=0):
+    def _thresholds(self, data):
+        """Compute (per-dimension) onset and offset thresholds"""
+
+        if self.scale == "absolute":
+            mini = 0
+            maxi = 1
+
+        elif self.scale == "relative":
+            mini = np.nanmin(data, axis=0)
+            maxi = np.nanmax(data, axis=0)
+
+        elif self.scale == "percentile":
+            mini = np.nanpercentile(data, 1, axis=0)
+            maxi = np.nanpercentile(data, 99, axis=0)
+
+        onset = mini + self.onset * (maxi - mini)
+        offset = mini + self.offset * (maxi - mini)
+
+        return onset, offset
+
+    def hysteresis(self, data):
+        """Onset/offset state machine
+
+        Parameters
+        ----------
+        data : (n_samples, n_dimensions) np.ndarray
+            Scores.
+
+        Returns
+        -------
+        active : (n_samples, n_dimensions) np.ndarray
+            Boolean state after each sample.
         """
+
+        n_samples, n_dimensions = data.shape
+        onset, offset = self._thresholds(data)
+
+        # NaN scores never trigger a switch
+        with np.errstate(invalid="ignore"):
+            on = data > onset
+            off = data < offset
+
+        # samples that force the state (1 = active, 0 = inactive, -1 = keep)
+        value = np.full((n_samples, n_dimensions), -1, dtype=np.int8)
+        value[on & ~off] = 1
+        value[off & ~on] = 0
+
+        # samples that toggle the state (only when onset < offset)
+        toggle = on & off
+
+        # initial state
+        value[0] = data[0] > self.onset
+        toggle[0] = False
+
+        # state is the one forced by the latest forcing sample...
+        samples = np.arange(n_samples)[:, np.newaxis]
+        latest = np.maximum.accumulate(np.where(value >= 0, samples, 0), axis=0)
+        dimensions = np.arange(n_dimensions)
+        state = value[latest, dimensions]
+
+        # ... switched once per toggling sample since then
+        toggles = np.cumsum(toggle, axis=0)
+        state ^= ((toggles - toggles[latest, dimensions]) % 2).astype(np.int8)
+
+        return state.astype(bool)
+
+    def _merge(self, starts, ends, min_gap):
+        """Merge (sorted) segments separated by less than `min_gap`"""
+
+        if len(starts) == 0:
+            return starts, ends
+
+        # gap between each segment and the union of all previous ones
+        max_ends = np.maximum.accumulate(ends)
+        gaps = starts[1:] - max_ends[:-1]
+        new = np.hstack([[True], (gaps > SEGMENT_PRECISION) & (gaps >= min_gap)])
+
+        groups = np.cumsum(new) - 1
+        merged_ends = np.full(groups[-1] + 1, -np.inf)
+        np.maximum.at(merged_ends, groups, ends)
+        return starts[new], merged_ends
+
+    def boundaries(self, predictions, dimensions=None):
+        """Get start and end times of active regions
+
         Parameters
         ----------
         predictions : SlidingWindowFeature
-            Must be mono-dimensional
-        dimension : int, optional
-            Which dimension to process
+            (n_samples, ) or (n_samples, n_dimensions) predictions.
+        dimensions : iterable of int, optional
+            Which dimensions to process. Defaults to all of them.
+
+        Returns
+        -------
+        boundaries : list of (starts, ends) tuples
+            One tuple per processed dimension, where `starts` and `ends` are
+            np.ndarrays of (sorted) start and end times of active regions.
         """
 
-        if len(predictions.data.shape) == 1:
-            data = predictions.data
-        elif predictions.data.shape[1] == 1:
-            data = predictions.data[:, 0]
-        else:
-            data = predictions.data[:, dimension]
+        data = predictions.data
+        if len(data.shape) == 1:
+            data = data[:, np.newaxis]
+
+        if dimensions is not None:
+            data = data[:, list(dimensions)]
 
         if self.log_scale:
             data = np.exp(data)
 
-        n_samples = predictions.getNumber()
+        n_samples = len(data)
         window = predictions.sliding_window
-        timestamps = [window[i].middle for i in range(n_samples)]
 
-        # initial state
-        start = timestamps[0]
-        label = data[0] > self.onset
+        # same as [window[i].middle for i in range(n_samples)]
+        starts = window.start + np.arange(n_samples) * window.step
+        timestamps = 0.5 * (starts + (starts + window.duration))
 
-        if self.scale == "absolute":
-            mini = 0
-            maxi = 1
+        active = self.hysteresis(data)
 
-        elif self.scale == "relative":
-            mini = np.nanmin(data)
-            maxi = np.nanmax(data)
+        # +1 when switching to active, -1 when switching to inactive
+        edges = np.diff(active.astype(np.int8), axis=0, prepend=0, append=0)
 
-        elif self.scale == "percentile":
-            mini = np.nanpercentile(data, 1)
-            maxi = np.nanpercentile(data, 99)
+        boundaries = []
+        for d in range(active.shape[1]):
 
-        onset = mini + self.onset * (maxi - mini)
-        offset = mini + self.offset * (maxi - mini)
+            # region ends when switching to inactive or at the very end
+            on = np.nonzero(edges[:, d] > 0)[0]
+            off = np.minimum(np.nonzero(edges[:, d] < 0)[0], n_samples - 1)
+            starts = timestamps[on] - self.pad_onset
+            ends = timestamps[off] + self.pad_offset
+
+            # because of padding, some 'active' regions might be overlapping
+            # therefore, we merge those overlapping regions
+            keep = ends - starts > SEGMENT_PRECISION
+            starts, ends = self._merge(starts[keep], ends[keep], 0.0)
+
+            # remove short 'active' regions
+            keep = ends - starts > self.min_duration_on
+            starts, ends = starts[keep], ends[keep]
+
+            # fill short 'inactive' regions
+            starts, ends = self._merge(starts, ends, self.min_duration_off)
+
+            boundaries.append((starts, ends))
+
+        return boundaries
+
+    def apply(self, predictions, dimension=0):
+        """
+        Parameters
+        ----------
+        predictions : SlidingWindowFeature
+            Must be mono-dimensional
+        dimension : int, optional
+            Which dimension to process
+        """
+
+        if len(predictions.data.shape) == 1 or predictions.data.shape[1] == 1:
+            dimension = 0
+
+        ((starts, ends),) = self.boundaries(predictions, dimensions=[dimension])
+        return Timeline([Segment(start, end) for start, end in zip(starts, ends)])
+
+    def apply_all(self, predictions):
+        """Binarize all dimensions at once
+
+        Parameters
+        ----------
+        predictions : SlidingWindowFeature
+            (n_samples, n_dimensions) predictions.
+
+        Returns
+        -------
+        active : list of Timeline
+            One timeline per dimension.
+        """
 
-        # timeline meant to store 'active' segments
-        active = Timeline()
-
-        for t, y in zip(timestamps[1:], data[1:]):
-
-            # currently active
-            if label:
-                # switching from active to inactive
-                if y < offset:
-                    segment = Segment(start - self.pad_onset, t + self.pad_offset)
-                    active.add(segment)
-                    start = t
-                    label = False
-
-            # currently inactive
-            else:
-                # switching from inactive to active
-                if y > onset:
-                    start = t
-                    label = True
-
-        # if active at the end, add final segment
-        if label:
-            segment = Segment(start - self.pad_onset, t + self.pad_offset)
-            active.add(segment)
-
-        # because of padding, some 'active' segments might be overlapping
-        # therefore, we merge those overlapping segments
-        active = active.support()
-
-        # remove short 'active' segments
-        active = Timeline([s for s in active if s.duration > self.min_duration_on])
-
-        # fill short 'inactive' segments
-        inactive = active.gaps()
-        for s in inactive:
-            if s.duration < self.min_duration_off:
-                active.add(s)
-        active = active.support()
-
-        return active
+        return [
+            Timeline([Segment(start, end) for start, end in zip(starts, ends)])
+            for starts, ends in self.boundaries(predictions)
+        ]
 
 
 class GMMResegmentation(object):
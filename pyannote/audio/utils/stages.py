@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Staged processing with bounded queues
+
+`StagedPipeline` sends a stream of items through a sequence of stages (e.g.
+reading audio, running a model, writing its output to disk). Each stage has
+its own pool of threads and stages are connected by bounded queues, so that
+I/O-bound stages are overlapped with compute-bound ones while memory usage
+remains under control. Items are returned in the order they were provided.
+
+>>> from pyannote.audio.utils.stages import Stage, StagedPipeline
+>>> stages = StagedPipeline([Stage("read", read, n_threads=2),
+...                          Stage("infer", infer),
+...                          Stage("write", write)], maxsize=2)
+>>> for output in stages(items):
+...     pass
+>>> print(stages.report())            # stage utilization and queue depth
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Text
+
+# marks the end of the stream of items
+_DONE = object()
+
+
+class MeteredQueue(queue.Queue):
+    """Bounded FIFO queue keeping track of its depth
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of items in the queue.
+    name : Text, optional
+        Queue name (used for reporting).
+    """
+
+    def __init__(self, maxsize: int, name: Text = ""):
+        super().__init__(maxsize)
+        self.name = name
+        self.items_ = 0
+        self.max_depth_ = 0
+        self._depth_time = 0.0
+        self._start = self._last = time.perf_counter()
+
+    def _update(self):
+        # called with queue mutex held
+        now = time.perf_counter()
+        self._depth_time += self._qsize() * (now - self._last)
+        self._last = now
+
+    def _put(self, item):
+        self._update()
+        super()._put(item)
+        if item is not _DONE:
+            self.items_ += 1
+        self.max_depth_ = max(self.max_depth_, self._qsize())
+
+    def _get(self):
+        self._update()
+        return super()._get()
+
+    @property
+    def mean_depth(self) -> float:
+        """Average number of items in the queue (over time)"""
+        with self.mutex:
+            self._update()
+            elapsed = self._last - self._start
+            return self._depth_time / elapsed if elapsed > 0 else 0.0
+
+
+class Stage:
+    """Processing stage
+
+    Parameters
+    ----------
+    name : Text
+        Stage name (used for reporting).
+    function : callable
+        Function applied to each item.
+    n_threads : int, optional
+        Number of threads processing items concurrently. Defaults to 1. Use
+        more threads for I/O-bound stages (e.g. reading audio files) only, as
+        `function` must be thread-safe when n_threads > 1.
+    """
+
+    def __init__(self, name: Text, function: Callable[[Any], Any], n_threads: int = 1):
+        super().__init__()
+        self.name = name
+        self.function = function
+        self.n_threads = n_threads
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.items_ = 0
+        self.busy_ = 0.0
+        self.blocked_ = 0.0
+
+    def _process(self, item: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self.function(item)
+        finally:
+            with self._lock:
+                self.items_ += 1
+                self.busy_ += time.perf_counter() - start
+
+
+class StagedPipeline:
+    """Process a stream of items through a sequence of stages
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Processing stages. Each stage processes the output of the previous
+        one, in its own thread(s).
+    maxsize : int, optional
+        Maximum number of items being processed by a stage or waiting for the
+        next one. Defaults to 2. Upstream stages are paused when this limit is
+        reached.
+
+    Usage
+    -----
+    >>> stages = StagedPipeline([Stage("square", lambda x: x * x),
+    ...                          Stage("negate", lambda x: -x)])
+    >>> list(stages(range(4)))
+    [0, -1, -4, -9]
+    """
+
+    def __init__(self, stages: List[Stage], maxsize: int = 2):
+        super().__init__()
+        self.stages = stages
+        self.maxsize = maxsize
+        self.queues_ = []
+        self.elapsed_ = 0.0
+
+    def _put(self, outputs: MeteredQueue, item: Any, stop: threading.Event):
+        # do not block forever when downstream stages are gone
+        while not stop.is_set():
+            try:
+                outputs.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _drain(self, inputs: MeteredQueue, stop: threading.Event) -> Iterator:
+        while not stop.is_set():
+            try:
+                future = inputs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if future is _DONE:
+                return
+            yield future.result()
+
+    def _dispatch(
+        self,
+        stage: Stage,
+        inputs: Iterable,
+        outputs: MeteredQueue,
+        stop: threading.Event,
+    ):
+        # futures are sent downstream in submission order, so that items keep
+        # their order even when the stage uses several threads.
+        executor = ThreadPoolExecutor(
+            max_workers=stage.n_threads, thread_name_prefix=stage.name
+        )
+        try:
+            for item in inputs:
+                if stop.is_set():
+                    break
+                future = executor.submit(stage._process, item)
+                start = time.perf_counter()
+                self._put(outputs, future, stop)
+                stage.blocked_ += time.perf_counter() - start
+
+        except BaseException as e:
+            # forward failure (of this stage or upstream ones) downstream
+            failure = Future()
+            failure.set_exception(e)
+            self._put(outputs, failure, stop)
+
+        finally:
+            self._put(outputs, _DONE, stop)
+            executor.shutdown(wait=False)
+
+    def __call__(self, items: Iterable) -> Iterator:
+        """Process items
+
+        Parameters
+        ----------
+        items : iterable
+            Items processed by the first stage.
+
+        Yields
+        ------
+        output : Any
+            Output of the last stage, in the same order as `items`.
+            Exceptions raised by any stage are raised here.
+        """
+
+        stop = threading.Event()
+
+        self.queues_ = []
+        inputs = items
+        threads = []
+        for stage in self.stages:
+            stage.reset()
+            outputs = MeteredQueue(self.maxsize, name=stage.name)
+            self.queues_.append(outputs)
+            threads.append(
+                threading.Thread(
+                    target=self._dispatch,
+                    args=(stage, inputs, outputs, stop),
+                    daemon=True,
+                )
+            )
+            inputs = self._drain(outputs, stop)
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            yield from inputs
+        finally:
+            # also stops upstream stages when consumer stops early
+            stop.set()
+            self.elapsed_ = time.perf_counter() - start
+
+    def metrics(self) -> List[Dict]:
+        """Stage utilization and queue depth of latest run
+
+        Returns
+        -------
+        metrics : list of dict
+            One dictionary per stage with the following keys: "stage", "items"
+            (number of processed items), "busy" (time spent processing items,
+            in seconds), "utilization" (ratio of busy time to available thread
+            time), "blocked" (time spent waiting for downstream stages, in
+            seconds), "mean_depth" and "max_depth" (number of items in the
+            output queue of the stage, either being processed by the stage or
+            waiting for the next one).
+        """
+
+        return [
+            {
+                "stage": stage.name,
+                "items": stage.items_,
+                "busy": stage.busy_,
+                "utilization": (
+                    stage.busy_ / (stage.n_threads * self.elapsed_)
+                    if self.elapsed_ > 0
+                    else 0.0
+                ),
+                "blocked": stage.blocked_,
+                "mean_depth": outputs.mean_depth,
+                "max_depth": outputs.max_depth_,
+            }
+            for stage, outputs in zip(self.stages, self.queues_)
+        ]
+
+    def report(self) -> Text:
+        """Human-readable summary of `metrics`"""
+
+        lines = [f"Processed in {self.elapsed_:.1f}s:"]
+        for m in self.metrics():
+            lines.append(
+                f"  {m['stage']}: {m['items']:d} item(s), "
+                f"{100 * m['utilization']:.0f}% busy, "
+                f"{m['blocked']:.1f}s blocked, "
+                f"queue depth {m['mean_depth']:.1f} (max {m['max_depth']:d}"
+                f"/{self.maxsize:d})"
+            )
+        return "\n".join(lines)
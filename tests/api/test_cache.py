@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pytest
+
+from pyannote.audio.features.cache import InferenceCache
+from pyannote.audio.features.cache import get_array_fingerprint
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        np.arange(12, dtype=np.float32).reshape(3, 4),
+        np.random.RandomState(0).randn(100, 7),
+        np.array([[np.nan, 1.0], [np.inf, -np.inf]]),
+        np.arange(10, dtype=np.int64),
+        np.zeros((0, 5), dtype=np.float32),
+    ],
+)
+def test_inference_cache_roundtrip(tmp_path, data):
+    cache = InferenceCache(tmp_path / "cache")
+    key = cache.hash("file", 1, 2.0)
+    cache.set(key, data)
+    cached = cache.get(key)
+    assert cached.dtype == data.dtype
+    np.testing.assert_array_equal(cached, data)
+
+
+def test_inference_cache_non_contiguous(tmp_path):
+    cache = InferenceCache(tmp_path)
+    data = np.random.RandomState(0).randn(10, 20).T[::2]
+    key = cache.hash("transposed")
+    cache.set(key, data)
+    np.testing.assert_array_equal(cache.get(key), data)
+
+
+def test_inference_cache_miss(tmp_path):
+    cache = InferenceCache(tmp_path)
+    assert cache.get(cache.hash("missing")) is None
+
+
+def test_inference_cache_corrupted(tmp_path):
+    cache = InferenceCache(tmp_path)
+    key = cache.hash("corrupted")
+    cache.set(key, np.ones((10, 10)))
+    with open(cache.get_path(key), "wb") as fp:
+        fp.write(b"not a numpy file")
+    assert cache.get(key) is None
+
+
+def test_inference_cache_hash():
+    hash_ = InferenceCache.hash
+    assert hash_("a", 1, {"x": 1, "y": 2}) == hash_("a", 1, {"x": 1, "y": 2})
+    assert hash_({"x": 1, "y": 2}) == hash_({"y": 2, "x": 1})
+    assert hash_("a", "b") != hash_("b", "a")
+    assert hash_("a", 1) != hash_("a", 2)
+    assert len(hash_("a")) == 64
+
+
+def test_inference_cache_eviction(tmp_path):
+
+    cache = InferenceCache(tmp_path, max_size=None)
+    keys = [cache.hash(name) for name in ["a", "b", "c"]]
+    for key in keys:
+        cache.set(key, np.ones((100, 10)))
+    entry_size = os.path.getsize(cache.get_path(keys[0]))
+    assert cache.size == 3 * entry_size
+
+    # "a" is the oldest entry, but reading it makes it the most recent one
+    for t, key in enumerate(keys):
+        os.utime(cache.get_path(key), (1000.0 * (t + 1), 1000.0 * (t + 1)))
+    assert cache.get(keys[0]) is not None
+
+    cache.max_size = 2 * entry_size
+    cache.evict()
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+    # adding one more entry evicts the least recently used one ("c")
+    os.utime(cache.get_path(keys[2]), (1000.0, 1000.0))
+    key = cache.hash("d")
+    cache.set(key, np.ones((100, 10)))
+    assert cache.get(key) is not None
+    assert cache.get(keys[2]) is None
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_array_fingerprint():
+
+    data = np.random.RandomState(0).randn(10, 20)
+    fingerprint = get_array_fingerprint(data)
+
+    assert get_array_fingerprint(data.copy()) == fingerprint
+    assert get_array_fingerprint(np.asfortranarray(data)) == fingerprint
+    assert get_array_fingerprint(data.T.copy().T) == fingerprint
+
+    assert get_array_fingerprint(data[:, ::2]) == get_array_fingerprint(
+        np.ascontiguousarray(data[:, ::2])
+    )
+
+    assert get_array_fingerprint(data.astype(np.float32)) != fingerprint
+    assert get_array_fingerprint(data.reshape(20, 10)) != fingerprint
+    other = data.copy()
+    other[5, 5] += 1.0
+    assert get_array_fingerprint(other) != fingerprint
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from pyannote.pipeline.blocks.clustering import (
+    HierarchicalAgglomerativeClustering as _HierarchicalAgglomerativeClustering,
+)
+
+from pyannote.audio.pipeline.clustering import HierarchicalAgglomerativeClustering
+
+
+def _embeddings(seed, n_samples=50, dimension=8, n_clusters=4):
+    """Random embeddings drawn around a few centroids"""
+    rng = np.random.RandomState(seed)
+    centroids = rng.randn(n_clusters, dimension)
+    y = rng.randint(n_clusters, size=n_samples)
+    return centroids[y] + 0.3 * rng.randn(n_samples, dimension)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("method", ["pool", "average", "complete", "single"])
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+@pytest.mark.parametrize("normalize", [False, True])
+def test_hac_threshold_equivalence(seed, method, metric, normalize):
+
+    X = _embeddings(seed)
+
+    hac = HierarchicalAgglomerativeClustering(
+        method=method, metric=metric, use_threshold=True, normalize=normalize
+    )
+    reference = _HierarchicalAgglomerativeClustering(
+        method=method, metric=metric, use_threshold=True, normalize=normalize
+    )
+
+    # one dendrogram is enough for all thresholds
+    Z = hac.dendrogram(X)
+    for threshold in [0.05, 0.2, 0.5, 1.0, 2.0]:
+        hac.instantiate({"threshold": threshold})
+        reference.instantiate({"threshold": threshold})
+        expected = reference(X)
+        np.testing.assert_array_equal(hac.flatten(Z, X), expected)
+        np.testing.assert_array_equal(hac(X), expected)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("normalize", [False, True])
+def test_hac_auto_equivalence(seed, normalize):
+
+    X = _embeddings(seed)
+
+    hac = HierarchicalAgglomerativeClustering(metric="cosine", normalize=normalize)
+    reference = _HierarchicalAgglomerativeClustering(
+        metric="cosine", normalize=normalize
+    )
+
+    np.testing.assert_array_equal(hac.flatten(hac.dendrogram(X), X), reference(X))
+
+
+def test_hac_corner_cases():
+
+    hac = HierarchicalAgglomerativeClustering()
+
+    X = np.ones((1, 8))
+    assert hac.dendrogram(X) is None
+    np.testing.assert_array_equal(hac(X), [1])
+
+    with pytest.raises(ValueError):
+        hac.dendrogram(np.ones((0, 8)))
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from pyannote.core import Segment
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+from pyannote.core import Timeline
+
+from pyannote.audio.pipeline.utils import EmbeddingIndex
+
+
+def _embedding(seed=0, n_samples=500, dimension=4):
+    """Random embeddings, with a few gated (NaN) windows"""
+    rng = np.random.RandomState(seed)
+    data = rng.randn(n_samples, dimension)
+    data[100:150] = np.nan
+    data[rng.randint(n_samples, size=20)] = np.nan
+    window = SlidingWindow(start=0.0, duration=0.5, step=0.02)
+    return SlidingWindowFeature(data, window)
+
+
+def _timelines(seed=0, n_timelines=30, end=9.5):
+    """Random non-empty timelines, including very short segments"""
+    rng = np.random.RandomState(seed)
+    timelines = []
+    for _ in range(n_timelines):
+        timeline = Timeline()
+        for _ in range(rng.randint(1, 5)):
+            start = rng.uniform(1.0, end - 1.0)
+            duration = rng.choice([0.01, 0.05, 0.3, 1.0])
+            timeline.add(Segment(start, start + duration))
+        timelines.append(timeline)
+    # timeline whose embeddings are all gated
+    timelines.append(Timeline([Segment(2.6, 2.7)]))
+    return timelines
+
+
+def _mean_loop(embedding, timelines, modes):
+    """Crop-and-average implementation replaced by `EmbeddingIndex.mean`"""
+
+    _, dimension = embedding.data.shape
+
+    X = []
+    for timeline in timelines:
+
+        # be more and more permissive until we have
+        # at least one embedding for current timeline
+        for mode in modes:
+            x = embedding.crop(timeline, mode=mode)
+            # ignore embeddings of gated windows, if any
+            x = x[~np.any(np.isnan(x), axis=1)]
+            if len(x) > 0:
+                break
+
+        if len(x) < 1:
+            X.append(np.full((dimension,), np.nan))
+        else:
+            X.append(np.mean(x, axis=0))
+
+    return np.vstack(X)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize(
+    "modes",
+    [
+        ("strict", "center", "loose"),
+        ("center", "loose"),
+        ("strict",),
+        ("center",),
+        ("loose",),
+    ],
+)
+def test_embedding_index_equivalence(seed, modes):
+    embedding = _embedding(seed=seed)
+    timelines = _timelines(seed=seed)
+    X = EmbeddingIndex(embedding).mean(timelines, modes=modes)
+    expected = _mean_loop(embedding, timelines, modes)
+    assert X.shape == expected.shape
+    np.testing.assert_allclose(X, expected, rtol=1e-7, atol=1e-9)
+
+
+def test_embedding_index_gated():
+    embedding = _embedding()
+    X = EmbeddingIndex(embedding).mean([Timeline([Segment(2.6, 2.7)])])
+    assert np.all(np.isnan(X))
+
+
+def test_embedding_index_unsupported_mode():
+    index = EmbeddingIndex(_embedding())
+    with pytest.raises(ValueError):
+        index.mean(_timelines(), modes=("unknown",))
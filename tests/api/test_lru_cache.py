@@ -0,0 +1,85 @@
+import pytest
+
+from pyannote.audio.pipeline.utils import LRUCache
+
+
+class _Compute:
+    """Callable returning `value` and counting its calls"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_lru_cache_equivalence():
+
+    cache = LRUCache(max_entries=3)
+
+    # whatever the cache state, `get` returns the same as `compute()`
+    for key in [1, 2, 1, 3, 4, 1, 2, 5, 5, 3]:
+        assert cache.get(key, lambda: key ** 2) == key ** 2
+
+
+def test_lru_cache_hit():
+
+    cache = LRUCache()
+
+    compute = _Compute("value")
+    assert cache.get("key", compute) == "value"
+    assert cache.get("key", compute) == "value"
+    assert compute.calls == 1
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_rate == pytest.approx(0.5)
+
+
+def test_lru_cache_eviction():
+
+    cache = LRUCache(max_entries=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+
+    # hit on "a" makes "b" the least recently used entry
+    cache.get("a", lambda: 1)
+    cache.get("c", lambda: 3)
+
+    assert len(cache) == 2
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+    # evicted entries are computed again
+    compute = _Compute(2)
+    assert cache.get("b", compute) == 2
+    assert compute.calls == 1
+    assert "a" not in cache
+
+
+def test_lru_cache_unbounded():
+
+    cache = LRUCache(max_entries=None)
+    for key in range(1000):
+        cache.get(key, lambda: key)
+    assert len(cache) == 1000
+    assert 0 in cache
+
+
+def test_lru_cache_clear():
+
+    cache = LRUCache()
+    assert cache.hit_rate == 0.0
+
+    cache.get("key", lambda: "value")
+    cache.get("key", lambda: "value")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert "key" not in cache
+    assert cache.hits == 0
+    assert cache.misses == 0
+    assert cache.hit_rate == 0.0
@@ -0,0 +1,181 @@
+import numpy as np
+import pytest
+
+from pyannote.audio.pipeline.online_diarization import DiarizationStream
+
+SAD_STEP = 0.02
+EMB_STEP = 0.1
+DIMENSION = 8
+LATENCY = 1.0
+
+
+def _is_speech(times):
+    """Speech in [1, 4.5) and [5.5, 9) of every 10 seconds"""
+    phase = times % 10.0
+    return ((phase >= 1.0) & (phase < 4.5)) | ((phase >= 5.5) & (phase < 9.0))
+
+
+def _streams(duration, n_speakers=3, seed=0):
+    """Synthetic (times, probability) and (times, embeddings) streams
+
+    Speakers take turns every 3 seconds and are represented by orthogonal
+    embeddings (plus noise). A few embeddings are missing (NaN).
+    """
+
+    rng = np.random.RandomState(seed)
+
+    sad_times = np.arange(0.01, duration, SAD_STEP)
+    probability = np.where(_is_speech(sad_times), 0.9, 0.1)
+    probability += 0.05 * rng.uniform(-1.0, 1.0, size=len(sad_times))
+
+    emb_times = np.arange(0.05, duration, EMB_STEP)
+    speaker = (emb_times // 3.0).astype(int) % n_speakers
+    X = np.eye(DIMENSION)[speaker] + 0.05 * rng.randn(len(emb_times), DIMENSION)
+    X[rng.rand(len(emb_times)) < 0.02] = np.nan
+
+    return (sad_times, probability), (emb_times, X)
+
+
+def _expected_speech(sad_times):
+    """Speech regions, from first active to first inactive frame"""
+    speech = _is_speech(sad_times)
+    previous = np.hstack([[False], speech[:-1]])
+    starts = sad_times[speech & ~previous]
+    ends = sad_times[~speech & previous]
+    if speech[-1]:
+        ends = np.hstack([ends, sad_times[-1]])
+    return np.vstack([starts, ends]).T
+
+
+def _stream(**kwargs):
+    params = {
+        "onset": 0.7,
+        "offset": 0.3,
+        "threshold": 0.5,
+        "merge_threshold": 0.2,
+        "latency": LATENCY,
+    }
+    params.update(kwargs)
+    return DiarizationStream(**params)
+
+
+def _run(stream, streams, duration, chunk, provisional=False):
+    """Feed `streams` to `stream` by chunks of `chunk` seconds, then flush
+
+    Returns
+    -------
+    turns : list of (start, end, label) tuples
+        Finalized speaker turns, in the order they were emitted.
+    sizes : dict
+        Maximum size of the stream state after each update.
+    """
+
+    (sad_times, probability), (emb_times, X) = streams
+    edges = np.hstack([np.arange(0.0, duration, chunk), duration + 1.0])
+
+    turns = []
+    sizes = {"times": 0, "speech": 0, "centroids": 0}
+    for start, end in zip(edges[:-1], edges[1:]):
+        s = (sad_times >= start) & (sad_times < end)
+        e = (emb_times >= start) & (emb_times < end)
+        finalized = stream.update(
+            speech=(sad_times[s], probability[s]), embedding=(emb_times[e], X[e])
+        )
+        turns.extend(
+            (segment.start, segment.end, label)
+            for segment, _, label in finalized.itertracks(yield_label=True)
+        )
+        if provisional:
+            stream.provisional()
+
+        n_centroids = 0 if stream._centroids is None else len(stream._centroids)
+        sizes["times"] = max(sizes["times"], len(stream._times))
+        sizes["speech"] = max(sizes["speech"], len(stream._speech))
+        sizes["centroids"] = max(sizes["centroids"], n_centroids)
+
+    turns.extend(
+        (segment.start, segment.end, label)
+        for segment, _, label in stream.flush().itertracks(yield_label=True)
+    )
+    return turns, sizes
+
+
+def _support(turns):
+    support = []
+    for start, end, _ in sorted(turns):
+        if support and start <= support[-1][1] + 1e-6:
+            support[-1][1] = max(support[-1][1], end)
+        else:
+            support.append([start, end])
+    return np.array(support)
+
+
+def test_bounded_state():
+
+    duration, chunk = 1000.0, 1.0
+    stream = _stream(max_speakers=4)
+    _, sizes = _run(stream, _streams(duration), duration, chunk)
+
+    # labeled frames still needed for smoothing and frames waiting for
+    # `latency` seconds of future embeddings
+    assert sizes["times"] <= (2 * LATENCY + chunk) / EMB_STEP + 3
+    assert sizes["speech"] <= 3
+    assert 0 < sizes["centroids"] <= 4
+
+
+def test_max_speakers():
+
+    duration = 300.0
+    streams = _streams(duration, n_speakers=6)
+    stream = _stream(max_speakers=3)
+    turns, sizes = _run(stream, streams, duration, 1.0)
+
+    assert sizes["centroids"] <= 3
+    np.testing.assert_allclose(
+        _support(turns), _expected_speech(streams[0][0]), atol=1e-6
+    )
+
+
+def test_finalized_turns_are_never_modified():
+
+    duration = 200.0
+    turns, _ = _run(_stream(), _streams(duration), duration, 0.5)
+
+    # each update only emits turns that start after previously emitted ones
+    for (_, previous_end, _), (start, end, _) in zip(turns[:-1], turns[1:]):
+        assert start >= previous_end - 1e-6
+        assert end > start
+
+
+@pytest.mark.parametrize("duration", [95.0, 97.0])
+def test_flush(duration):
+
+    # stream ends with non-speech (95s) or in the middle of speech (97s)
+    streams = _streams(duration)
+    stream = _stream()
+    turns, _ = _run(stream, streams, duration, 1.0)
+
+    assert stream._turn is None
+    assert stream._n_labeled == len(stream._times)
+    np.testing.assert_allclose(
+        _support(turns), _expected_speech(streams[0][0]), atol=1e-6
+    )
+
+
+@pytest.mark.parametrize("chunk", [0.1, 0.5, 3.7, 150.0])
+def test_chunking_does_not_change_output(chunk):
+
+    duration = 120.0
+    streams = _streams(duration)
+    expected, _ = _run(_stream(), streams, duration, 1.0)
+    turns, _ = _run(_stream(), streams, duration, chunk)
+    assert turns == expected
+
+
+def test_provisional_does_not_change_output():
+
+    duration = 120.0
+    streams = _streams(duration)
+    expected, _ = _run(_stream(), streams, duration, 1.0)
+    turns, _ = _run(_stream(), streams, duration, 1.0, provisional=True)
+    assert turns == expected
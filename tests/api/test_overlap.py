@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from pyannote.core import Annotation
+from pyannote.core import Segment
+from pyannote.core import Timeline
+
+from pyannote.audio.pipeline.utils import get_overlap
+
+
+def _overlap_loop(annotation):
+    """Pairwise implementation replaced by `get_overlap`"""
+    overlap = Timeline(uri=annotation.uri)
+    for (s1, t1), (s2, t2) in annotation.co_iter(annotation):
+        l1 = annotation[s1, t1]
+        l2 = annotation[s2, t2]
+        if l1 == l2:
+            continue
+        overlap.add(s1 & s2)
+    return overlap.support()
+
+
+def _annotation(seed, n_tracks=100, n_labels=4):
+    """Random annotation with (same and different label) overlaps
+
+    Boundaries are rounded so that segments often start or end at the same
+    time (e.g. contiguous speech turns of different speakers).
+    """
+    rng = np.random.RandomState(seed)
+    annotation = Annotation(uri="file")
+    for track in range(n_tracks):
+        start = np.round(rng.uniform(0.0, 60.0), 1)
+        duration = np.round(rng.uniform(0.1, 5.0), 1)
+        label = f"speaker{rng.randint(n_labels)}"
+        annotation[Segment(start, start + duration), track] = label
+    return annotation
+
+
+def _assert_same_timeline(actual, expected):
+    actual = np.array([[s.start, s.end] for s in actual]).reshape(-1, 2)
+    expected = np.array([[s.start, s.end] for s in expected]).reshape(-1, 2)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected)
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("n_labels", [1, 2, 4])
+def test_get_overlap_equivalence(seed, n_labels):
+    annotation = _annotation(seed, n_labels=n_labels)
+    overlap = get_overlap(annotation)
+    assert overlap.uri == "file"
+    _assert_same_timeline(overlap, _overlap_loop(annotation))
+
+
+def test_get_overlap_corner_cases():
+
+    annotation = Annotation()
+    assert not get_overlap(annotation)
+
+    # same label
+    annotation[Segment(0, 2), "a"] = "A"
+    annotation[Segment(1, 3), "b"] = "A"
+    assert not get_overlap(annotation)
+
+    # contiguous speech turns of different labels
+    annotation[Segment(3, 4), "c"] = "B"
+    assert not get_overlap(annotation)
+
+    # contiguous overlap regions are merged
+    annotation[Segment(2.5, 3.5), "d"] = "C"
+    _assert_same_timeline(get_overlap(annotation), [Segment(2.5, 3.5)])
+    _assert_same_timeline(get_overlap(annotation), _overlap_loop(annotation))
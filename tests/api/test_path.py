@@ -0,0 +1,53 @@
+import os
+import stat
+
+import pytest
+
+from pyannote.audio.utils.path import atomic_open
+
+
+def test_atomic_open(tmp_path):
+    path = tmp_path / "file.txt"
+    with atomic_open(path) as fp:
+        fp.write("content")
+    assert path.read_text() == "content"
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def test_atomic_open_binary(tmp_path):
+    path = tmp_path / "file.bin"
+    with atomic_open(path, mode="wb") as fp:
+        fp.write(b"\x00\x01")
+    assert path.read_bytes() == b"\x00\x01"
+
+
+def test_atomic_open_permissions(tmp_path):
+
+    umask = os.umask(0o027)
+    try:
+        expected = tmp_path / "expected.txt"
+        with open(expected, "w") as fp:
+            fp.write("content")
+        path = tmp_path / "file.txt"
+        with atomic_open(path) as fp:
+            fp.write("content")
+    finally:
+        os.umask(umask)
+
+    # same permissions as files created with `open`
+    assert stat.S_IMODE(path.stat().st_mode) == stat.S_IMODE(expected.stat().st_mode)
+
+
+def test_atomic_open_failure(tmp_path):
+
+    path = tmp_path / "file.txt"
+    path.write_text("original")
+
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as fp:
+            fp.write("partial")
+            raise RuntimeError("failure")
+
+    # original file is left untouched and temporary file is removed
+    assert path.read_text() == "original"
+    assert os.listdir(tmp_path) == ["file.txt"]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import torch
+
+from pyannote.audio.models import SincTDNN
+from pyannote.audio.models.pooling import StatsPool
+from pyannote.audio.train.task import Task
+from pyannote.audio.train.task import TaskOutput
+from pyannote.audio.train.task import TaskType
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("n_frames", [2, 10, 101])
+def test_pool_windows_equivalence(dtype, n_frames):
+
+    torch.manual_seed(0)
+    seq_len, hidden_size = 500, 16
+
+    # large offset makes naive sums of squares numerically unstable
+    x = 100.0 + torch.randn(seq_len, hidden_size, dtype=dtype)
+
+    # overlapping windows, including first and last possible ones
+    starts = torch.tensor(
+        sorted({0, 1, 3, 50, 51, 200, seq_len - n_frames}), dtype=torch.long
+    )
+
+    pooled = StatsPool.pool_windows(x, starts, n_frames)
+    assert pooled.dtype == dtype
+
+    windows = torch.stack([x[s : s + n_frames] for s in starts])
+    expected = StatsPool()(windows)
+
+    np.testing.assert_allclose(pooled.numpy(), expected.numpy(), rtol=1e-4, atol=1e-4)
+
+
+def test_pool_windows_constant():
+    # zero variance windows must not produce NaN (negative rounding errors)
+    x = torch.full((20, 3), 0.1, dtype=torch.float32)
+    pooled = StatsPool.pool_windows(x, torch.tensor([0, 5, 10]), 10)
+    assert not torch.any(torch.isnan(pooled))
+    np.testing.assert_allclose(pooled[:, 3:].numpy(), 0.0, atol=1e-4)
+
+
+def test_sinc_tdnn_shared_decode():
+
+    torch.manual_seed(0)
+    specifications = {
+        "task": Task(type=TaskType.REPRESENTATION_LEARNING, output=TaskOutput.VECTOR),
+        "X": {"dimension": 1},
+        "y": {"classes": ["A", "B"]},
+    }
+    model = SincTDNN(
+        specifications,
+        sincnet={
+            "out_channels": [8, 8, 8],
+            "waveform_normalize": False,
+            "instance_normalize": False,
+        },
+        tdnn={"embedding_dim": 16},
+    ).eval()
+
+    # frame-level layers are shared and statistics are pooled from cumsums
+    assert model._share_frames
+
+    # windows start on the frame grid (27 samples) for outputs to be identical
+    n_samples, step = 8000, 30 * 27
+    waveform = 0.1 * torch.randn(1, 3 * n_samples, 1)
+    starts = np.arange(0, 2 * n_samples + 1, step)
+
+    with torch.no_grad():
+        expected = model(torch.cat([waveform[:, s : s + n_samples] for s in starts]))
+
+        resolution = model.shared_resolution
+        n_frames = resolution.samples(n_samples / 16000, mode="strict")
+        frame_starts = np.round(starts / 16000 / resolution.step).astype(int)
+        encoded = model.shared_encode(waveform)
+        output = model.shared_decode(encoded, frame_starts, n_frames)
+
+    np.testing.assert_allclose(output.numpy(), expected.numpy(), rtol=1e-4, atol=1e-4)
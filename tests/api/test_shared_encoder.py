@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import torch
+from torch import nn
+
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+
+from pyannote.audio.models import PyanNet
+from pyannote.audio.models import SincTDNN
+from pyannote.audio.train.task import Task
+from pyannote.audio.train.task import TaskOutput
+from pyannote.audio.train.task import TaskType
+
+SAMPLE_RATE = 16000
+
+
+def _waveform(seed=0, duration=2.0):
+    """Random waveform (with DC offset and varying loudness), as returned by
+    `RawAudio`, so that per-window normalization matters"""
+    rng = np.random.RandomState(seed)
+    n_samples = int(duration * SAMPLE_RATE)
+    loudness = np.linspace(0.05, 0.5, n_samples)[:, np.newaxis]
+    data = 0.05 + loudness * rng.randn(n_samples, 1)
+    window = SlidingWindow(
+        start=-0.5 / SAMPLE_RATE, duration=1.0 / SAMPLE_RATE, step=1.0 / SAMPLE_RATE
+    )
+    return SlidingWindowFeature(data.astype(np.float32), window)
+
+
+def _model(Klass, waveform_normalize, instance_normalize):
+    """Small PyanNet or SincTDNN with non-trivial normalization parameters"""
+
+    torch.manual_seed(0)
+    sincnet = {
+        "out_channels": [8, 8, 8],
+        "waveform_normalize": waveform_normalize,
+        "instance_normalize": instance_normalize,
+    }
+
+    if Klass is PyanNet:
+        specifications = {
+            "task": Task(
+                type=TaskType.MULTI_LABEL_CLASSIFICATION, output=TaskOutput.SEQUENCE
+            ),
+            "X": {"dimension": 1},
+            "y": {"classes": ["A", "B"]},
+        }
+        model = PyanNet(
+            specifications,
+            sincnet=sincnet,
+            rnn={"hidden_size": 8},
+            ff={"hidden_size": [8]},
+        )
+
+    else:
+        specifications = {
+            "task": Task(
+                type=TaskType.REPRESENTATION_LEARNING, output=TaskOutput.VECTOR
+            ),
+            "X": {"dimension": 1},
+            "y": {"classes": ["A", "B"]},
+        }
+        model = SincTDNN(specifications, sincnet=sincnet, tdnn={"embedding_dim": 16})
+
+    # default affine parameters (weight = 1, bias = 0) would hide errors
+    with torch.no_grad():
+        for module in model.modules():
+            if isinstance(module, nn.InstanceNorm1d) and module.affine:
+                module.weight.uniform_(0.5, 1.5)
+                module.bias.uniform_(-0.5, 0.5)
+
+    return model.eval()
+
+
+@pytest.mark.parametrize("Klass", [PyanNet, SincTDNN])
+@pytest.mark.parametrize("waveform_normalize", [False, True])
+@pytest.mark.parametrize("instance_normalize", [False, True])
+# 0.10125s is a multiple of SincNet frame step (27 samples)
+@pytest.mark.parametrize("step", [0.1, 0.25, 0.10125])
+def test_shared_encoder_equivalence(
+    Klass, waveform_normalize, instance_normalize, step
+):
+
+    model = _model(Klass, waveform_normalize, instance_normalize)
+    assert model.supports_shared_encoder
+
+    features = _waveform()
+    window = SlidingWindow(duration=1.0, step=step)
+
+    expected = model.slide(features, window, batch_size=4, device="cpu")
+    shared = model.slide(
+        features, window, batch_size=4, device="cpu", share_encoder=True
+    )
+
+    assert shared.data.shape == expected.data.shape
+    np.testing.assert_allclose(shared.data, expected.data, rtol=1e-3, atol=1e-4)
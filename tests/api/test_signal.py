@@ -0,0 +1,202 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from pyannote.core import Segment
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+from pyannote.core import Timeline
+from pyannote.core.utils.generators import pairwise
+
+from pyannote.audio.utils.signal import Binarize
+from pyannote.audio.utils.signal import Peak
+
+
+def _scores(seed, n_samples=1000, n_dimensions=1):
+    """Smooth random scores in [0, 1]"""
+    rng = np.random.RandomState(seed)
+    phase = np.cumsum(0.3 * rng.randn(n_samples, n_dimensions), axis=0)
+    data = 0.5 * (1.0 + np.sin(phase)) + 0.05 * rng.randn(n_samples, n_dimensions)
+    window = SlidingWindow(start=0.0, duration=0.05, step=0.01)
+    return SlidingWindowFeature(data, window)
+
+
+def _binarize_loop(binarize, predictions, dimension=0):
+    """Sample by sample implementation replaced by vectorized `Binarize`"""
+
+    data = predictions.data[:, dimension]
+
+    if binarize.log_scale:
+        data = np.exp(data)
+
+    n_samples = len(data)
+    window = predictions.sliding_window
+    timestamps = [window[i].middle for i in range(n_samples)]
+
+    start = timestamps[0]
+    label = data[0] > binarize.onset
+
+    if binarize.scale == "absolute":
+        mini, maxi = 0, 1
+    elif binarize.scale == "relative":
+        mini, maxi = np.nanmin(data), np.nanmax(data)
+    elif binarize.scale == "percentile":
+        mini, maxi = np.nanpercentile(data, 1), np.nanpercentile(data, 99)
+
+    onset = mini + binarize.onset * (maxi - mini)
+    offset = mini + binarize.offset * (maxi - mini)
+
+    active = Timeline()
+    for t, y in zip(timestamps[1:], data[1:]):
+        if label:
+            if y < offset:
+                active.add(Segment(start - binarize.pad_onset, t + binarize.pad_offset))
+                start = t
+                label = False
+        else:
+            if y > onset:
+                start = t
+                label = True
+
+    if label:
+        active.add(Segment(start - binarize.pad_onset, t + binarize.pad_offset))
+
+    active = active.support()
+    active = Timeline([s for s in active if s.duration > binarize.min_duration_on])
+    for s in active.gaps():
+        if s.duration < binarize.min_duration_off:
+            active.add(s)
+    return active.support()
+
+
+def _peak_loop(peak, predictions, dimension=0):
+    """Implementation replaced by `Peak.candidates` and `Peak.apply`"""
+
+    y = predictions.data[:, dimension]
+    if peak.log_scale:
+        y = np.exp(y)
+
+    sw = predictions.sliding_window
+    order = max(1, int(np.rint(peak.min_duration / sw.step)))
+    indices = scipy.signal.argrelmax(y, order=order)[0]
+
+    if peak.scale == "absolute":
+        mini, maxi = 0, 1
+    elif peak.scale == "relative":
+        mini, maxi = np.nanmin(y), np.nanmax(y)
+    elif peak.scale == "percentile":
+        mini, maxi = np.nanpercentile(y, 1), np.nanpercentile(y, 99)
+
+    threshold = mini + peak.alpha * (maxi - mini)
+    peak_time = np.array([sw[i].middle for i in indices if y[i] > threshold])
+
+    boundaries = np.hstack([[sw[0].start], peak_time, [sw[len(y)].end]])
+    return Timeline([Segment(start, end) for start, end in pairwise(boundaries)])
+
+
+def _assert_same_timeline(actual, expected):
+    actual = np.array([[s.start, s.end] for s in actual]).reshape(-1, 2)
+    expected = np.array([[s.start, s.end] for s in expected]).reshape(-1, 2)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize(
+    "onset, offset", [(0.5, 0.5), (0.7, 0.3), (0.3, 0.7), (0.0, 1.0)]
+)
+@pytest.mark.parametrize("scale", ["absolute", "relative", "percentile"])
+@pytest.mark.parametrize(
+    "pad_onset, pad_offset, min_duration_on, min_duration_off",
+    [(0.0, 0.0, 0.0, 0.0), (0.05, 0.1, 0.1, 0.2), (-0.02, 0.0, 0.0, 0.5)],
+)
+def test_binarize_equivalence(
+    seed, onset, offset, scale, pad_onset, pad_offset, min_duration_on, min_duration_off
+):
+    predictions = _scores(seed)
+    binarize = Binarize(
+        onset=onset,
+        offset=offset,
+        scale=scale,
+        pad_onset=pad_onset,
+        pad_offset=pad_offset,
+        min_duration_on=min_duration_on,
+        min_duration_off=min_duration_off,
+    )
+    _assert_same_timeline(
+        binarize.apply(predictions), _binarize_loop(binarize, predictions)
+    )
+
+
+def test_binarize_log_scale():
+    predictions = _scores(0)
+    log_predictions = SlidingWindowFeature(
+        np.log(np.clip(predictions.data, 1e-6, None)), predictions.sliding_window
+    )
+    binarize = Binarize(onset=0.6, offset=0.4, log_scale=True)
+    _assert_same_timeline(
+        binarize.apply(log_predictions), _binarize_loop(binarize, log_predictions)
+    )
+
+
+def test_binarize_nan():
+    predictions = _scores(0)
+    predictions.data[100:200] = np.nan
+    binarize = Binarize(onset=0.6, offset=0.4)
+    _assert_same_timeline(
+        binarize.apply(predictions), _binarize_loop(binarize, predictions)
+    )
+
+
+def test_binarize_apply_all():
+    predictions = _scores(0, n_dimensions=3)
+    binarize = Binarize(onset=0.6, offset=0.4, scale="relative", min_duration_on=0.1)
+    timelines = binarize.apply_all(predictions)
+    assert len(timelines) == 3
+    for d, timeline in enumerate(timelines):
+        _assert_same_timeline(timeline, binarize.apply(predictions, dimension=d))
+        _assert_same_timeline(
+            timeline, _binarize_loop(binarize, predictions, dimension=d)
+        )
+
+
+@pytest.mark.parametrize("onset, offset", [(0.5, 0.5), (0.7, 0.3), (0.3, 0.7)])
+def test_hysteresis_equivalence(onset, offset):
+
+    data = _scores(0).data
+    data[10:20] = np.nan
+
+    # reference onset/offset state machine
+    state = data[0, 0] > onset
+    expected = [state]
+    for y in data[1:, 0]:
+        if state:
+            if y < offset:
+                state = False
+        elif y > onset:
+            state = True
+        expected.append(state)
+
+    active = Binarize(onset=onset, offset=offset).hysteresis(data)
+    np.testing.assert_array_equal(active[:, 0], expected)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("alpha", [0.1, 0.5, 0.9])
+@pytest.mark.parametrize("scale", ["absolute", "relative", "percentile"])
+@pytest.mark.parametrize("min_duration", [0.01, 0.1, 1.0])
+def test_peak_equivalence(seed, alpha, scale, min_duration):
+    predictions = _scores(seed)
+    peak = Peak(alpha=alpha, scale=scale, min_duration=min_duration)
+    _assert_same_timeline(peak.apply(predictions), _peak_loop(peak, predictions))
+
+
+def test_peak_candidates():
+    predictions = _scores(0)
+    peak = Peak(min_duration=0.1)
+    times, heights, y = peak.candidates(predictions)
+    assert np.all(np.diff(times) > 0)
+    np.testing.assert_array_equal(y, predictions.data[:, 0])
+    window = predictions.sliding_window
+    indices = [window.closest_frame(t) for t in times]
+    np.testing.assert_array_equal(heights, y[indices])
@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pyannote.audio.utils.stages import Stage
+from pyannote.audio.utils.stages import StagedPipeline
+
+
+def _jitter(function, seed=0, max_delay=0.005):
+    """Wrap `function` so that it sleeps for a random duration first"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def wrapped(item):
+        with lock:
+            delay = rng.uniform(0.0, max_delay)
+        time.sleep(delay)
+        return function(item)
+
+    return wrapped
+
+
+def _square(x):
+    return x * x
+
+
+def _negate(x):
+    return -x
+
+
+def _fail(x):
+    if x == 5:
+        raise RuntimeError("failure")
+    return x
+
+
+@pytest.mark.parametrize("n_threads", [1, 4])
+@pytest.mark.parametrize("maxsize", [1, 2, 8])
+def test_staged_pipeline_equivalence(n_threads, maxsize):
+
+    items = list(range(50))
+    stages = StagedPipeline(
+        [
+            Stage("read", _jitter(lambda x: x, seed=0), n_threads=n_threads),
+            Stage("square", _jitter(_square, seed=1), n_threads=n_threads),
+            Stage("negate", _jitter(_negate, seed=2)),
+        ],
+        maxsize=maxsize,
+    )
+
+    # same outputs, in the same order, as applying stages sequentially
+    outputs = list(stages(iter(items)))
+    assert outputs == [_negate(_square(x)) for x in items]
+
+    for queue in stages.queues_:
+        assert queue.max_depth_ <= maxsize
+        assert queue.items_ == len(items)
+
+    metrics = stages.metrics()
+    assert [m["stage"] for m in metrics] == ["read", "square", "negate"]
+    for m in metrics:
+        assert m["items"] == len(items)
+        assert m["max_depth"] <= maxsize
+        assert 0.0 <= m["utilization"]
+    assert isinstance(stages.report(), str)
+
+
+def test_staged_pipeline_empty():
+    stages = StagedPipeline([Stage("square", _square)])
+    assert list(stages([])) == []
+    assert stages.metrics()[0]["items"] == 0
+
+
+@pytest.mark.parametrize("n_threads", [1, 4])
+def test_staged_pipeline_exception(n_threads):
+
+    stages = StagedPipeline(
+        [
+            Stage("fail", _fail, n_threads=n_threads),
+            Stage("square", _square),
+        ]
+    )
+
+    outputs = []
+    with pytest.raises(RuntimeError):
+        for output in stages(range(10)):
+            outputs.append(output)
+
+    # items preceding the failing one are still returned
+    assert outputs == [_square(x) for x in range(5)]
+
+
+def test_staged_pipeline_early_stop():
+
+    consumed = []
+
+    def items():
+        for x in range(10000):
+            consumed.append(x)
+            yield x
+
+    stages = StagedPipeline(
+        [Stage("square", _jitter(_square), n_threads=2), Stage("negate", _negate)],
+        maxsize=2,
+    )
+
+    for i, output in enumerate(stages(items())):
+        if i == 9:
+            break
+
+    # upstream stages stop consuming items shortly after consumer stops
+    time.sleep(0.5)
+    n_consumed = len(consumed)
+    time.sleep(0.5)
+    assert len(consumed) == n_consumed
+    assert n_consumed < 100
+
+    # pipeline can be used again
+    assert list(stages(range(5))) == [_negate(_square(x)) for x in range(5)]
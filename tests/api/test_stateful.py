@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+import torch
+
+from pyannote.core import Segment
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+
+from pyannote.audio.models import PyanNet
+from pyannote.audio.train.task import Task
+from pyannote.audio.train.task import TaskOutput
+from pyannote.audio.train.task import TaskType
+
+SAMPLE_RATE = 16000
+
+
+def _waveform(seed=0, duration=3.0):
+    """Random waveform, as returned by `RawAudio`"""
+    rng = np.random.RandomState(seed)
+    n_samples = int(duration * SAMPLE_RATE) + 20
+    data = 0.1 * rng.randn(n_samples, 1).astype(np.float32)
+    window = SlidingWindow(
+        start=-0.5 / SAMPLE_RATE, duration=1.0 / SAMPLE_RATE, step=1.0 / SAMPLE_RATE
+    )
+    return SlidingWindowFeature(data, window)
+
+
+def _model():
+    """Small unidirectional PyanNet whose stateful calls are recorded"""
+
+    torch.manual_seed(0)
+    specifications = {
+        "task": Task(
+            type=TaskType.MULTI_LABEL_CLASSIFICATION, output=TaskOutput.SEQUENCE
+        ),
+        "X": {"dimension": 1},
+        "y": {"classes": ["A", "B"]},
+    }
+    model = PyanNet(
+        specifications,
+        sincnet={"out_channels": [8, 8, 8]},
+        rnn={"hidden_size": 8, "bidirectional": False},
+        ff={"hidden_size": [8]},
+    ).eval()
+    assert model.supports_stateful
+
+    # (number of frames, whether state was reset) of each call
+    model.calls_ = []
+    stateful_forward = model.stateful_forward
+
+    def _stateful_forward(frames, state=None):
+        model.calls_.append((frames.shape[1], state is None))
+        return stateful_forward(frames, state=state)
+
+    model.stateful_forward = _stateful_forward
+    return model
+
+
+def _n_tail(output):
+    """Maximum number of final frames extending beyond the end of the file"""
+    window = output.sliding_window
+    return int(np.ceil(window.duration / window.step)) + 1
+
+
+@pytest.mark.parametrize("duration", [0.5, 1.0, 1.3, 5.0])
+def test_stateful_frames_written_once(duration):
+
+    features = _waveform()
+    model = _model()
+    output = model.slide(
+        features, SlidingWindow(duration=duration, step=duration), stateful=True
+    )
+
+    # output is initialized with NaN so that frames never written show up.
+    # all frames are written, except for the last few ones that the model
+    # cannot process as they extend beyond the end of the file.
+    written = ~np.any(np.isnan(output.data), axis=1)
+    n_written = np.sum(written)
+    assert np.all(written[:n_written])
+    assert n_written >= len(written) - _n_tail(output)
+
+    # frames written by a block are never written again
+    assert sum(n for n, _ in model.calls_) == n_written
+
+    # state is only reset at the beginning
+    resets = [reset for _, reset in model.calls_]
+    assert resets == [True] + [False] * (len(resets) - 1)
+
+
+def test_stateful_gate():
+
+    features = _waveform()
+    start = features.extent.start
+    skipped = Segment(start + 1.0, start + 2.0)
+
+    def gate(block):
+        return not (
+            block.start >= skipped.start - 1e-6 and block.end <= skipped.end + 1e-6
+        )
+
+    model = _model()
+    output = model.slide(
+        features, SlidingWindow(duration=0.5, step=0.5), stateful=True, gate=gate
+    )
+
+    window = output.sliding_window
+    middles = np.array([window[i].middle for i in range(len(output.data))])
+    in_skipped = (middles >= skipped.start) & (middles < skipped.end)
+    written = ~np.any(np.isnan(output.data), axis=1)
+
+    # frames whose middle falls within skipped blocks are skipped...
+    assert not np.any(written[in_skipped])
+
+    # ... and other ones are written exactly once
+    n_tail = _n_tail(output)
+    assert np.all(written[:-n_tail][~in_skipped[:-n_tail]])
+    assert sum(n for n, _ in model.calls_) == np.sum(written)
+
+    # state is reset after skipped blocks
+    resets = [reset for _, reset in model.calls_]
+    assert resets == [True, False, True] + [False] * (len(resets) - 3)
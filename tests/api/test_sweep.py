@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from pyannote.core import Annotation
+from pyannote.core import Segment
+from pyannote.core import SlidingWindow
+from pyannote.core import SlidingWindowFeature
+from pyannote.core import Timeline
+from pyannote.metrics.detection import DetectionErrorRate
+from pyannote.metrics.detection import DetectionPrecision
+from pyannote.metrics.detection import DetectionPrecisionRecallFMeasure
+from pyannote.metrics.detection import DetectionRecall
+from pyannote.metrics.segmentation import SegmentationCoverage
+from pyannote.metrics.segmentation import SegmentationPurity
+
+from pyannote.audio.pipeline.sweep import DetectionSweep
+from pyannote.audio.pipeline.sweep import SegmentationSweep
+from pyannote.audio.utils.signal import Binarize
+from pyannote.audio.utils.signal import Peak
+
+
+def _scores(seed, n_samples=1000):
+    """Smooth random scores in [0, 1]"""
+    rng = np.random.RandomState(seed)
+    phase = np.cumsum(0.3 * rng.randn(n_samples))
+    data = 0.5 * (1.0 + np.sin(phase)) + 0.05 * rng.randn(n_samples)
+    window = SlidingWindow(start=0.0, duration=0.05, step=0.01)
+    return SlidingWindowFeature(data[:, np.newaxis], window)
+
+
+def _reference(seed, start=0.5, end=9.5):
+    """Random speaker turns (with gaps and overlaps) within [start, end]"""
+    rng = np.random.RandomState(seed)
+    reference = Annotation()
+    t, track = start, 0
+    while t < end:
+        duration = rng.uniform(0.2, 2.0)
+        label = ["A", "B", "C"][rng.randint(3)]
+        reference[Segment(t, min(t + duration, end)), track] = label
+        t += duration + rng.uniform(-0.3, 0.5)
+        track += 1
+    return reference
+
+
+# (probability, reference, uem) tuples
+DETECTION_FILES = [
+    (_scores(0), _reference(10).get_timeline(), Timeline([Segment(0.0, 10.0)])),
+    (
+        _scores(1),
+        _reference(11).get_timeline(),
+        Timeline([Segment(1.0, 4.0), Segment(5.0, 9.0)]),
+    ),
+]
+
+
+@pytest.mark.parametrize("delta", [0.0, 0.1])
+@pytest.mark.parametrize(
+    "min_duration_on, min_duration_off, pad_onset, pad_offset",
+    [(0.0, 0.0, 0.0, 0.0), (0.1, 0.1, 0.0, 0.0), (0.0, 0.2, 0.05, 0.1)],
+)
+def test_detection_sweep_equivalence(
+    delta, min_duration_on, min_duration_off, pad_onset, pad_offset
+):
+
+    onset = np.linspace(0.2, 0.8, 7)
+    offset = onset - delta
+    params = {
+        "min_duration_on": min_duration_on,
+        "min_duration_off": min_duration_off,
+        "pad_onset": pad_onset,
+        "pad_offset": pad_offset,
+    }
+
+    sweep = DetectionSweep(onset=onset, offset=offset, **params)
+    for probability, reference, uem in DETECTION_FILES:
+        sweep.update(probability, reference, uem=uem)
+    curve = sweep.curve()
+
+    # one pipeline evaluation per pair of thresholds
+    for i, (on, off) in enumerate(zip(onset, offset)):
+        binarize = Binarize(onset=on, offset=off, **params)
+        precision = DetectionPrecision()
+        recall = DetectionRecall()
+        fscore = DetectionPrecisionRecallFMeasure()
+        error_rate = DetectionErrorRate()
+        for probability, reference, uem in DETECTION_FILES:
+            reference = reference.to_annotation()
+            hypothesis = binarize.apply(probability).to_annotation()
+            for metric in [precision, recall, fscore, error_rate]:
+                metric(reference, hypothesis, uem=uem)
+
+        np.testing.assert_allclose(curve["precision"][i], abs(precision), atol=1e-6)
+        np.testing.assert_allclose(curve["recall"][i], abs(recall), atol=1e-6)
+        np.testing.assert_allclose(curve["fscore"][i], abs(fscore), atol=1e-6)
+        np.testing.assert_allclose(
+            curve["detection_error_rate"][i], abs(error_rate), atol=1e-6
+        )
+
+
+def test_detection_sweep_optimum():
+    sweep = DetectionSweep(onset=np.linspace(0.2, 0.8, 7), fscore=True)
+    for probability, reference, uem in DETECTION_FILES:
+        sweep.update(probability, reference, uem=uem)
+    curve = sweep.curve()
+    optimum = sweep.optimum()
+    best = int(np.argmax(curve["fscore"]))
+    assert optimum["onset"] == curve["onset"][best]
+    assert optimum["value"] == curve["fscore"][best]
+
+    sweep.reset()
+    assert np.all(sweep.retrieved_ == 0.0)
+    assert sweep.relevant_ == 0.0
+
+
+def test_detection_sweep_shape_mismatch():
+    with pytest.raises(ValueError):
+        DetectionSweep(onset=[0.1, 0.2], offset=[0.1])
+
+
+@pytest.mark.parametrize("min_duration", [0.0, 0.1, 0.5])
+def test_segmentation_sweep_equivalence(min_duration):
+
+    files = [(_scores(0), _reference(10)), (_scores(1), _reference(11))]
+
+    sweep = SegmentationSweep(min_duration=min_duration, tolerance=0.5)
+    for probability, reference in files:
+        sweep.update(probability, reference)
+    curve = sweep.curve()
+
+    # one pipeline evaluation per threshold
+    for i, alpha in enumerate(curve["alpha"]):
+        peak = Peak(alpha=alpha, min_duration=min_duration)
+        purity = SegmentationPurity(tolerance=0.5)
+        coverage = SegmentationCoverage(tolerance=0.5)
+        for probability, reference in files:
+            hypothesis = peak.apply(probability).to_annotation()
+            purity(reference, hypothesis)
+            coverage(reference, hypothesis)
+
+        np.testing.assert_allclose(curve["purity"][i], abs(purity), atol=1e-6)
+        np.testing.assert_allclose(curve["coverage"][i], abs(coverage), atol=1e-6)